@@ -3,93 +3,1343 @@ Data Access Layer for Projects Database
 Handles all database operations for the projects table
 """
 
+import argparse
+import base64
+import collections
+import csv
+import itertools
+import json
+import logging
 import sqlite3
 import os
+import random
+import re
+import sys
+import threading
+import time
+import weakref
+
+from cache import LRUCache
+
+logger = logging.getLogger(__name__)
 
 # Database configuration
 DB_NAME = 'projects.db'
 
+# Connection pool configuration
+POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 5.0))
+
+# Storage configuration: WAL lets readers in other workers proceed while a writer commits
+JOURNAL_MODE = os.environ.get('DB_JOURNAL_MODE', 'WAL')
+PRAGMAS = {
+    'synchronous': os.environ.get('DB_SYNCHRONOUS', 'NORMAL'),
+    'busy_timeout': int(os.environ.get('DB_BUSY_TIMEOUT_MS', 5000)),
+    'cache_size': int(os.environ.get('DB_CACHE_SIZE', -16000)),  # negative values are KiB
+    'mmap_size': int(os.environ.get('DB_MMAP_SIZE', 64 * 1024 * 1024)),
+}
+
+# Write path configuration: retries with exponential backoff while another process holds the lock
+WRITE_RETRIES = int(os.environ.get('DB_WRITE_RETRIES', 5))
+WRITE_BACKOFF = float(os.environ.get('DB_WRITE_BACKOFF', 0.05))
+
+# Read-through cache for project lookups, keyed on the projects table generation
+PROJECT_CACHE_SIZE = int(os.environ.get('PROJECT_CACHE_SIZE', 256))
+PROJECT_CACHE_TTL = float(os.environ.get('PROJECT_CACHE_TTL', 300))
+
+# Rows fetched per round trip when streaming the listing
+STREAM_BATCH_SIZE = int(os.environ.get('PROJECT_STREAM_BATCH_SIZE', 500))
+
+# Bulk import/export (python DAL.py import / export): rows per transaction or fetch, and the
+# PRAGMAs the import connection runs with. synchronous=OFF can lose the last batches on power
+# loss (never corrupt the file), which a rerunnable load can afford
+BULK_BATCH_SIZE = int(os.environ.get('DB_BULK_BATCH_SIZE', 10000))
+BULK_PRAGMAS = {
+    'synchronous': 'OFF',
+    'cache_size': int(os.environ.get('DB_BULK_CACHE_SIZE', -262144)),
+    'temp_store': 'MEMORY',
+}
+
+# Characters of a project's description carried by listing rows (the summaries= reads below);
+# the full text is loaded only for a single project
+SUMMARY_LENGTH = int(os.environ.get('PROJECT_SUMMARY_LENGTH', 200))
+
+# Read replica mode: each process serves project reads from an in-memory copy of the
+# database, copied with the backup API and refreshed when the projects generation moves.
+# Threads share the copy's connection, which needs SQLite's serialized threading mode
+READ_REPLICA = os.environ.get('DB_READ_REPLICA', '') == '1' and sqlite3.threadsafety == 3
+if os.environ.get('DB_READ_REPLICA', '') == '1' and not READ_REPLICA:
+    # Python before 3.11 always reports threadsafety 1, whatever SQLite was built with
+    logger.warning('DB_READ_REPLICA=1 ignored: this sqlite3 module reports threadsafety %d, '
+                   'and the shared replica connection needs 3 (serialized)', sqlite3.threadsafety)
+
+# Full-text search: matched terms in snippets are wrapped in these control characters,
+# leaving it to the caller to escape the text and turn them into markup
+SNIPPET_START = '\x02'
+SNIPPET_END = '\x03'
+SNIPPET_TOKENS = 16
+
+# Timing hook, called as query_observer(phase, operation, seconds) for every pool checkout
+# ('acquire', 'connection'), statement ('execute', SQL verb) and fetch ('fetch', SQL verb).
+# Installed by metrics.py; None (the default) skips timing altogether.
+query_observer = None
+
+# Change hook, called as project_observer(changes) once a write to projects has committed, with an
+# (action, project_id, created_at) tuple per project; action is 'insert', 'update' or 'delete', and
+# created_at is None from the batch writes, which do not read it back. Installed by freeze.py.
+project_observer = None
+
+# Statements taking longer than this (execute plus fetches, in milliseconds) are logged with
+# their EXPLAIN QUERY PLAN as a warning, and also as a JSON line in SLOW_QUERY_LOG when that is
+# set (it is appended to without limit, so rotate it); SLOW_QUERY_MS = 0 turns it all off
+SLOW_QUERY_MS = float(os.environ.get('DB_SLOW_QUERY_MS', 100))
+SLOW_QUERY_LOG = os.environ.get('DB_SLOW_QUERY_LOG', '')
+
+# Transaction control is timed but never logged as slow: BEGIN IMMEDIATE waiting out another
+# writer is lock contention, not a query a plan or an index could help
+_TRANSACTION_CONTROL = {'BEGIN', 'COMMIT', 'END', 'ROLLBACK', 'SAVEPOINT', 'RELEASE'}
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes free within POOL_TIMEOUT"""
+
+
+def _operation(sql):
+    """The leading SQL keyword of a statement (SELECT, INSERT, BEGIN, ...), used as its timing label"""
+    words = sql.split(None, 1)
+    return words[0].upper() if words else ''
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that times each statement and fetch
+
+    Every phase is reported to query_observer when one is installed; a statement
+    whose execute and fetches add up to more than SLOW_QUERY_MS is logged once,
+    with its query plan.
+    """
+
+    operation = ''
+    sql = None
+    parameters = None
+    elapsed = 0.0
+
+    def _start(self, sql, parameters):
+        self.operation = _operation(sql)
+        self.sql = None if self.operation in _TRANSACTION_CONTROL else sql
+        self.parameters = parameters
+        self.elapsed = 0.0
+
+    def _timed(self, phase, call, *args):
+        started = time.perf_counter()
+        try:
+            return call(*args)
+        finally:
+            seconds = time.perf_counter() - started
+            observer = query_observer
+            if observer is not None:
+                observer(phase, self.operation, seconds)
+            threshold = SLOW_QUERY_MS / 1000
+            if threshold and self.elapsed <= threshold < self.elapsed + seconds and self.sql is not None:
+                log_slow_query(self.connection, self.sql, self.parameters, self.elapsed + seconds)
+            self.elapsed += seconds
+
+    def execute(self, sql, parameters=()):
+        self._start(sql, parameters)
+        return self._timed('execute', super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        # The parameter sets may be a one-shot iterator, so a slow batch is explained without them
+        self._start(sql, None)
+        return self._timed('execute', super().executemany, sql, seq_of_parameters)
+
+    def fetchone(self):
+        return self._timed('fetch', super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed('fetch', super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._timed('fetch', super().fetchall)
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose shortcut execute methods go through TimedCursor"""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class ConnectionPool:
+    """Bounded pool of reusable SQLite connections to a single database file"""
+
+    def __init__(self, database, size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self.pid = os.getpid()
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = False
+
+    def _connect(self):
+        """Open a new connection configured for this pool"""
+        # Connections move between request threads, so the owning-thread check is disabled
+        conn = sqlite3.connect(self.database, check_same_thread=False, factory=TimedConnection)
+        conn.row_factory = sqlite3.Row  # This enables column access by name
+        apply_pragmas(conn)
+        return conn
+
+    @staticmethod
+    def _is_healthy(conn):
+        """Cheap liveness probe run before an idle connection is handed out"""
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self):
+        """Check out a healthy connection, waiting for a free slot if the pool is full"""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeoutError(
+                f'No connection to {self.database} became free within {self.timeout}s'
+            )
+        try:
+            while True:
+                with self._lock:
+                    conn = self._idle.pop() if self._idle else None
+                if conn is None:
+                    return self._connect()
+                if self._is_healthy(conn):
+                    return conn
+                _close_quietly(conn)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn):
+        """Return a checked-out connection, discarding it if it is no longer usable"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            reusable = True
+        except sqlite3.Error:
+            reusable = False
+        with self._lock:
+            keep = reusable and not self._closed
+            if keep:
+                self._idle.append(conn)
+        if not keep:
+            _close_quietly(conn)
+        self._slots.release()
+
+    def close(self):
+        """Close all idle connections; connections still checked out close on release"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            _close_quietly(conn)
+
+
+class _Lease:
+    """A pooled connection held by one thread, handed back when released or garbage collected"""
+
+    def __init__(self, pool, conn):
+        self.pool = pool
+        self.conn = conn
+        # Runs when the owning thread exits without releasing, so slots are never leaked
+        self._finalizer = weakref.finalize(self, pool.release, conn)
+
+    def release(self):
+        self._finalizer()
+
+    def abandon(self):
+        self._finalizer.detach()
+
+
+class ReadReplica:
+    """In-memory copy of a database file, refreshed whenever the projects table changes
+
+    Every read first asks the primary's PRAGMA data_version, which moves only
+    when another connection has committed and costs no disk read. The
+    projects generation counter is read only when it has moved, and the
+    copy is rebuilt only if the generation changed too, so writes to other
+    tables (jobs, messages) never cause a copy. A refresh copies the file
+    into a new in-memory database and then swaps it in. Cursors still reading the
+    previous copy finish on it. Nothing writes to a copy once it is swapped
+    in, so threads share its connection without locking.
+    """
+
+    def __init__(self, database):
+        self.database = database
+        self.pid = os.getpid()
+        self.conn = None
+        self.generation = None
+        self.refreshes = 0
+        self.refresh_seconds = 0.0
+        self._source = sqlite3.connect(database, check_same_thread=False)
+        self._data_version = None
+        self._lock = threading.Lock()
+
+    def _copy(self):
+        """A fresh in-memory copy of the primary, and the projects generation it holds"""
+        conn = sqlite3.connect(':memory:', check_same_thread=False, factory=TimedConnection)
+        self._source.backup(conn)
+        conn.row_factory = sqlite3.Row
+        generation = conn.execute(
+            "SELECT generation FROM table_versions WHERE name = 'projects'"
+        ).fetchone()['generation']
+        return conn, generation
+
+    def connection(self):
+        """The current copy, refreshed first if the primary's projects table has changed since"""
+        with self._lock:
+            data_version = self._source.execute('PRAGMA data_version').fetchone()[0]
+            if data_version != self._data_version:
+                generation = self._source.execute(
+                    "SELECT generation FROM table_versions WHERE name = 'projects'"
+                ).fetchone()[0]
+                if generation != self.generation:
+                    started = time.perf_counter()
+                    self.conn, self.generation = self._copy()
+                    self.refreshes += 1
+                    self.refresh_seconds += time.perf_counter() - started
+                self._data_version = data_version
+            return self.conn
+
+    def stats(self):
+        return {'generation': self.generation, 'refreshes': self.refreshes, 'refresh_seconds': self.refresh_seconds}
+
+    def close(self):
+        with self._lock:
+            _close_quietly(self._source)
+            self.conn = None
+
+
+class ProjectSummary(collections.namedtuple('ProjectSummary', (
+    'id', 'title', 'summary', 'truncated', 'image_filename', 'image_width', 'image_height',
+    'thumbnail_filename', 'image_variants', 'created_at',
+))):
+    """Listing row: a project with its description cut to SUMMARY_LENGTH characters
+
+    A plain tuple (no per-row dict) that, like sqlite3.Row, can also be
+    indexed by column name, so templates and filters treat both alike.
+    """
+
+    __slots__ = ()
+
+    # Select list for from_row; one character more than is kept is fetched, to tell whether the text was cut
+    COLUMNS = '''
+        id, title, substr(description, 1, ?), image_filename, image_width, image_height,
+        thumbnail_filename, image_variants, created_at
+    '''
+
+    @classmethod
+    def from_row(cls, cursor, row):
+        """Row factory for SELECT ProjectSummary.COLUMNS"""
+        summary = row[2]
+        if len(summary) > SUMMARY_LENGTH:
+            return cls(row[0], row[1], summary[:SUMMARY_LENGTH].rstrip(), True, *row[3:])
+        return cls(row[0], row[1], summary, False, *row[3:])
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return getattr(self, key)
+        return super().__getitem__(key)
+
+    def keys(self):
+        return self._fields
+
+
+def apply_pragmas(conn, pragmas=None):
+    """Apply the per-connection storage PRAGMAs (journal mode is set once in init_database)"""
+    for name, value in (PRAGMAS if pragmas is None else pragmas).items():
+        conn.execute(f'PRAGMA {name} = {value}')
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+
+def normalize_sql(sql):
+    """A statement with its whitespace collapsed, so the same query groups together however it was indented"""
+    return ' '.join(sql.split())
+
+def explain(conn, sql, parameters=None):
+    """The EXPLAIN QUERY PLAN for a statement as indented lines ([] if it cannot be explained)
+
+    Without parameters, NULL is bound to each placeholder (plans do not depend on the values).
+    """
+    if parameters is None:
+        parameters = (None,) * sql.count('?')
+    try:
+        rows = conn.cursor(sqlite3.Cursor).execute('EXPLAIN QUERY PLAN ' + sql, parameters).fetchall()
+    except sqlite3.Error:
+        return []
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node_id] + detail)
+    return lines
+
+_slow_log_lock = threading.Lock()
+
+def log_slow_query(conn, sql, parameters, seconds):
+    """Record a statement that exceeded SLOW_QUERY_MS: a warning with its plan, plus a JSON line in SLOW_QUERY_LOG"""
+    statement = normalize_sql(sql)
+    plan = explain(conn, sql, parameters)
+    logger.warning('Slow query (%.1f ms): %s%s', seconds * 1000, statement, ''.join('\n    ' + line for line in plan))
+    if not SLOW_QUERY_LOG:
+        return
+    entry = {'time': time.time(), 'ms': round(seconds * 1000, 3), 'database': DB_NAME, 'sql': statement, 'plan': plan}
+    try:
+        with _slow_log_lock, open(SLOW_QUERY_LOG, 'a', encoding='utf-8') as log:
+            log.write(json.dumps(entry) + '\n')
+    except OSError:
+        logger.exception('Could not write to %s', SLOW_QUERY_LOG)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_local = threading.local()
+_replica = None
+
+def _pool_is_current(pool):
+    return pool is not None and pool.database == DB_NAME and pool.pid == os.getpid()
+
+def get_pool():
+    """Return the pool for the current DB_NAME, creating it on first use or after a fork"""
+    global _pool
+    pool = _pool
+    if not _pool_is_current(pool):
+        with _pool_lock:
+            if not _pool_is_current(_pool):
+                if _pool is not None and _pool.pid == os.getpid():
+                    _pool.close()
+                _pool = ConnectionPool(DB_NAME)
+            pool = _pool
+    return pool
+
 def get_db_connection():
-    """Create and return a database connection"""
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row  # This enables column access by name
-    return conn
+    """Return this thread's database connection, checking one out of the pool if needed"""
+    pool = get_pool()
+    lease = getattr(_local, 'lease', None)
+    if lease is not None:
+        if lease.pool is pool:
+            return lease.conn
+        release_connection()
+    observer = query_observer
+    started = time.perf_counter()
+    lease = _Lease(pool, pool.acquire())
+    if observer is not None:
+        observer('acquire', 'connection', time.perf_counter() - started)
+    _local.lease = lease
+    return lease.conn
+
+def release_connection(exception=None):
+    """Return this thread's connection to the pool (registered as a Flask teardown hook)"""
+    lease = getattr(_local, 'lease', None)
+    if lease is None:
+        return
+    _local.lease = None
+    if lease.pool.pid != os.getpid():
+        # Inherited across fork: the parent still owns the underlying handle
+        lease.abandon()
+    else:
+        lease.release()
+
+def close_pool():
+    """Close every pooled connection (and the read replica) so DB_NAME can be swapped or the file removed"""
+    global _pool, _replica
+    release_connection()
+    with _pool_lock:
+        pool, _pool = _pool, None
+        replica, _replica = _replica, None
+    if pool is not None and pool.pid == os.getpid():
+        pool.close()
+    if replica is not None and replica.pid == os.getpid():
+        replica.close()
+
+def get_replica():
+    """Return this process's read replica of DB_NAME, creating it on first use or after a fork"""
+    global _replica
+    replica = _replica
+    if replica is None or replica.database != DB_NAME or replica.pid != os.getpid():
+        with _pool_lock:
+            if _replica is None or _replica.database != DB_NAME or _replica.pid != os.getpid():
+                if _replica is not None and _replica.pid == os.getpid():
+                    _replica.close()
+                _replica = ReadReplica(DB_NAME)
+            replica = _replica
+    return replica
+
+def read_connection():
+    """Connection for project reads: the in-memory replica in READ_REPLICA mode, else this thread's pooled one"""
+    if READ_REPLICA:
+        return get_replica().connection()
+    return get_db_connection()
+
+_write_lock = threading.Lock()
+
+def _is_busy(error):
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+def run_write(work, conn=None):
+    """Run work(conn) as one IMMEDIATE transaction on the serialized write path
+
+    Writers in this process queue on a lock; writers in other processes are
+    retried with exponential backoff whenever SQLite reports the database busy.
+    Uses this thread's pooled connection unless another is given.
+    """
+    conn = conn or get_db_connection()
+    delay = WRITE_BACKOFF
+    with _write_lock:
+        for attempt in range(WRITE_RETRIES + 1):
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+            except sqlite3.OperationalError as error:
+                if not _is_busy(error) or attempt == WRITE_RETRIES:
+                    raise
+                time.sleep(delay * random.uniform(1.0, 1.5))
+                delay *= 2
+                continue
+            try:
+                result = work(conn)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            return result
+
+_project_cache = LRUCache(max_size=PROJECT_CACHE_SIZE, ttl=PROJECT_CACHE_TTL)
+
+# Change counter bumped by triggers, so every worker process can tell when projects changed
+_VERSION_TRIGGER = '''
+    CREATE TRIGGER IF NOT EXISTS projects_version_{event} AFTER {event} ON projects BEGIN
+        UPDATE table_versions SET generation = generation + 1, updated_at = CURRENT_TIMESTAMP
+        WHERE name = 'projects';
+    END
+'''
+
+# External-content FTS5 index over projects, kept in sync by triggers on every write
+_FTS_TRIGGERS = {
+    'projects_fts_insert': '''
+        CREATE TRIGGER IF NOT EXISTS projects_fts_insert AFTER INSERT ON projects BEGIN
+            INSERT INTO projects_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+        END
+    ''',
+    'projects_fts_delete': '''
+        CREATE TRIGGER IF NOT EXISTS projects_fts_delete AFTER DELETE ON projects BEGIN
+            INSERT INTO projects_fts (projects_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END
+    ''',
+    'projects_fts_update': '''
+        CREATE TRIGGER IF NOT EXISTS projects_fts_update AFTER UPDATE OF title, description ON projects BEGIN
+            INSERT INTO projects_fts (projects_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO projects_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+        END
+    ''',
+}
+
+# Columns added after the original schema: image metadata filled in once an upload's derivatives are rendered
+_IMAGE_COLUMNS = {
+    'image_width': 'INTEGER',
+    'image_height': 'INTEGER',
+    'thumbnail_filename': 'TEXT',
+    'image_variants': 'TEXT',  # JSON: {"avif": [[width, filename], ...], "webp": [...]}
+}
+
+# Batches at least this large index FTS in one set-based statement instead of row by row
+FTS_BULK_THRESHOLD = int(os.environ.get('FTS_BULK_THRESHOLD', 1000))
 
 def init_database():
     """Initialize the database and create the projects table if it doesn't exist"""
     conn = get_db_connection()
-    cursor = conn.cursor()
     
-    # Create projects table with required columns
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS projects (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            description TEXT NOT NULL,
-            image_filename TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    # Journal mode is persistent in the file, so it only needs setting once
+    conn.execute(f'PRAGMA journal_mode = {JOURNAL_MODE}')
+    
+    def create_schema(conn):
+        # Create projects table with required columns
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS projects (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                description TEXT NOT NULL,
+                image_filename TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Bring databases created before a column existed up to date
+        existing = {row['name'] for row in conn.execute('PRAGMA table_info(projects)')}
+        for column, column_type in _IMAGE_COLUMNS.items():
+            if column not in existing:
+                conn.execute(f'ALTER TABLE projects ADD COLUMN {column} {column_type}')
+        
+        # Composite index backing the newest-first listing and its keyset pagination
+        conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_projects_created_at_id ON projects (created_at, id)'
         )
-    ''')
+        
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS table_versions (
+                name TEXT PRIMARY KEY,
+                generation INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.execute("INSERT OR IGNORE INTO table_versions (name) VALUES ('projects')")
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            conn.execute(_VERSION_TRIGGER.format(event=event))
+        
+        fts_exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'projects_fts'"
+        ).fetchone()
+        conn.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS projects_fts USING fts5(
+                title, description,
+                content = 'projects', content_rowid = 'id',
+                tokenize = 'porter unicode61'
+            )
+        ''')
+        for trigger in _FTS_TRIGGERS.values():
+            conn.execute(trigger)
+        if not fts_exists:
+            # Index any projects written before full-text search existed
+            conn.execute("INSERT INTO projects_fts (projects_fts) VALUES ('rebuild')")
+        
+        # Background job queue (see jobs.py); run_at and locked_until are Unix timestamps
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                run_at REAL NOT NULL,
+                locked_until REAL,
+                last_error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status_run_at ON jobs (status, run_at)')
+        
+        # Contact form submissions; created_at is the submission time, set by the caller
+        # because rows are written in batches some time after the request (see messages.py)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT,
+                email TEXT NOT NULL,
+                subject TEXT,
+                message TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
     
-    conn.commit()
-    conn.close()
+    run_write(create_schema)
+    _project_cache.clear()
 
-def get_all_projects():
-    """Retrieve all projects from the database"""
-    conn = get_db_connection()
+def get_projects_version():
+    """Return the projects row from table_versions: the change counter and when it last moved"""
+    conn = read_connection()
+    return conn.execute(
+        "SELECT generation, updated_at FROM table_versions WHERE name = 'projects'"
+    ).fetchone()
+
+def get_projects_generation():
+    """Return the projects change counter, which any process's write advances"""
+    return get_projects_version()['generation']
+
+def _cached_read(key, loader):
+    """Serve a projects read from the cache, valid only for the current table generation"""
+    return _project_cache.get_or_load((DB_NAME, get_projects_generation()) + key, loader)
+
+def cache_stats():
+    """Return hit/miss counters for the project cache"""
+    return _project_cache.stats()
+
+def _select_projects(conn, summaries, sql, parameters=()):
+    """Run a projects query whose select list is {columns}: full rows, or ProjectSummary rows if summaries"""
+    if not summaries:
+        return conn.execute(sql.format(columns='*'), parameters)
     cursor = conn.cursor()
-    cursor.execute('SELECT * FROM projects ORDER BY created_at DESC')
-    projects = cursor.fetchall()
-    conn.close()
-    return projects
+    cursor.row_factory = ProjectSummary.from_row
+    return cursor.execute(sql.format(columns=ProjectSummary.COLUMNS), (SUMMARY_LENGTH + 1, *parameters))
+
+def get_all_projects(summaries=False):
+    """Retrieve all projects from the database (as ProjectSummary rows if summaries)"""
+    def load():
+        conn = read_connection()
+        return _select_projects(
+            conn, summaries, 'SELECT {columns} FROM projects ORDER BY created_at DESC, id DESC'
+        ).fetchall()
+    
+    # Hand out a copy so callers cannot mutate the cached list
+    return list(_cached_read(('all', summaries), load))
+
+def iter_projects(batch_size=None, summaries=False):
+    """Yield every project newest first without materializing the whole result
+
+    Rows are pulled from the cursor batch_size at a time, so memory stays
+    constant however large the table grows. Bypasses the project cache.
+    """
+    conn = read_connection()
+    cursor = _select_projects(conn, summaries, 'SELECT {columns} FROM projects ORDER BY created_at DESC, id DESC')
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size or STREAM_BATCH_SIZE)
+            if not rows:
+                return
+            yield from rows
+    finally:
+        cursor.close()
+
+def encode_cursor(project):
+    """Opaque pagination token for the position just after the given project row"""
+    raw = f"{project['created_at']}|{project['id']}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(token):
+    """Turn a pagination token back into a (created_at, id) pair; raises ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        created_at, project_id = raw.rsplit('|', 1)
+        return created_at, int(project_id)
+    except (ValueError, UnicodeDecodeError) as error:
+        raise ValueError(f'Invalid cursor: {token!r}') from error
+
+def get_projects_page(limit, cursor=None, summaries=False):
+    """Retrieve up to limit projects, newest first, after the given cursor
+
+    Uses keyset pagination on (created_at, id), so every page is an index
+    range scan no matter how deep it is. Returns (projects, next_cursor),
+    where next_cursor is None on the last page. With summaries the rows are
+    ProjectSummary records, as the listing page shows them.
+    """
+    def load():
+        conn = read_connection()
+        if cursor is None:
+            return _select_projects(conn, summaries, '''
+                SELECT {columns} FROM projects ORDER BY created_at DESC, id DESC LIMIT ?
+            ''', (limit + 1,)).fetchall()
+        created_at, project_id = decode_cursor(cursor)
+        return _select_projects(conn, summaries, '''
+            SELECT {columns} FROM projects
+            WHERE (created_at, id) < (?, ?)
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?
+        ''', (created_at, project_id, limit + 1)).fetchall()
+    
+    rows = _cached_read(('page', limit, cursor, summaries), load)
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1])
+    return list(rows), None
 
 def get_project_by_id(project_id):
     """Retrieve a single project by its ID"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM projects WHERE id = ?', (project_id,))
-    project = cursor.fetchone()
-    conn.close()
-    return project
+    def load():
+        conn = read_connection()
+        return conn.execute('SELECT * FROM projects WHERE id = ?', (project_id,)).fetchone()
+    
+    return _cached_read(('project', project_id), load)
+
+def _projects_changed(action, rows):
+    """Tell project_observer, if one is installed, about committed writes to (id, created_at) rows"""
+    observer = project_observer
+    if observer is not None and rows:
+        observer([(action, project_id, created_at) for project_id, created_at in rows])
 
 def insert_project(title, description, image_filename):
     """Insert a new project into the database"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
+    row = run_write(lambda conn: conn.execute('''
         INSERT INTO projects (title, description, image_filename)
         VALUES (?, ?, ?)
-    ''', (title, description, image_filename))
-    conn.commit()
-    project_id = cursor.lastrowid
-    conn.close()
-    return project_id
+        RETURNING id, created_at
+    ''', (title, description, image_filename)).fetchone())
+    _project_cache.clear()
+    _projects_changed('insert', [row])
+    return row['id']
 
 def delete_project(project_id):
     """Delete a project from the database by its ID"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM projects WHERE id = ?', (project_id,))
-    conn.commit()
-    rows_affected = cursor.rowcount
-    conn.close()
-    return rows_affected
+    rows = run_write(lambda conn: conn.execute(
+        'DELETE FROM projects WHERE id = ? RETURNING id, created_at', (project_id,)
+    ).fetchall())
+    _project_cache.clear()
+    _projects_changed('delete', rows)
+    return len(rows)
 
 def update_project(project_id, title, description, image_filename):
     """Update an existing project"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
+    rows = run_write(lambda conn: conn.execute('''
         UPDATE projects 
         SET title = ?, description = ?, image_filename = ?
         WHERE id = ?
-    ''', (title, description, image_filename, project_id))
-    conn.commit()
-    rows_affected = cursor.rowcount
-    conn.close()
-    return rows_affected
+        RETURNING id, created_at
+    ''', (title, description, image_filename, project_id)).fetchall())
+    _project_cache.clear()
+    _projects_changed('update', rows)
+    return len(rows)
+
+def set_project_images(project_id, width, height, thumbnail_filename, variants):
+    """Record an image's dimensions, thumbnail and responsive variants ({format: [(width, filename), ...]})"""
+    rows = run_write(lambda conn: conn.execute('''
+        UPDATE projects
+        SET image_width = ?, image_height = ?, thumbnail_filename = ?, image_variants = ?
+        WHERE id = ?
+        RETURNING id, created_at
+    ''', (width, height, thumbnail_filename, json.dumps(variants), project_id)).fetchall())
+    _project_cache.clear()
+    _projects_changed('update', rows)
+    return len(rows)
+
+def to_match_query(text):
+    """Turn free text into a safe FTS5 query: every word must match, as a prefix"""
+    terms = re.findall(r'\w+', text)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def search_projects(query, limit=20):
+    """Full-text search over titles and descriptions, best BM25 match first
+
+    Each row carries a rank (lower is better) and a snippet of the
+    description with matches wrapped in SNIPPET_START/SNIPPET_END.
+    Title matches weigh ten times more than description matches.
+    """
+    match = to_match_query(query)
+    if not match:
+        return []
+    
+    def load():
+        conn = read_connection()
+        return conn.execute('''
+            SELECT projects.*,
+                   bm25(projects_fts, 10.0, 1.0) AS rank,
+                   snippet(projects_fts, 1, ?, ?, '…', ?) AS snippet
+            FROM projects_fts
+            JOIN projects ON projects.id = projects_fts.rowid
+            WHERE projects_fts MATCH ?
+            ORDER BY rank
+            LIMIT ?
+        ''', (SNIPPET_START, SNIPPET_END, SNIPPET_TOKENS, match, limit)).fetchall()
+    
+    return list(_cached_read(('search', match, limit), load))
+
+# Columns an insert or import may set, in the order _insert_project_rows takes them;
+# created_at falls back to the insert time when missing
+_INSERT_COLUMNS = ('title', 'description', 'image_filename', *_IMAGE_COLUMNS, 'created_at')
+EXPORT_COLUMNS = ('id', *_INSERT_COLUMNS)
+
+# Statements for rows of the first 3 (required) or all _INSERT_COLUMNS: binding the
+# optional columns as NULLs costs more per row than the insert itself
+_INSERT_SQL = {
+    3: '''
+        INSERT INTO projects (title, description, image_filename)
+        VALUES (?, ?, ?)
+    ''',
+    len(_INSERT_COLUMNS): '''
+        INSERT INTO projects (title, description, image_filename, image_width, image_height,
+                              thumbnail_filename, image_variants, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+    ''',
+}
+
+def _insert_project_rows(conn, rows):
+    """Insert rows of one _INSERT_SQL shape inside the caller's transaction; returns the last new id"""
+    bulk = len(rows) >= FTS_BULK_THRESHOLD
+    if bulk:
+        # Per-row FTS and version-counter maintenance dominates large batches; the trigger
+        # swap is invisible to other connections because it happens inside this transaction
+        conn.execute('DROP TRIGGER projects_fts_insert')
+        conn.execute('DROP TRIGGER projects_version_INSERT')
+    conn.executemany(_INSERT_SQL[len(rows[0])], rows)
+    # The write lock is held for the whole batch, so AUTOINCREMENT ids are contiguous
+    last_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+    if bulk:
+        conn.execute('''
+            INSERT INTO projects_fts (rowid, title, description)
+            SELECT id, title, description FROM projects WHERE id > ?
+        ''', (last_id - len(rows),))
+        conn.execute('''
+            UPDATE table_versions SET generation = generation + 1, updated_at = CURRENT_TIMESTAMP
+            WHERE name = 'projects'
+        ''')
+        conn.execute(_FTS_TRIGGERS['projects_fts_insert'])
+        conn.execute(_VERSION_TRIGGER.format(event='INSERT'))
+    return last_id
+
+def insert_projects(projects):
+    """Insert many projects with one executemany in a single transaction; returns their new IDs"""
+    rows = [(p['title'], p['description'], p['image_filename']) for p in projects]
+    if not rows:
+        return []
+    
+    last_id = run_write(lambda conn: _insert_project_rows(conn, rows))
+    _project_cache.clear()
+    project_ids = list(range(last_id - len(rows) + 1, last_id + 1))
+    _projects_changed('insert', [(project_id, None) for project_id in project_ids])
+    return project_ids
+
+def update_projects(updates):
+    """Apply many partial updates in a single transaction; fields left out keep their values"""
+    rows = [
+        (u.get('title'), u.get('description'), u.get('image_filename'), u['id'])
+        for u in updates
+    ]
+    cursor = run_write(lambda conn: conn.executemany('''
+        UPDATE projects
+        SET title = COALESCE(?, title),
+            description = COALESCE(?, description),
+            image_filename = COALESCE(?, image_filename)
+        WHERE id = ?
+    ''', rows))
+    _project_cache.clear()
+    _projects_changed('update', [(row[3], None) for row in rows])
+    return cursor.rowcount
+
+def delete_projects(project_ids):
+    """Delete many projects by ID in a single transaction; returns how many existed"""
+    rows = [(project_id,) for project_id in project_ids]
+    cursor = run_write(lambda conn: conn.executemany('DELETE FROM projects WHERE id = ?', rows))
+    _project_cache.clear()
+    _projects_changed('delete', [(row[0], None) for row in rows])
+    return cursor.rowcount
+
+def get_image_filenames(project_ids):
+    """The distinct image_filename values of the listed projects, in one query however many there are"""
+    conn = get_db_connection()
+    return {row[0] for row in conn.execute(
+        'SELECT DISTINCT image_filename FROM projects WHERE id IN (SELECT value FROM json_each(?))',
+        (json.dumps(list(project_ids)),),
+    ).fetchall()}
+
+def image_filenames_in_use(filenames):
+    """Those of filenames that some project still has as its image_filename"""
+    conn = get_db_connection()
+    return {row[0] for row in conn.execute(
+        'SELECT DISTINCT image_filename FROM projects WHERE image_filename IN (SELECT value FROM json_each(?))',
+        (json.dumps(list(filenames)),),
+    ).fetchall()}
+
+def _bulk_connection():
+    """A connection of its own for bulk loads: plain cursors, so long batches are neither timed nor logged as slow"""
+    conn = sqlite3.connect(DB_NAME)
+    apply_pragmas(conn, {**PRAGMAS, **BULK_PRAGMAS})
+    return conn
+
+# Value types an imported field may have: what CSV and JSON scalars decode to
+_IMPORT_TYPES = {str, int, float, bool, type(None)}
+
+def _unbindable_record(first_number, batch):
+    """ValueError naming the first record in a batch SQLite refused to bind (a JSON object or array value)"""
+    for number, row in enumerate(batch, first_number):
+        for column, value in zip(_INSERT_COLUMNS, row):
+            if type(value) not in _IMPORT_TYPES:
+                return ValueError(f'Record {number}: {column} must be a string or a number, not {type(value).__name__}')
+    return None
+
+def _import_row(number, project):
+    """_INSERT_COLUMNS tuple for one imported record, or just the required three if that is all it has
+
+    Empty fields (as CSV has them) count as missing.
+    """
+    row = tuple([project.get(column) or None for column in _INSERT_COLUMNS])
+    if None in row[:3]:
+        missing = ', '.join(column for column, value in zip(_INSERT_COLUMNS, row[:3]) if value is None)
+        raise ValueError(f'Record {number}: missing {missing}')
+    return row if any(row[3:]) else row[:3]
+
+def import_projects(projects, batch_size=None, progress=None):
+    """Insert an iterable of project dicts, batch_size per transaction; returns how many were inserted
+
+    Records are consumed lazily, so memory stays constant however many there
+    are. Every batch commits on one connection set up with BULK_PRAGMAS; ids
+    are assigned afresh. progress, if given, is called with the running count
+    after each commit. A bad record (a required field missing, or a JSON
+    object or array value) stops the import with a ValueError naming it,
+    keeping the batches committed before it.
+    """
+    batch_size = batch_size or BULK_BATCH_SIZE
+    rows = itertools.starmap(_import_row, enumerate(projects, 1))
+    conn = _bulk_connection()
+    count = 0
+    try:
+        while batch := list(itertools.islice(rows, batch_size)):
+            if any(len(row) > 3 for row in batch):
+                batch = [row + (None,) * (len(_INSERT_COLUMNS) - len(row)) for row in batch]
+            try:
+                run_write(lambda conn: _insert_project_rows(conn, batch), conn)
+            except (sqlite3.InterfaceError, sqlite3.ProgrammingError) as error:
+                # Looked for only once SQLite refuses a batch, so good records pay nothing for the check
+                bad_record = _unbindable_record(count + 1, batch)
+                if bad_record is None:
+                    raise
+                raise bad_record from error
+            count += len(batch)
+            if progress is not None:
+                progress(count)
+    finally:
+        conn.close()
+        _project_cache.clear()
+    return count
+
+def export_projects(batch_size=None, progress=None):
+    """Yield every project as a tuple of EXPORT_COLUMNS, oldest first, straight off one cursor
+
+    One statement reads a consistent snapshot, batch_size rows per fetch.
+    progress, if given, is called with the running count after each fetch.
+    """
+    conn = _bulk_connection()
+    try:
+        cursor = conn.execute(f'SELECT {", ".join(EXPORT_COLUMNS)} FROM projects ORDER BY id')
+        count = 0
+        while rows := cursor.fetchmany(batch_size or BULK_BATCH_SIZE):
+            yield from rows
+            count += len(rows)
+            if progress is not None:
+                progress(count)
+    finally:
+        conn.close()
+
+def read_project_file(file, file_format):
+    """Yield project dicts from an open 'csv' (with a header row) or 'jsonl' text file, a line at a time"""
+    if file_format == 'csv':
+        yield from csv.DictReader(file)
+        return
+    # raw_decode skips the whitespace scans json.loads makes around every value, about half its cost here
+    decode = json.JSONDecoder().raw_decode
+    for number, line in enumerate(file, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            project, end = decode(line)
+        except ValueError as error:
+            raise ValueError(f'Line {number}: {error}') from None
+        if end != len(line) or not isinstance(project, dict):
+            raise ValueError(f'Line {number}: expected one JSON object')
+        yield project
+
+def write_project_file(file, file_format, rows):
+    """Write EXPORT_COLUMNS tuples to an open text file as 'csv' (with a header row) or 'jsonl'"""
+    if file_format == 'csv':
+        writer = csv.writer(file)
+        writer.writerow(EXPORT_COLUMNS)
+        writer.writerows(rows)
+        return
+    # One encoder for every row: json.dumps with options builds a new one per call
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    for row in rows:
+        file.write(encode(dict(zip(EXPORT_COLUMNS, row))) + '\n')
+
+def enqueue_job(name, payload, run_at, max_attempts):
+    """Persist a job to run at run_at (Unix time); payload must be JSON-serializable"""
+    cursor = run_write(lambda conn: conn.execute('''
+        INSERT INTO jobs (name, payload, max_attempts, run_at) VALUES (?, ?, ?, ?)
+    ''', (name, json.dumps(payload), max_attempts, run_at)))
+    return cursor.lastrowid
+
+def enqueue_jobs(name, payloads, run_at, max_attempts):
+    """Persist one job per payload in a single transaction; returns their new IDs"""
+    rows = [(name, json.dumps(payload), max_attempts, run_at) for payload in payloads]
+    if not rows:
+        return []
+    
+    def work(conn):
+        conn.executemany('''
+            INSERT INTO jobs (name, payload, max_attempts, run_at) VALUES (?, ?, ?, ?)
+        ''', rows)
+        return conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+    
+    last_id = run_write(work)
+    return list(range(last_id - len(rows) + 1, last_id + 1))
+
+def claim_job(now, lease):
+    """Atomically take the oldest due job for lease seconds; jobs whose lease ran out are taken again
+
+    Returns the claimed row (attempts already counts this run), or None if nothing is due.
+    """
+    # Idle workers poll this every JOBS_POLL_INTERVAL: a plain read first, so an empty
+    # queue costs them no write lock and no BEGIN IMMEDIATE
+    conn = get_db_connection()
+    due = conn.execute('''
+        SELECT 1 FROM jobs
+        WHERE (status = 'queued' AND run_at <= ?) OR (status = 'running' AND locked_until <= ?)
+        LIMIT 1
+    ''', (now, now)).fetchone()
+    if due is None:
+        return None
+    return run_write(lambda conn: conn.execute('''
+        UPDATE jobs
+        SET status = 'running', attempts = attempts + 1, locked_until = ?
+        WHERE id = (
+            SELECT id FROM jobs
+            WHERE (status = 'queued' AND run_at <= ?) OR (status = 'running' AND locked_until <= ?)
+            ORDER BY run_at, id
+            LIMIT 1
+        )
+        RETURNING *
+    ''', (now + lease, now, now)).fetchone())
+
+def complete_job(job_id):
+    """Remove a job that ran successfully"""
+    run_write(lambda conn: conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,)))
+
+def retry_job(job_id, error, run_at):
+    """Put a failed job back in the queue to run again at run_at"""
+    run_write(lambda conn: conn.execute('''
+        UPDATE jobs SET status = 'queued', run_at = ?, locked_until = NULL, last_error = ? WHERE id = ?
+    ''', (run_at, error, job_id)))
+
+def fail_job(job_id, error):
+    """Park a job that used up its attempts; failed jobs are kept for inspection"""
+    run_write(lambda conn: conn.execute('''
+        UPDATE jobs SET status = 'failed', locked_until = NULL, last_error = ? WHERE id = ?
+    ''', (error, job_id)))
+
+def get_job(job_id):
+    """Retrieve a job by its ID (None once it has completed)"""
+    conn = get_db_connection()
+    return conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+
+def count_jobs():
+    """Number of jobs in each status"""
+    conn = get_db_connection()
+    return dict(conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+
+def insert_messages(messages):
+    """Insert many contact messages with one executemany in a single transaction; returns their new IDs
+
+    Each message is a dict with name, email, subject, message and created_at.
+    """
+    rows = [(m['name'], m['email'], m['subject'], m['message'], m['created_at']) for m in messages]
+    if not rows:
+        return []
+    
+    def work(conn):
+        conn.executemany('''
+            INSERT INTO messages (name, email, subject, message, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', rows)
+        return conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+    
+    last_id = run_write(work)
+    return list(range(last_id - len(rows) + 1, last_id + 1))
+
+def get_messages(limit=50):
+    """The most recent contact messages, newest first"""
+    conn = get_db_connection()
+    return conn.execute(
+        'SELECT * FROM messages ORDER BY created_at DESC, id DESC LIMIT ?', (limit,)
+    ).fetchall()
+
+def count_messages():
+    """Number of stored contact messages"""
+    conn = get_db_connection()
+    return conn.execute('SELECT COUNT(*) FROM messages').fetchone()[0]
+
+# Column references in a WHERE clause that an index could serve (optionally table-qualified)
+_FILTER_COLUMN = re.compile(r'(?:\w+\.)?(\w+)\s*(?:=|<|>|!=|\bIN\b|\bLIKE\b|\bBETWEEN\b|\bIS\b)', re.IGNORECASE)
+_WHERE_CLAUSE = re.compile(r'\bWHERE\b(.*?)(?:\bGROUP BY\b|\bORDER BY\b|\bLIMIT\b|\bRETURNING\b|$)', re.IGNORECASE | re.DOTALL)
+_ORDER_CLAUSE = re.compile(r'\bORDER BY\b(.*?)(?:\bLIMIT\b|\bRETURNING\b|$)', re.IGNORECASE | re.DOTALL)
+_PLAN_TABLE = re.compile(r'^\s*(SCAN|SEARCH) (\w+)(.*)$')
+
+def _index_covers(conn, table, columns):
+    """Whether an existing index on table starts with exactly these columns"""
+    for index in conn.execute(f'PRAGMA index_list({table})').fetchall():
+        indexed = [row['name'] for row in conn.execute(f"PRAGMA index_info('{index['name']}')").fetchall()]
+        if indexed[:len(columns)] == columns:
+            return True
+    return False
+
+def recommend_indexes(conn, sql, plan=None):
+    """CREATE INDEX statements that would spare a statement its full-table scans or temporary sort
+
+    A heuristic read of the plan and the statement's WHERE and ORDER BY columns:
+    filtered columns first, then sort columns, for tables the plan scans in full
+    or sorts in a temporary B-tree. Nothing is suggested when an existing index
+    already starts with those columns.
+    """
+    plan = explain(conn, sql) if plan is None else plan
+    sorts = any('USE TEMP B-TREE FOR ORDER BY' in line for line in plan)
+    tables = []
+    for line in plan:
+        match = _PLAN_TABLE.match(line)
+        # Any SCAN reads the whole table, even one walking an index for its ORDER BY
+        if match and (sorts or match.group(1) == 'SCAN') and 'VIRTUAL TABLE' not in match.group(3):
+            tables.append(match.group(2))
+    where = _WHERE_CLAUSE.search(sql)
+    order = _ORDER_CLAUSE.search(sql)
+    filters = _FILTER_COLUMN.findall(where.group(1)) if where else []
+    ordering = [term.split()[0].split('.')[-1] for term in order.group(1).split(',') if term.strip()] if order else []
+    
+    recommendations = []
+    for table in dict.fromkeys(tables):
+        existing = {row['name'] for row in conn.execute(f'PRAGMA table_info({table})').fetchall()}
+        columns = list(dict.fromkeys(c for c in filters + ordering if c in existing))
+        if columns and not _index_covers(conn, table, columns):
+            recommendations.append(
+                f'CREATE INDEX idx_{table}_{"_".join(columns)} ON {table} ({", ".join(columns)})'
+            )
+    return recommendations
+
+def slow_query_report(log_path=None, top=10):
+    """The statements in the slow-query log that cost the most in total, worst first
+
+    Each entry has sql, count, total_ms, max_ms and the plan from its latest occurrence.
+    """
+    if not (log_path or SLOW_QUERY_LOG):
+        raise FileNotFoundError('No slow-query log is configured (DB_SLOW_QUERY_LOG)')
+    statements = {}
+    with open(log_path or SLOW_QUERY_LOG, encoding='utf-8') as log:
+        for line in log:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            stats = statements.setdefault(entry['sql'], {'sql': entry['sql'], 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            stats['count'] += 1
+            stats['total_ms'] += entry['ms']
+            stats['max_ms'] = max(stats['max_ms'], entry['ms'])
+            stats['plan'] = entry['plan']
+    return sorted(statements.values(), key=lambda stats: stats['total_ms'], reverse=True)[:top]
+
+def _file_format(path, file_format):
+    """The format named on the command line, else the one the file extension implies"""
+    if file_format:
+        return file_format
+    extension = os.path.splitext(path)[1].lower()
+    return {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}.get(extension)
+
+def _open_project_file(path, mode):
+    """Open a CSV/JSONL file for streaming, with - meaning stdin or stdout"""
+    if path == '-':
+        return open((sys.stdin if mode == 'r' else sys.stdout).fileno(), mode, encoding='utf-8', newline='', closefd=False)
+    return open(path, mode, encoding='utf-8', newline='')
+
+
+class _Progress:
+    """Reports a running row count and throughput on stderr, at most once per interval"""
+
+    def __init__(self, verb, interval=1.0):
+        self.verb = verb
+        self.interval = interval
+        self.count = 0
+        self.started = self.reported = time.perf_counter()
+
+    def __call__(self, count):
+        self.count = count
+        now = time.perf_counter()
+        if now - self.reported >= self.interval:
+            self.reported = now
+            print(f'{self.verb} {count} projects ({count / (now - self.started):,.0f} rows/s)', file=sys.stderr)
+
+    def done(self):
+        seconds = time.perf_counter() - self.started
+        rate = self.count / max(seconds, 1e-9)
+        print(f'{self.verb} {self.count} projects in {seconds:.1f} s ({rate:,.0f} rows/s)', file=sys.stderr)
+
+
+def _add_bulk_commands(commands):
+    """The import and export subparsers"""
+    for name, direction, stream in (('import', 'from', 'stdin'), ('export', 'to', 'stdout')):
+        bulk = commands.add_parser(name, help=f'stream projects {direction} a CSV or JSONL file')
+        bulk.add_argument('path', help=f'file path, or - for {stream}')
+        bulk.add_argument('--format', choices=('csv', 'jsonl'), help='default: from the file extension')
+        bulk.add_argument('--batch-size', type=int, default=BULK_BATCH_SIZE,
+                          help=f'rows per transaction or fetch (default: {BULK_BATCH_SIZE})')
+
+def _bulk_command(parser, args):
+    """The import and export subcommands; returns the exit status"""
+    file_format = _file_format(args.path, args.format)
+    if file_format is None:
+        parser.error(f'cannot tell the format of {args.path}; pass --format csv or --format jsonl')
+    progress = _Progress('Imported' if args.command == 'import' else 'Exported')
+    if args.command == 'import':
+        init_database()
+        with _open_project_file(args.path, 'r') as file:
+            try:
+                import_projects(read_project_file(file, file_format), args.batch_size, progress)
+            except (ValueError, csv.Error) as error:
+                print(f'Import stopped after {progress.count} projects: {error}', file=sys.stderr)
+                return 1
+    else:
+        with _open_project_file(args.path, 'w') as file:
+            write_project_file(file, file_format, export_projects(args.batch_size, progress))
+    progress.done()
+    return 0
+
+def _slow_queries_command(conn, args):
+    """The slow-queries subcommand; returns the exit status"""
+    try:
+        report = slow_query_report(args.log, args.top)
+    except FileNotFoundError:
+        if not args.log:
+            print('No slow-query log to read: set DB_SLOW_QUERY_LOG, or pass --log')
+        else:
+            print(f'No slow queries logged yet ({args.log} does not exist)')
+        return 0
+    if not report:
+        print(f'No slow queries in {args.log}')
+    for rank, stats in enumerate(report, 1):
+        print(f"{rank:>2}. {stats['count']} x, {stats['total_ms']:.1f} ms total, {stats['max_ms']:.1f} ms max")
+        print(f"    {stats['sql']}")
+        # Plan as it is now, so indexes added since the query was logged are taken into account
+        plan = explain(conn, stats['sql']) or stats['plan']
+        for line in plan:
+            print(f'      {line}')
+        for recommendation in recommend_indexes(conn, stats['sql'], plan):
+            print(f'    Suggested: {recommendation};')
+    return 0
+
+def main(argv=None):
+    """Command line: initialize the schema, bulk import/export projects, report slow queries, or explain a statement"""
+    global DB_NAME
+    parser = argparse.ArgumentParser(prog='python DAL.py', description='Database setup and query diagnostics')
+    parser.add_argument('--db', default=DB_NAME, help=f'database file (default: {DB_NAME})')
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('init', help='create or upgrade the schema (the default)')
+    slow = commands.add_parser('slow-queries', help='top statements from the slow-query log, with index suggestions')
+    slow.add_argument('--log', default=SLOW_QUERY_LOG, help='slow-query log (default: DB_SLOW_QUERY_LOG)')
+    slow.add_argument('--top', type=int, default=10, help='how many statements to show')
+    explain_command = commands.add_parser('explain', help='show the query plan for a statement, with index suggestions')
+    explain_command.add_argument('sql')
+    _add_bulk_commands(commands)
+    args = parser.parse_args(argv)
+    DB_NAME = args.db
+    
+    if args.command in (None, 'init'):
+        init_database()
+        print("Database initialized successfully!")
+        return 0
+    
+    if args.command in ('import', 'export'):
+        return _bulk_command(parser, args)
+    
+    conn = get_db_connection()
+    if args.command == 'explain':
+        print('\n'.join(explain(conn, args.sql)) or 'No plan: the statement could not be prepared')
+        for recommendation in recommend_indexes(conn, args.sql):
+            print(f'Suggested: {recommendation};')
+        return 0
+    
+    return _slow_queries_command(conn, args)
 
-# Initialize database when module is imported
 if __name__ == '__main__':
-    init_database()
-    print("Database initialized successfully!")
+    sys.exit(main())
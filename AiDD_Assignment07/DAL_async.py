@@ -0,0 +1,99 @@
+"""
+Async Data Access Layer for Projects Database
+Coroutine mirrors of the DAL functions. The blocking sqlite3 work runs on a
+dedicated thread pool, so an event loop serving many idle connections never
+stalls on the database.
+"""
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import DAL
+
+# Threads reserved for database calls; each borrows a pooled connection only for the call's duration
+EXECUTOR_WORKERS = int(os.environ.get('DB_EXECUTOR_WORKERS', DAL.POOL_SIZE))
+
+_executor = None
+_executor_lock = threading.Lock()
+_executor_pid = None
+
+def get_executor():
+    """Return this process's database executor, creating it on first use"""
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix='dal')
+                _executor_pid = os.getpid()
+    return _executor
+
+def shutdown():
+    """Stop the executor after in-flight calls finish (call on ASGI lifespan shutdown)"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+def _call(func, args, kwargs):
+    """Run a DAL function on an executor thread and hand its connection straight back to the pool"""
+    try:
+        return func(*args, **kwargs)
+    finally:
+        DAL.release_connection()
+
+async def run(func, *args, **kwargs):
+    """Await any blocking DAL function on the database executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(_call, func, args, kwargs))
+
+async def init_database():
+    """Initialize the database and create the projects table if it doesn't exist"""
+    return await run(DAL.init_database)
+
+async def get_all_projects():
+    """Retrieve all projects from the database"""
+    return await run(DAL.get_all_projects)
+
+async def get_projects_page(limit, cursor=None):
+    """Retrieve one keyset page of projects; returns (projects, next_cursor)"""
+    return await run(DAL.get_projects_page, limit, cursor)
+
+async def get_project_by_id(project_id):
+    """Retrieve a single project by its ID"""
+    return await run(DAL.get_project_by_id, project_id)
+
+async def get_projects_version():
+    """Return the projects change counter and when it last moved"""
+    return await run(DAL.get_projects_version)
+
+async def search_projects(query, limit=20):
+    """Full-text search over titles and descriptions, best match first"""
+    return await run(DAL.search_projects, query, limit)
+
+async def insert_project(title, description, image_filename):
+    """Insert a new project into the database"""
+    return await run(DAL.insert_project, title, description, image_filename)
+
+async def insert_projects(projects):
+    """Insert many projects in a single transaction; returns their new IDs"""
+    return await run(DAL.insert_projects, list(projects))
+
+async def update_project(project_id, title, description, image_filename):
+    """Update an existing project"""
+    return await run(DAL.update_project, project_id, title, description, image_filename)
+
+async def update_projects(updates):
+    """Apply many partial updates in a single transaction"""
+    return await run(DAL.update_projects, list(updates))
+
+async def delete_project(project_id):
+    """Delete a project from the database by its ID"""
+    return await run(DAL.delete_project, project_id)
+
+async def delete_projects(project_ids):
+    """Delete many projects by ID in a single transaction"""
+    return await run(DAL.delete_projects, list(project_ids))
@@ -0,0 +1,157 @@
+"""
+JSON REST API for projects
+Paginated reads plus batch create/update/delete, each batch committed as one transaction
+"""
+
+from flask import Blueprint, abort, current_app, jsonify, request
+from markupsafe import Markup, escape
+from werkzeug.exceptions import HTTPException
+
+import DAL
+import images
+
+api = Blueprint('api', __name__, url_prefix='/api')
+
+PROJECT_FIELDS = ('title', 'description', 'image_filename')
+
+
+def project_to_dict(project):
+    """Serialize a projects row for JSON output"""
+    return {key: project[key] for key in project.keys()}
+
+def clamp_limit(value, default, maximum):
+    """Page size from a query parameter, falling back to default and kept within 1..maximum"""
+    try:
+        limit = int(value) if value not in (None, '') else default
+    except ValueError:
+        limit = default
+    return max(1, min(limit, maximum))
+
+def page_payload(page, next_cursor):
+    """JSON body for one page of projects"""
+    return {'projects': [project_to_dict(p) for p in page], 'next_cursor': next_cursor}
+
+def search_payload(query, results):
+    """JSON body for search results, with snippets turned into escaped, highlighted HTML"""
+    payload = []
+    for project in results:
+        result = project_to_dict(project)
+        result['snippet'] = str(highlight_snippet(project['snippet']))
+        payload.append(result)
+    return {'query': query, 'results': payload}
+
+def highlight_snippet(snippet):
+    """HTML-escape a search snippet and turn its match markers into <mark> tags"""
+    html = str(escape(snippet or ''))
+    return Markup(html.replace(DAL.SNIPPET_START, '<mark>').replace(DAL.SNIPPET_END, '</mark>'))
+
+def json_body():
+    """Parsed JSON request body, or a 400 if it is missing or malformed"""
+    body = request.get_json(silent=True)
+    if body is None:
+        abort(400, description='Request body must be JSON')
+    return body
+
+def as_batch(body):
+    """Accept a single object or a list of objects, enforcing the configured batch limit"""
+    items = body if isinstance(body, list) else [body]
+    if not items:
+        abort(400, description='Batch is empty')
+    if len(items) > current_app.config['API_MAX_BATCH']:
+        abort(400, description=f"Batch exceeds {current_app.config['API_MAX_BATCH']} items")
+    if not all(isinstance(item, dict) for item in items):
+        abort(400, description='Every item must be a JSON object')
+    return items
+
+def check_fields(item, index, required):
+    """Validate one item's project fields: non-empty strings, all present unless partial"""
+    for field in PROJECT_FIELDS:
+        value = item.get(field)
+        if value is None and not required:
+            continue
+        if not isinstance(value, str) or not value.strip():
+            abort(400, description=f'Item {index}: {field} must be a non-empty string')
+
+def id_list(values, what='ids'):
+    """Validate a non-empty list of integer project IDs within the batch limit"""
+    if not isinstance(values, list) or not values:
+        abort(400, description=f'{what} must be a non-empty list')
+    if len(values) > current_app.config['API_MAX_BATCH']:
+        abort(400, description=f"Batch exceeds {current_app.config['API_MAX_BATCH']} items")
+    if not all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+        abort(400, description=f'{what} must all be integers')
+    return values
+
+@api.errorhandler(HTTPException)
+def json_error(error):
+    """Report API errors as JSON instead of HTML pages"""
+    return jsonify(error=error.description), error.code
+
+# Flask prefers handlers registered by status code, so the app's HTML 404/500 pages
+# would otherwise win over the class-based handler above
+for code in (404, 500):
+    api.register_error_handler(code, json_error)
+
+@api.route('/projects', methods=['GET'])
+def list_projects():
+    """One page of projects, newest first; follow next_cursor for the rest"""
+    cursor = request.args.get('cursor') or None
+    limit = clamp_limit(
+        request.args.get('limit'),
+        current_app.config['PROJECTS_PER_PAGE'],
+        current_app.config['PROJECTS_MAX_PER_PAGE'],
+    )
+    try:
+        page, next_cursor = DAL.get_projects_page(limit, cursor)
+    except ValueError as error:
+        abort(400, description=str(error))
+    return jsonify(page_payload(page, next_cursor))
+
+@api.route('/search', methods=['GET'])
+def search():
+    """Full-text search over projects, best match first, with highlighted snippets"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        abort(400, description='q is required')
+    limit = clamp_limit(
+        request.args.get('limit'),
+        current_app.config['SEARCH_RESULTS_LIMIT'],
+        current_app.config['PROJECTS_MAX_PER_PAGE'],
+    )
+    return jsonify(search_payload(query, DAL.search_projects(query, limit)))
+
+@api.route('/projects/<int:project_id>', methods=['GET'])
+def get_project(project_id):
+    """A single project by ID"""
+    project = DAL.get_project_by_id(project_id)
+    if project is None:
+        abort(404, description=f'Project {project_id} not found')
+    return jsonify(project_to_dict(project))
+
+@api.route('/projects', methods=['POST'])
+def create_projects():
+    """Create one project or a whole array of them in a single transaction"""
+    items = as_batch(json_body())
+    for index, item in enumerate(items):
+        check_fields(item, index, required=True)
+    ids = DAL.insert_projects(items)
+    return jsonify(ids=ids, created=len(ids)), 201
+
+@api.route('/projects', methods=['PATCH'])
+def update_projects():
+    """Partially update many projects; each item needs an id plus the fields to change"""
+    items = as_batch(json_body())
+    id_list([item.get('id') for item in items])
+    for index, item in enumerate(items):
+        check_fields(item, index, required=False)
+    return jsonify(updated=DAL.update_projects(items))
+
+@api.route('/projects', methods=['DELETE'])
+def delete_projects():
+    """Delete every project whose ID is listed in {"ids": [...]}"""
+    body = json_body()
+    ids = id_list(body.get('ids') if isinstance(body, dict) else None)
+    image_filenames = DAL.get_image_filenames(ids)
+    deleted = DAL.delete_projects(ids)
+    images.schedule_removal(image_filenames)
+    return jsonify(deleted=deleted)
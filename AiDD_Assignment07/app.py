@@ -4,38 +4,223 @@ Author: Aneesh Yaramati
 Description: Data Engineering & Analytics Professional Portfolio
 """
 
-from flask import Flask, render_template, request, redirect, url_for
+from flask import Flask, render_template, request, redirect, url_for, abort, stream_template
+from jinja2 import FileSystemBytecodeCache
 import datetime
+import hashlib
+import itertools
+import os
 import DAL
+import images
+import mail  # noqa: F401 -- registers the send_contact_email task
+from jobs import queue as job_queue
+from messages import MessageBuffer
+from metrics import Metrics
+from profiler import Profiler
+from api import api, highlight_snippet
+from assets import StaticAssets
+from compression import Compression
+from freeze import Freezer
+from page_cache import PageCache
 
 app = Flask(__name__)
 
+# Opt-in per-request profiles (signed X-Profile header or PROFILE_SAMPLE_RATE); registered first so it sees every hook
+profiler = Profiler(app)
+
+# Route, SQL, template and cache timings at /metrics and in Server-Timing; registered early so it times the other hooks too
+metrics = Metrics(app)
+
+# Multipart uploads are written to disk as they arrive instead of being buffered in memory
+app.request_class = images.UploadRequest
+
+# Pages whose HTML depends only on their template and injected context are rendered once
+page_cache = PageCache(app)
+
+# Fingerprinted, precompressed static files from `python assets.py`, when they have been built
+static_assets = StaticAssets(app)
+
 # Initialize database on startup
 DAL.init_database()
 
+# Hand each request's pooled connection back once the app context ends
+app.teardown_appcontext(DAL.release_connection)
+
 # Configuration
 app.config['SECRET_KEY'] = 'your-secret-key-here-change-in-production'
+app.config['PROJECTS_PER_PAGE'] = 50
+app.config['PROJECTS_MAX_PER_PAGE'] = 500
+app.config['STREAM_CHUNK_SIZE'] = 16 * 1024
+app.config['API_MAX_BATCH'] = 50_000
+app.config['SEARCH_RESULTS_LIMIT'] = 50
+app.config['IMAGES_FOLDER'] = os.path.join(app.static_folder, 'images')
+# Uploads are spooled and checked here, outside the static folder; keep it on the same filesystem
+# as IMAGES_FOLDER so saving an upload is a hard link rather than a copy
+app.config['UPLOAD_SPOOL_FOLDER'] = os.environ.get('UPLOAD_SPOOL_FOLDER', os.path.join(app.instance_path, 'upload_spool'))
+app.config['MAX_CONTENT_LENGTH'] = 32 * 1024 * 1024
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', 'profiles')
+# Signs X-Profile tokens; header-triggered profiling stays off unless it is set
+app.config['PROFILE_SECRET'] = os.environ.get('PROFILE_SECRET') or None
+# Compiled template bytecode, reused by later starts (see create_app); empty to compile in memory only
+app.config['TEMPLATE_CACHE_DIR'] = os.environ.get('TEMPLATE_CACHE_DIR', 'template_cache')
+
+# Outgoing mail for the contact form (sent by a background job, see mail.py)
+app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'localhost')
+app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 25))
+app.config['MAIL_USE_TLS'] = os.environ.get('MAIL_USE_TLS', '') == '1'
+app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')
+app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
+app.config['MAIL_SENDER'] = os.environ.get('MAIL_SENDER', 'portfolio@localhost')
+app.config['MAIL_RECIPIENT'] = os.environ.get('MAIL_RECIPIENT', 'owner@localhost')
+app.config['MAIL_TIMEOUT'] = 10
+
+# Persistent background jobs for mail, image derivatives and frozen pages (see jobs.py)
+job_queue.init_app(app)
+
+# Contact submissions are buffered and stored in batches, one commit per batch (see messages.py)
+message_buffer = MessageBuffer(app)
+
+@message_buffer.after_flush
+def notify_owner(messages):
+    """Queue the owner's notification mail for each stored submission, in one transaction per batch"""
+    job_queue.enqueue_many('send_contact_email', [
+        {key: message[key] for key in ('name', 'email', 'subject', 'message')} for message in messages
+    ])
+
+# Static copies of every page for a plain file server (`python freeze.py`), re-rendered by a job
+# after each project write when FREEZE_DIR is set
+freezer = Freezer(app)
+
+# Negotiate gzip/brotli/zstd for HTML, JSON and other text responses (thresholds in COMPRESS_* config)
+compression = Compression(app)
+
+metrics.register_cache('project', DAL.cache_stats)
+metrics.register_cache('page', page_cache.stats)
+metrics.register_cache('compressed_body', compression.cache.stats)
+metrics.register_collector(compression.collect)
+
+# JSON REST API under /api
+app.register_blueprint(api)
 
 @app.route('/')
+@page_cache.cached
 def index():
     """Home page"""
     return render_template('index.html')
 
 @app.route('/about')
+@page_cache.cached
 def about():
     """About page"""
     return render_template('about.html')
 
 @app.route('/resume')
+@page_cache.cached
 def resume():
     """Resume page"""
     return render_template('resume.html')
 
+def projects_validators():
+    """ETag and Last-Modified for the listing, derived without querying the projects table
+
+    An asset build changes the fingerprinted URLs the page links to, so it moves
+    both: the manifest digest is in context_hash, and its mtime bounds Last-Modified.
+    """
+    version = DAL.get_projects_version()
+    template_mtime = page_cache.template_version()
+    tag = f'{version["generation"]}:{template_mtime}:{page_cache.context_hash()}:{request.path}:{request.query_string!r}'
+    updated_at = datetime.datetime.strptime(version['updated_at'], '%Y-%m-%d %H:%M:%S')
+    last_modified = max(
+        updated_at.replace(tzinfo=datetime.timezone.utc),
+        datetime.datetime.fromtimestamp(int(template_mtime), datetime.timezone.utc),
+        datetime.datetime.fromtimestamp(int(static_assets.modified), datetime.timezone.utc),
+    )
+    return hashlib.sha1(tag.encode()).hexdigest(), last_modified
+
+def not_modified(etag, last_modified):
+    """Return a 304 response if the client's cached copy is still current, otherwise None"""
+    response = app.response_class()
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.make_conditional(request)
+    return response if response.status_code == 304 else None
+
+def buffered(chunks, size):
+    """Coalesce Jinja's many small output chunks into socket-sized writes"""
+    buffer, length = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+def stream_all_projects():
+    """Render the complete listing incrementally straight off the database cursor"""
+    rows = DAL.iter_projects(summaries=True)
+    first = next(rows, None)
+    # Peek one row so the template's empty state still works with a lazy iterator
+    listing = itertools.chain([first], rows) if first is not None else []
+    chunks = stream_template(
+        'projects.html', projects=listing, cursor=None, next_cursor=None, limit=None
+    )
+    return app.response_class(buffered(chunks, app.config['STREAM_CHUNK_SIZE']), mimetype='text/html')
+
 @app.route('/projects')
-def projects():
-    """Projects page - displays all projects from database"""
-    all_projects = DAL.get_all_projects()
-    return render_template('projects.html', projects=all_projects)
+@app.route('/projects/page/<cursor>')
+def projects(cursor=None):
+    """Projects page - displays all projects from database
+
+    Later pages are addressed by path (/projects/page/<cursor>), so each is a
+    plain file once frozen; ?cursor= links from before keep working.
+    """
+    etag, last_modified = projects_validators()
+    cached = not_modified(etag, last_modified)
+    if cached is not None:
+        return cached
+    
+    search_query = request.args.get('q', '').strip()
+    if search_query:
+        results = DAL.search_projects(search_query, app.config['SEARCH_RESULTS_LIMIT'])
+        response = app.make_response(render_template(
+            'projects.html', projects=results, search_query=search_query,
+            cursor=None, next_cursor=None, limit=None
+        ))
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        return response
+    
+    if request.args.get('stream', type=int):
+        response = stream_all_projects()
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        return response
+    
+    cursor = cursor or request.args.get('cursor') or None
+    limit = request.args.get('limit', app.config['PROJECTS_PER_PAGE'], type=int)
+    limit = max(1, min(limit, app.config['PROJECTS_MAX_PER_PAGE']))
+    try:
+        page, next_cursor = DAL.get_projects_page(limit, cursor, summaries=True)
+    except ValueError:
+        abort(400)
+    
+    response = app.make_response(render_template(
+        'projects.html', projects=page, cursor=cursor, next_cursor=next_cursor, limit=limit
+    ))
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    return response
+
+@app.route('/projects/<int:project_id>')
+def project_detail(project_id):
+    """One project with its full description (the listing shows a summary)"""
+    project = DAL.get_project_by_id(project_id)
+    if project is None:
+        abort(404)
+    return render_template('project.html', project=project)
 
 @app.route('/add_project', methods=['GET', 'POST'])
 def add_project():
@@ -45,10 +230,22 @@ def add_project():
         title = request.form.get('title')
         description = request.form.get('description')
         image_filename = request.form.get('image_filename')
+        upload = request.files.get('image')
+        uploaded = bool(upload and upload.filename)
         
-        # Insert into database
-        if title and description and image_filename:
-            DAL.insert_project(title, description, image_filename)
+        # Text fields are checked first, so a form that is turned away leaves no upload behind
+        if title and description and (uploaded or image_filename):
+            # An uploaded file takes precedence over naming an existing image
+            if uploaded:
+                try:
+                    image_filename = images.save_upload(upload)
+                except images.InvalidImage as error:
+                    return render_template('add_project.html', error=str(error)), 400
+            
+            # Insert into database
+            project_id = DAL.insert_project(title, description, image_filename)
+            if uploaded:
+                images.schedule_derivatives(project_id, image_filename)
             return redirect(url_for('projects'))
         
     return render_template('add_project.html')
@@ -56,7 +253,9 @@ def add_project():
 @app.route('/delete_project/<int:project_id>', methods=['POST'])
 def delete_project(project_id):
     """Delete a project by ID"""
-    DAL.delete_project(project_id)
+    project = DAL.get_project_by_id(project_id)
+    if DAL.delete_project(project_id):
+        images.schedule_removal([project['image_filename']])
     return redirect(url_for('projects'))
 
 @app.route('/contact', methods=['GET', 'POST'])
@@ -69,21 +268,33 @@ def contact():
         subject = request.form.get('subject')
         message = request.form.get('message')
         
-        # In a production app, you would:
-        # 1. Validate the data
-        # 2. Send email or save to database
-        # 3. Add CSRF protection
+        # Stored with the next batch, which also queues the notification mail (see notify_owner)
+        if email and message:
+            message_buffer.add(name, email, subject, message)
         
-        # For now, redirect to thank you page
+        # Still to do in production: CSRF protection
         return redirect(url_for('thankyou'))
     
     return render_template('contact.html')
 
 @app.route('/thankyou')
+@page_cache.cached
 def thankyou():
     """Thank you page after form submission"""
     return render_template('thankyou.html')
 
+app.add_template_filter(highlight_snippet, 'highlight')
+app.add_template_filter(images.srcset, 'srcset')
+
+@app.after_request
+def add_validators(response):
+    """Give any other successful GET a strong ETag from its body and honour conditional requests"""
+    if (request.method in ('GET', 'HEAD') and response.status_code == 200
+            and not response.is_streamed and 'ETag' not in response.headers):
+        response.add_etag()
+        response.make_conditional(request)
+    return response
+
 @app.context_processor
 def inject_year():
     """Inject current year into all templates"""
@@ -99,8 +310,47 @@ def internal_server_error(e):
     """Custom 500 error page"""
     return render_template('index.html'), 500
 
+def use_bytecode_cache():
+    """Keep compiled templates in TEMPLATE_CACHE_DIR, so a restart loads bytecode instead of parsing again
+
+    Entries are keyed by a checksum of the template source, so edited
+    templates are recompiled rather than served stale.
+    """
+    folder = app.config['TEMPLATE_CACHE_DIR']
+    if not folder:
+        app.jinja_env.bytecode_cache = None
+        return
+    os.makedirs(folder, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(folder)
+
+def precompile_templates():
+    """Compile every template into the Jinja environment's cache so no request pays for it"""
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+def create_app(config=None):
+    """Application factory for production servers (see wsgi.py)
+
+    Applies config overrides, prepares the database and compiles all
+    templates, loading them from the bytecode cache when an earlier start
+    left them there. Under gunicorn's preload_app this runs once in the
+    master, so forked workers start warm. Pooled connections are closed
+    afterwards because SQLite handles must not be shared across a fork.
+    """
+    if config:
+        app.config.update(config)
+    DAL.init_database()
+    use_bytecode_cache()
+    precompile_templates()
+    DAL.close_pool()
+    return app
+
 if __name__ == '__main__':
     # Development server configuration
-    # In production, use a proper WSGI server like Gunicorn
+    # In production, use Gunicorn with gunicorn.conf.py (see wsgi.py)
     # Changed to port 8001 to avoid conflict with AirPlay Receiver on macOS
-    app.run(debug=True, host='0.0.0.0', port=8001)
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        # Pick up jobs left from a previous run (only in the reloader's serving child)
+        job_queue.start()
+    use_bytecode_cache()
+    app.run(debug=True, host='0.0.0.0', port=int(os.environ.get('PORT', 8001)))
@@ -0,0 +1,133 @@
+"""
+ASGI entry point for high-concurrency serving
+Run with: uvicorn asgi:app --host 0.0.0.0 --port 8001
+
+The hot JSON reads (/api/projects, /api/projects/<id>, /api/search) are served
+by async handlers on the event loop, awaiting DAL_async, so thousands of idle
+or slow keep-alive connections cost no threads. Every other route falls
+through to the Flask app, which runs on a small bounded thread pool.
+"""
+
+import os
+import re
+import urllib.parse
+
+from werkzeug.exceptions import BadRequest, HTTPException, InternalServerError, NotFound
+
+# Threads running the Flask fallback, threads awaiting DB calls, the job workers and the
+# contact-message flusher; each may hold one pooled connection
+WSGI_THREADS = int(os.environ.get('WSGI_THREADS', 8))
+os.environ.setdefault('DB_EXECUTOR_WORKERS', '4')
+_background_threads = int(os.environ.get('JOBS_WORKERS', 2)) + 1
+os.environ.setdefault('DB_POOL_SIZE', str(WSGI_THREADS + int(os.environ['DB_EXECUTOR_WORKERS']) + _background_threads))
+
+from a2wsgi import WSGIMiddleware  # noqa: E402
+
+import DAL  # noqa: E402
+import DAL_async  # noqa: E402
+from api import clamp_limit, page_payload, project_to_dict, search_payload  # noqa: E402
+from app import create_app  # noqa: E402
+from jobs import queue as job_queue  # noqa: E402
+
+flask_app = create_app()
+wsgi_app = WSGIMiddleware(flask_app, workers=WSGI_THREADS)
+
+_PROJECT_PATH = re.compile(r'^/api/projects/(\d+)$')
+
+
+async def send_json(send, payload, status=200):
+    body = flask_app.json.dumps(payload).encode() + b'\n'
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def list_projects(args):
+    """One page of projects, newest first; follow next_cursor for the rest"""
+    limit = clamp_limit(
+        args.get('limit'),
+        flask_app.config['PROJECTS_PER_PAGE'],
+        flask_app.config['PROJECTS_MAX_PER_PAGE'],
+    )
+    try:
+        page, next_cursor = await DAL_async.get_projects_page(limit, args.get('cursor') or None)
+    except ValueError as error:
+        raise BadRequest(description=str(error))
+    return page_payload(page, next_cursor)
+
+
+async def search(args):
+    """Full-text search over projects, best match first, with highlighted snippets"""
+    query = args.get('q', '').strip()
+    if not query:
+        raise BadRequest(description='q is required')
+    limit = clamp_limit(
+        args.get('limit'),
+        flask_app.config['SEARCH_RESULTS_LIMIT'],
+        flask_app.config['PROJECTS_MAX_PER_PAGE'],
+    )
+    return search_payload(query, await DAL_async.search_projects(query, limit))
+
+
+async def get_project(project_id):
+    """A single project by ID"""
+    project = await DAL_async.get_project_by_id(project_id)
+    if project is None:
+        raise NotFound(description=f'Project {project_id} not found')
+    return project_to_dict(project)
+
+
+def async_route(scope):
+    """The async handler for a request as a no-argument coroutine factory, or None to defer to Flask"""
+    if scope['method'] != 'GET':
+        return None
+    path = scope['path']
+    args = dict(urllib.parse.parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+    if path == '/api/projects':
+        return lambda: list_projects(args)
+    if path == '/api/search':
+        return lambda: search(args)
+    match = _PROJECT_PATH.match(path)
+    if match:
+        return lambda: get_project(int(match.group(1)))
+    return None
+
+
+async def lifespan(receive, send):
+    """Start the database and job workers on startup; flush buffered writes, stop workers and close connections on shutdown"""
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await DAL_async.init_database()
+            job_queue.start()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            flask_app.extensions['messages'].close()
+            job_queue.stop(timeout=flask_app.config['JOBS_LEASE'])
+            DAL_async.shutdown()
+            DAL.close_pool()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    handler = async_route(scope) if scope['type'] == 'http' else None
+    if handler is None:
+        return await wsgi_app(scope, receive, send)
+    try:
+        payload = await handler()
+    except HTTPException as error:
+        return await send_json(send, {'error': error.description}, error.code)
+    except Exception:
+        flask_app.logger.exception('Unhandled error in %s', scope['path'])
+        error = InternalServerError()
+        return await send_json(send, {'error': error.description}, error.code)
+    await send_json(send, payload)
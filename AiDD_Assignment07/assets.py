@@ -0,0 +1,240 @@
+"""
+Static asset pipeline
+Minifies CSS/JS, fingerprints every static file into static/dist with a manifest,
+and writes gzip/brotli variants that are served according to Accept-Encoding.
+
+Build with: python assets.py
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # brotli variants are skipped; gzip still works
+    brotli = None
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+HASH_LENGTH = 10
+
+# Text formats worth compressing; JPEG/PNG/WebP are compressed already
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.xml', '.html'}
+
+# Content-Encoding and file suffix of each precompressed variant, most preferred first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Fingerprinted URLs change whenever their content does, so clients may keep them for a year
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+_CSS_STRINGS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')')
+_CSS_COMMENTS = re.compile(r'/\*.*?\*/', re.S)
+_CSS_PUNCTUATION = re.compile(r' ?([{};,>]) ?')
+
+
+def minify_css(source):
+    """Strip comments and redundant whitespace, leaving string literals untouched
+
+    Spaces around + and - are kept because calc() needs them.
+    """
+    parts = _CSS_STRINGS.split(source)
+    for index in range(0, len(parts), 2):
+        code = _CSS_COMMENTS.sub('', parts[index])
+        code = ' '.join(code.split())
+        code = _CSS_PUNCTUATION.sub(r'\1', code)
+        parts[index] = code.replace(': ', ':').replace(';}', '}')
+    return ''.join(parts).strip()
+
+
+def minify_js(source):
+    """Drop comment-only lines, indentation and blank lines
+
+    Deliberately conservative: line breaks are kept so automatic semicolon
+    insertion behaves exactly as before, and code lines are never rewritten.
+    """
+    lines, in_comment = [], False
+    for line in source.splitlines():
+        stripped = line.strip()
+        if in_comment:
+            if '*/' in stripped:
+                in_comment = False
+                stripped = stripped.split('*/', 1)[1].strip()
+            else:
+                continue
+        elif stripped.startswith('/*'):
+            if '*/' not in stripped:
+                in_comment = True
+                continue
+            stripped = stripped.split('*/', 1)[1].strip()
+        if stripped and not stripped.startswith('//'):
+            lines.append(stripped)
+    return '\n'.join(lines) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def compress(encoding, data, brotli_quality=11):
+    """Maximum-effort compression for a build step (brotli_quality may trade some for speed)
+
+    Returns None if the encoder is unavailable.
+    """
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if encoding == 'br' and brotli is not None:
+        return brotli.compress(data, quality=brotli_quality)
+    return None
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def build(static_dir):
+    """Minify, fingerprint and precompress every file under static_dir into static_dir/dist
+
+    Returns the manifest, which maps each original filename to its fingerprinted
+    path and lists the precompressed encodings written for each fingerprinted file.
+    """
+    output_dir = os.path.join(static_dir, DIST_DIR)
+    shutil.rmtree(output_dir, ignore_errors=True)
+    assets, precompressed = {}, {}
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != output_dir)
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            filename = os.path.relpath(source, static_dir).replace(os.sep, '/')
+            stem, ext = os.path.splitext(filename)
+            with open(source, 'rb') as f:
+                data = f.read()
+            minifier = MINIFIERS.get(ext.lower())
+            if minifier is not None:
+                data = minifier(data.decode('utf-8')).encode('utf-8')
+            digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+            hashed = f'{DIST_DIR}/{stem}.{digest}{ext}'
+            target = os.path.join(static_dir, hashed)
+            _write(target, data)
+            assets[filename] = hashed
+            if ext.lower() not in COMPRESSIBLE:
+                continue
+            encodings = []
+            for encoding, suffix in ENCODINGS:
+                variant = compress(encoding, data)
+                if variant is not None and len(variant) < len(data):
+                    _write(target + suffix, variant)
+                    encodings.append(encoding)
+            if encodings:
+                precompressed[hashed] = encodings
+    manifest = {'assets': assets, 'precompressed': precompressed}
+    _write(os.path.join(output_dir, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return manifest
+
+
+class StaticAssets:
+    """Emits fingerprinted static URLs from url_for and serves their precompressed variants"""
+
+    def __init__(self, app=None):
+        self.assets = {}
+        self.precompressed = {}
+        self.fingerprinted = set()
+        self.digest = ''
+        self.modified = 0.0
+        self.app = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['static_assets'] = self
+        self.load()
+        app.url_defaults(self.fingerprint)
+        app.context_processor(self.inject_digest)
+        app.view_functions['static'] = self.send_static
+
+    def load(self):
+        """Read the build manifest, if there is one; without it static URLs are left as they are"""
+        path = os.path.join(self.app.static_folder, DIST_DIR, MANIFEST_NAME)
+        try:
+            with open(path) as f:
+                manifest = json.load(f)
+            modified = os.path.getmtime(path)
+        except FileNotFoundError:
+            manifest, modified = {}, 0.0
+        self.assets = manifest.get('assets', {})
+        self.precompressed = manifest.get('precompressed', {})
+        self.fingerprinted = set(self.assets.values())
+        self.digest = hashlib.sha256(json.dumps(self.assets, sort_keys=True).encode()).hexdigest()[:HASH_LENGTH]
+        self.modified = modified
+
+    def inject_digest(self):
+        """Context processor: a digest of the fingerprinted URLs, so validators and cache keys built from
+        the template context (PageCache.context_hash) change with every asset build"""
+        return {'static_digest': self.digest}
+
+    def fingerprint(self, endpoint, values):
+        """url_for hook: swap a static filename for its fingerprinted path (outside debug mode)"""
+        if endpoint != 'static' or self.app.debug:
+            return
+        hashed = self.assets.get(values.get('filename'))
+        if hashed is not None:
+            values['filename'] = hashed
+
+    def negotiate(self, filename):
+        """The best precompressed encoding of filename the client accepts, or None"""
+        available = self.precompressed.get(filename, ())
+        for encoding, suffix in ENCODINGS:
+            if encoding in available and request.accept_encodings[encoding]:
+                return encoding, suffix
+        return None
+
+    def send_static(self, filename):
+        """Static view: fingerprinted files get a precompressed variant and an immutable
+        Cache-Control; anything else is served as Flask normally would"""
+        if filename not in self.fingerprinted:
+            return self.app.send_static_file(filename)
+        chosen = self.negotiate(filename)
+        response = send_from_directory(
+            self.app.static_folder,
+            filename + chosen[1] if chosen else filename,
+            mimetype=mimetypes.guess_type(filename)[0],
+            download_name=os.path.basename(filename),
+            max_age=IMMUTABLE_MAX_AGE,
+        )
+        if chosen:
+            response.content_encoding = chosen[0]
+        if filename in self.precompressed:
+            response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build fingerprinted, precompressed static assets')
+    parser.add_argument('--static-dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'))
+    args = parser.parse_args()
+
+    manifest = build(args.static_dir)
+    if brotli is None:
+        print('brotli is not installed; only gzip variants were written')
+    print(f"{'asset':<40} {'original':>9} {'built':>9} {'gzip':>9} {'br':>9}")
+    for filename, hashed in sorted(manifest['assets'].items()):
+        target = os.path.join(args.static_dir, hashed)
+        sizes = [os.path.getsize(os.path.join(args.static_dir, filename)), os.path.getsize(target)]
+        for _encoding, suffix in ENCODINGS[::-1]:
+            sizes.append(os.path.getsize(target + suffix) if os.path.exists(target + suffix) else None)
+        print(f'{filename:<40} ' + ' '.join(f'{size:>9}' if size is not None else f"{'-':>9}" for size in sizes))
+
+
+if __name__ == '__main__':
+    main()
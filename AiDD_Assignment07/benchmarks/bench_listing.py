@@ -0,0 +1,77 @@
+"""
+Listing projection benchmark
+Compares full projects rows (SELECT * into sqlite3.Row) with the summaries the
+listing page uses (ProjectSummary: id, title, image columns and a description
+cut to DAL.SUMMARY_LENGTH), in time and in Python memory held by the result.
+
+Usage:
+    python benchmarks/bench_listing.py
+    python benchmarks/bench_listing.py --rows 100000 --description-length 2000
+"""
+
+import argparse
+import gc
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import DAL  # noqa: E402
+
+
+def measure(read, repeat):
+    """Median seconds for read(), and the bytes its result keeps alive"""
+    timings = []
+    for _ in range(repeat):
+        DAL._project_cache.clear()
+        started = time.perf_counter()
+        read()
+        timings.append(time.perf_counter() - started)
+    DAL._project_cache.clear()
+    gc.collect()
+    tracemalloc.start()
+    result = read()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return statistics.median(timings), held
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--description-length', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    reads = {
+        'get_all_projects': lambda summaries: DAL.get_all_projects(summaries=summaries),
+        'get_projects_page(50)': lambda summaries: DAL.get_projects_page(50, summaries=summaries)[0],
+        'iter_projects': lambda summaries: sum(1 for _ in DAL.iter_projects(summaries=summaries)),
+    }
+
+    # Whole-table reads are the point here, not something to log
+    DAL.SLOW_QUERY_MS = 0
+    with tempfile.TemporaryDirectory() as workdir:
+        DAL.DB_NAME = os.path.join(workdir, 'bench_listing.db')
+        DAL.init_database()
+        description = ('lorem ipsum dolor sit amet ' * (args.description_length // 27 + 1))[:args.description_length]
+        DAL.insert_projects(
+            {'title': f'Project {i}', 'description': description, 'image_filename': 'bench.svg'}
+            for i in range(args.rows)
+        )
+        print(f'{args.rows} rows, {args.description_length}-character descriptions, summaries of {DAL.SUMMARY_LENGTH}')
+        print(f"{'read':>22} {'rows':>9} {'ms':>9} {'MiB held':>9}")
+        for name, read in reads.items():
+            for label, summaries in (('full', False), ('summaries', True)):
+                seconds, held = measure(lambda: read(summaries), args.repeat)
+                print(f'{name:>22} {label:>9} {seconds * 1000:9.1f} {held / 2**20:9.1f}')
+        DAL.close_pool()
+
+
+if __name__ == '__main__':
+    main()
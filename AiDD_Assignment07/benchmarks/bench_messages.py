@@ -0,0 +1,99 @@
+"""
+Contact message write benchmark
+Compares storing each submission in its own transaction (one commit per
+request) with the write-behind MessageBuffer, which commits once per batch.
+
+Usage:
+    python benchmarks/bench_messages.py
+    python benchmarks/bench_messages.py --submissions 20000 --threads 16 --synchronous FULL
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+
+import DAL  # noqa: E402
+from messages import MessageBuffer  # noqa: E402
+
+
+def submission(n):
+    return {
+        'name': f'Sender {n}',
+        'email': f'sender{n}@example.com',
+        'subject': 'Benchmark',
+        'message': f'Benchmark message {n} ' * 10,
+        'created_at': '2024-01-01 00:00:00',
+    }
+
+
+def run_threads(threads, submissions, submit):
+    """Wall time for threads to make submissions calls to submit(n) between them"""
+    def worker(offset):
+        for n in range(offset, submissions, threads):
+            submit(n)
+        DAL.release_connection()
+
+    pool = [threading.Thread(target=worker, args=(offset,)) for offset in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def bench_per_request(threads, submissions):
+    return run_threads(threads, submissions, lambda n: DAL.insert_messages([submission(n)]))
+
+
+def bench_write_behind(threads, submissions, batch_size, interval):
+    app = Flask(__name__)
+    app.config.update(MESSAGES_BATCH_SIZE=batch_size, MESSAGES_FLUSH_INTERVAL=interval)
+    buffer = MessageBuffer(app)
+
+    def submit(n):
+        item = submission(n)
+        buffer.add(item['name'], item['email'], item['subject'], item['message'])
+
+    started = time.perf_counter()
+    run_threads(threads, submissions, submit)
+    buffer.close()  # count the final flush, so every submission is on disk
+    return time.perf_counter() - started, buffer.stats()['batches']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--submissions', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--interval', type=float, default=0.5)
+    parser.add_argument('--synchronous', nargs='+', default=['NORMAL', 'FULL'],
+                        help='PRAGMA synchronous settings to compare (FULL fsyncs every commit)')
+    args = parser.parse_args()
+
+    print(f"{'synchronous':>12} {'mode':>14} {'submissions/s':>14} {'commits':>8}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for synchronous in args.synchronous:
+            DAL.PRAGMAS['synchronous'] = synchronous
+            for mode in ('per-request', 'write-behind'):
+                DAL.close_pool()
+                DAL.DB_NAME = os.path.join(workdir, f'bench_{synchronous}_{mode}.db')
+                DAL.init_database()
+                if mode == 'per-request':
+                    elapsed, commits = bench_per_request(args.threads, args.submissions), args.submissions
+                else:
+                    elapsed, commits = bench_write_behind(args.threads, args.submissions, args.batch_size, args.interval)
+                assert DAL.count_messages() == args.submissions
+                print(f'{synchronous:>12} {mode:>14} {args.submissions / elapsed:14.0f} {commits:8d}')
+        DAL.close_pool()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Pagination benchmark for the projects listing
+Compares keyset pages (DAL.get_projects_page) with OFFSET paging and the
+full-table listing at growing table sizes.
+
+Usage:
+    python benchmarks/bench_pagination.py
+    python benchmarks/bench_pagination.py --sizes 100 10000 1000000 --limit 50
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import DAL  # noqa: E402
+
+DEFAULT_SIZES = [100, 1_000, 10_000, 100_000, 1_000_000]
+
+
+def populate(rows):
+    """Bulk load rows with one-second spaced timestamps so created_at actually orders them"""
+    conn = DAL.get_db_connection()
+
+    def load(conn):
+        conn.executemany('''
+            INSERT INTO projects (title, description, image_filename, created_at)
+            VALUES (?, ?, ?, datetime('2020-01-01', '+' || ? || ' seconds'))
+        ''', ((f'Project {i}', f'Benchmark description {i}', 'bench.svg', i) for i in range(rows)))
+
+    DAL.run_write(load)
+    return conn
+
+
+def time_call(func, repeat):
+    """Median wall time of func() in milliseconds, bypassing the project cache"""
+    samples = []
+    for _ in range(repeat):
+        DAL._project_cache.clear()
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def bench_size(rows, limit, repeat):
+    conn = populate(rows)
+    deep_offset = max(rows - limit, 0)
+    deep_row = conn.execute('''
+        SELECT created_at, id FROM projects ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET ?
+    ''', (max(deep_offset - 1, 0),)).fetchone()
+    deep_cursor = DAL.encode_cursor(deep_row)
+
+    def offset_page():
+        conn.execute(
+            'SELECT * FROM projects ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?',
+            (limit, deep_offset),
+        ).fetchall()
+
+    results = {
+        'first_page': time_call(lambda: DAL.get_projects_page(limit), repeat),
+        'deep_page': time_call(lambda: DAL.get_projects_page(limit, deep_cursor), repeat),
+        'deep_offset': time_call(offset_page, repeat),
+    }
+    if rows <= 100_000:
+        results['full_listing'] = time_call(DAL.get_all_projects, max(repeat // 5, 1))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=25)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'first page':>12} {'deep page':>12} {'deep OFFSET':>12} {'full list':>12}  (ms)")
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.sizes:
+            DAL.close_pool()
+            DAL.DB_NAME = os.path.join(workdir, f'bench_{rows}.db')
+            DAL.init_database()
+            result = bench_size(rows, args.limit, args.repeat)
+            full = f"{result['full_listing']:12.2f}" if 'full_listing' in result else f"{'skipped':>12}"
+            print(f"{rows:>10} {result['first_page']:12.3f} {result['deep_page']:12.3f} "
+                  f"{result['deep_offset']:12.3f} {full}")
+        DAL.close_pool()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Template compile and render benchmark
+Measures what a fresh process pays to compile every template, without and
+with the on-disk bytecode cache (TEMPLATE_CACHE_DIR), and the steady-state
+cost of rendering each page.
+
+Pass --compare-folder with another copy of templates/ (for example an older
+revision: `git archive <rev> templates | tar -x -C /tmp/old`) to measure it
+alongside the current tree.
+
+Usage:
+    python benchmarks/bench_templates.py
+    python benchmarks/bench_templates.py --compare-folder /tmp/old/templates --renders 2000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jinja2 import FileSystemBytecodeCache, FileSystemLoader  # noqa: E402
+
+import DAL  # noqa: E402
+
+PAGES = ['index.html', 'about.html', 'resume.html', 'contact.html', 'add_project.html', 'thankyou.html', 'projects.html']
+
+
+def fresh_environment(app, folder=None, bytecode_folder=None):
+    """A new Jinja environment like the app's, as a newly started process would have"""
+    env = app.create_jinja_environment()
+    if folder is not None:
+        env.loader = FileSystemLoader(folder)
+    if bytecode_folder is not None:
+        env.bytecode_cache = FileSystemBytecodeCache(bytecode_folder)
+    return env
+
+
+def compile_all(env):
+    started = time.perf_counter()
+    for name in env.list_templates():
+        env.get_template(name)
+    return time.perf_counter() - started
+
+
+def bench_compile(app, folder, repeat):
+    """Median seconds to compile every template from source, and from a warm bytecode cache"""
+    with tempfile.TemporaryDirectory() as bytecode_folder:
+        compile_all(fresh_environment(app, folder, bytecode_folder))
+        cold = [compile_all(fresh_environment(app, folder)) for _ in range(repeat)]
+        warm = [compile_all(fresh_environment(app, folder, bytecode_folder)) for _ in range(repeat)]
+    return statistics.median(cold), statistics.median(warm)
+
+
+def bench_render(app, env, name, context, renders):
+    """Median microseconds per render of one template, inside a request context"""
+    template = env.get_template(name)
+    with app.test_request_context('/'):
+        values = dict(context)
+        app.update_template_context(values)
+        template.render(values)  # warm the fragment cache
+        samples = []
+        for _ in range(renders):
+            started = time.perf_counter()
+            template.render(values)
+            samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--compare-folder', help='another templates folder to measure alongside the current one')
+    parser.add_argument('--repeat', type=int, default=20, help='compile runs per measurement')
+    parser.add_argument('--renders', type=int, default=1000, help='renders per page')
+    parser.add_argument('--projects', type=int, default=50, help='rows on the projects page')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        DAL.DB_NAME = os.path.join(workdir, 'bench_templates.db')
+        from app import app
+
+        DAL.insert_projects(
+            {'title': f'Project {i}', 'description': 'Benchmark project', 'image_filename': 'bench.svg'}
+            for i in range(args.projects)
+        )
+        page, next_cursor = DAL.get_projects_page(args.projects)
+        contexts = {'projects.html': {'projects': page, 'cursor': None, 'next_cursor': next_cursor, 'limit': args.projects}}
+        DAL.close_pool()
+
+        folders = {'current': None}
+        if args.compare_folder:
+            folders['compare'] = args.compare_folder
+
+        print(f"{'templates':>10} {'compile (ms)':>13} {'from bytecode (ms)':>19}")
+        for label, folder in folders.items():
+            cold, warm = bench_compile(app, folder, args.repeat)
+            print(f'{label:>10} {cold * 1000:13.2f} {warm * 1000:19.2f}')
+
+        print()
+        print(f"{'page':>18}" + ''.join(f'{label + " (us)":>16}' for label in folders))
+        envs = {
+            label: app.jinja_env if folder is None else fresh_environment(app, folder)
+            for label, folder in folders.items()
+        }
+        for name in PAGES:
+            timings = [bench_render(app, env, name, contexts.get(name, {}), args.renders) for env in envs.values()]
+            print(f'{name:>18}' + ''.join(f'{timing:16.1f}' for timing in timings))
+
+
+if __name__ == '__main__':
+    main()
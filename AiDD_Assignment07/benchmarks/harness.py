@@ -0,0 +1,109 @@
+"""
+Benchmark harness for test_benchmarks.py
+Times callables, collects results for the session, and compares them with a
+JSON baseline. The pytest options and hooks that drive it live in conftest.py.
+"""
+
+import json
+import os
+import platform
+import sqlite3
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, 'baseline.json')
+RESULTS_PATH = os.path.join(BENCHMARK_DIR, 'results.json')
+
+# Metrics gated against the baseline, and whether a higher value is better
+GATED_METRICS = {
+    'median_ms': False,
+    'p50_ms': False,
+    'rps': True,
+}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(len(sorted_values) * fraction), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def measure(func, setup=None, min_time=0.2, min_runs=5, max_runs=2000):
+    """Call func until min_time has been spent in it (and at least min_runs times); returns timing stats
+
+    setup, if given, runs before every call and is not timed.
+    """
+    samples = []
+    total = 0.0
+    while (len(samples) < min_runs or total < min_time) and len(samples) < max_runs:
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        samples.append(elapsed)
+        total += elapsed
+    samples.sort()
+    return {
+        'runs': len(samples),
+        'median_ms': percentile(samples, 0.50) * 1000,
+        'p95_ms': percentile(samples, 0.95) * 1000,
+        'ops_per_sec': len(samples) / total if total else 0.0,
+    }
+
+
+def environment():
+    """Where the numbers came from; baselines only compare fairly on the same machine"""
+    return {
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'argv': sys.argv[1:],
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def load(path):
+    """A results file's benchmarks, or None if it does not exist"""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as results:
+        return json.load(results)['results']
+
+
+def save(path, results):
+    with open(path, 'w', encoding='utf-8') as output:
+        json.dump({'environment': environment(), 'results': results}, output, indent=2, sort_keys=True)
+        output.write('\n')
+
+
+def compare(baseline, results, threshold):
+    """Gated metrics that got worse than the baseline by more than threshold (a fraction)
+
+    Returns (name, metric, baseline value, current value) tuples. Benchmarks
+    missing from either side are skipped.
+    """
+    regressions = []
+    for name, current in sorted(results.items()):
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        for metric, higher_is_better in GATED_METRICS.items():
+            if metric not in current or not reference.get(metric):
+                continue
+            before, after = reference[metric], current[metric]
+            worse = after < before * (1 - threshold) if higher_is_better else after > before * (1 + threshold)
+            if worse:
+                regressions.append((name, metric, before, after))
+    return regressions
+
+
+def format_result(name, result):
+    if 'rps' in result:
+        return (f"{name:<42} {result['rps']:9.1f} req/s  p50 {result['p50_ms']:7.2f} ms  "
+                f"p95 {result['p95_ms']:7.2f} ms  p99 {result['p99_ms']:7.2f} ms  ({result['errors']} errors)")
+    return (f"{name:<42} {result['median_ms']:9.3f} ms median  p95 {result['p95_ms']:8.3f} ms  "
+            f"{result['ops_per_sec']:10.0f} ops/s")
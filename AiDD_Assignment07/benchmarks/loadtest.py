@@ -0,0 +1,255 @@
+"""
+HTTP load generator for the portfolio site
+Keeps a fixed number of keep-alive connections busy for a fixed time and
+reports throughput plus latency percentiles.
+
+Usage:
+    # Hit an already running server
+    python benchmarks/loadtest.py --url http://127.0.0.1:8001 --paths / /projects
+
+    # Start both serving modes in turn and compare them
+    python benchmarks/loadtest.py --compare --concurrency 32 --duration 10
+
+    # Thousands of keep-alive connections from a single asyncio client, against the ASGI app too
+    python benchmarks/loadtest.py --compare --modes app.run gunicorn uvicorn \
+        --client asyncio --concurrency 1000 --paths /api/projects /api/search?q=project
+"""
+
+import argparse
+import asyncio
+import http.client
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_PATHS = ['/', '/about', '/projects']
+
+# Serving modes for --compare: how to start each one on a given port
+SERVERS = {
+    'app.run': lambda port: [sys.executable, 'app.py'],
+    'gunicorn': lambda port: [
+        sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+        '--bind', f'127.0.0.1:{port}', 'wsgi:app',
+    ],
+    'uvicorn': lambda port: [
+        sys.executable, '-m', 'uvicorn', 'asgi:app',
+        '--host', '127.0.0.1', '--port', str(port), '--no-access-log',
+    ],
+}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(len(sorted_values) * fraction), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    """Throughput and latency percentiles (in milliseconds) for one run"""
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'seconds': elapsed,
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def run_load(base_url, paths, concurrency=16, duration=10.0, method='GET', body_factory=None):
+    """Drive base_url with concurrency keep-alive clients for duration seconds
+
+    Each client cycles through paths. body_factory, if given, is called per
+    request and returns (body, content_type) for non-GET methods.
+    """
+    target = urllib.parse.urlsplit(base_url)
+    deadline = time.perf_counter() + duration
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def client(offset):
+        conn = http.client.HTTPConnection(target.hostname, target.port, timeout=30)
+        local, failed, i = [], 0, offset
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            body, headers = None, {}
+            if body_factory is not None:
+                body, content_type = body_factory()
+                headers['Content-Type'] = content_type
+            started = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 500:
+                    failed += 1
+                else:
+                    local.append(time.perf_counter() - started)
+                if response.will_close:
+                    conn.close()
+                    conn = http.client.HTTPConnection(target.hostname, target.port, timeout=30)
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection(target.hostname, target.port, timeout=30)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, errors[0], time.perf_counter() - started)
+
+
+async def _read_response(reader):
+    """Read one HTTP/1.1 response; returns (status, keep_alive)"""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers.get('connection', '').lower() != 'close'
+
+
+def run_load_async(base_url, paths, concurrency=1000, duration=10.0):
+    """Like run_load, but every client is a coroutine, so one process can hold thousands of connections
+
+    GET only: it speaks just enough HTTP/1.1 to time keep-alive requests.
+    """
+    target = urllib.parse.urlsplit(base_url)
+    host = f'{target.hostname}:{target.port}'.encode()
+    latencies = []
+    errors = [0]
+
+    async def client(offset, deadline):
+        reader = writer = None
+        i = offset
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(target.hostname, target.port)
+                writer.write(b'GET ' + path.encode() + b' HTTP/1.1\r\nHost: ' + host + b'\r\n\r\n')
+                status, keep_alive = await asyncio.wait_for(_read_response(reader), 30)
+                if status >= 500:
+                    errors[0] += 1
+                else:
+                    latencies.append(time.perf_counter() - started)
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+                errors[0] += 1
+                keep_alive = False
+            if not keep_alive and writer is not None:
+                writer.close()
+                reader = writer = None
+        if writer is not None:
+            writer.close()
+
+    async def drive():
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(client(n, deadline) for n in range(concurrency)))
+
+    started = time.perf_counter()
+    asyncio.run(drive())
+    return summarize(latencies, errors[0], time.perf_counter() - started)
+
+
+def wait_until_up(base_url, timeout=20.0):
+    target = urllib.parse.urlsplit(base_url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(target.hostname, target.port, timeout=1)
+            conn.request('GET', '/')
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'{base_url} did not come up within {timeout}s')
+
+
+def start_server(mode, port):
+    env = dict(os.environ, PORT=str(port), GUNICORN_ACCESS_LOG='')
+    # New session so the debug reloader's child process is stopped along with its parent
+    return subprocess.Popen(
+        SERVERS[mode](port), cwd=APP_DIR, env=env, start_new_session=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def stop_server(process):
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+def print_result(label, result):
+    print(f"{label:>10}  {result['rps']:9.1f} req/s  p50 {result['p50_ms']:7.2f} ms  "
+          f"p95 {result['p95_ms']:7.2f} ms  p99 {result['p99_ms']:7.2f} ms  "
+          f"({result['requests']} ok, {result['errors']} errors)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8001')
+    parser.add_argument('--paths', nargs='+', default=DEFAULT_PATHS)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--compare', action='store_true', help='start each serving mode in turn and compare them')
+    parser.add_argument('--modes', nargs='+', default=list(SERVERS), choices=list(SERVERS))
+    parser.add_argument('--port', type=int, default=8101)
+    parser.add_argument('--client', choices=('threads', 'asyncio'), default='threads',
+                        help='one thread per connection, or one event loop for all of them (for 1k+ connections)')
+    args = parser.parse_args()
+    load = run_load if args.client == 'threads' else run_load_async
+
+    if not args.compare:
+        print_result('target', load(args.url, args.paths, args.concurrency, args.duration))
+        return
+
+    for offset, mode in enumerate(args.modes):
+        # A separate port per mode, so a lingering previous server cannot block the next bind
+        port = args.port + offset
+        base_url = f'http://127.0.0.1:{port}'
+        process = start_server(mode, port)
+        try:
+            wait_until_up(base_url)
+            load(base_url, args.paths, args.concurrency, 1.0)  # warm up
+            print_result(mode, load(base_url, args.paths, args.concurrency, args.duration))
+        finally:
+            stop_server(process)
+
+
+if __name__ == '__main__':
+    main()
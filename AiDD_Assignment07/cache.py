@@ -0,0 +1,79 @@
+"""
+In-process caching utilities
+Size-bounded LRU cache with per-entry expiry and hit/miss counters
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by entry count, with an optional time-to-live"""
+
+    def __init__(self, max_size=128, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if it is absent or expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at is None or expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        """Store value under key, evicting the least recently used entries when full"""
+        if self.max_size <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for key, calling loader() and caching its result on a miss"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        """Drop every entry (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return a snapshot of the cache counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,285 @@
+"""
+Dynamic response compression
+WSGI middleware that gzip/brotli/zstd-encodes compressible responses on the fly,
+caching compressed bodies by ETag and counting the bytes saved per route
+"""
+
+import threading
+import zlib
+
+from flask import request
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header, parse_cache_control_header, parse_set_header
+
+from cache import LRUCache
+from metrics import escape_label
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Mimetypes worth compressing; images, fonts and archives are compressed already
+DEFAULT_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/xml',
+    'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+}
+
+# Levels tuned for per-request work rather than maximum ratio (static files are precompressed at build time)
+DEFAULT_LEVELS = {'zstd': 3, 'br': 4, 'gzip': 6}
+
+# Statuses whose bodies must not be re-encoded (no body, or a byte range of the identity encoding)
+_SKIP_STATUSES = {204, 206, 304}
+
+
+class GzipEncoder:
+    """gzip via zlib; every response starts from a copy of one preconfigured compressor"""
+
+    name = 'gzip'
+
+    def __init__(self, level):
+        self._template = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        compressor = self._template.copy()
+        return compressor.compress(data) + compressor.flush()
+
+    def stream(self, chunks):
+        compressor = self._template.copy()
+        for chunk in chunks:
+            # Sync-flush each chunk so streamed pages still reach the client incrementally
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+
+
+class BrotliEncoder:
+    """Brotli in text mode (brotli compressors cannot be copied, so each response gets its own)"""
+
+    name = 'br'
+
+    def __init__(self, level):
+        self.quality = level
+
+    def compress(self, data):
+        return brotli.compress(data, quality=self.quality, mode=brotli.MODE_TEXT)
+
+    def stream(self, chunks):
+        compressor = brotli.Compressor(quality=self.quality, mode=brotli.MODE_TEXT)
+        for chunk in chunks:
+            yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+
+
+class ZstdEncoder:
+    """Zstandard; each thread reuses one compression context for whole bodies"""
+
+    name = 'zstd'
+
+    def __init__(self, level):
+        self.level = level
+        self._local = threading.local()
+
+    def compress(self, data):
+        compressor = getattr(self._local, 'compressor', None)
+        if compressor is None:
+            compressor = self._local.compressor = zstandard.ZstdCompressor(level=self.level)
+        return compressor.compress(data)
+
+    def stream(self, chunks):
+        # A streamed body may still be mid-flight when this thread serves another response
+        compressor = zstandard.ZstdCompressor(level=self.level).compressobj()
+        for chunk in chunks:
+            yield compressor.compress(chunk) + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        yield compressor.flush()
+
+
+ENCODERS = {'zstd': ZstdEncoder, 'br': BrotliEncoder, 'gzip': GzipEncoder}
+_AVAILABLE = {'zstd': zstandard is not None, 'br': brotli is not None, 'gzip': True}
+
+
+class Compression:
+    """Compresses the app's responses according to Accept-Encoding
+
+    Wraps app.wsgi_app. Configured from app.config:
+        COMPRESS_MIMETYPES   content types to compress
+        COMPRESS_MIN_SIZE    smaller bodies go out as they are
+        COMPRESS_ENCODINGS   encodings in server preference order (unavailable ones are skipped)
+        COMPRESS_LEVELS      level per encoding
+        COMPRESS_CACHE_SIZE  compressed bodies kept per (ETag, encoding); 0 disables
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.wsgi_app = None
+        self.encoders = {}
+        self.cache = LRUCache(max_size=0)
+        self._routes = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        config.setdefault('COMPRESS_MIMETYPES', DEFAULT_MIMETYPES)
+        config.setdefault('COMPRESS_MIN_SIZE', 500)
+        config.setdefault('COMPRESS_ENCODINGS', ('zstd', 'br', 'gzip'))
+        config.setdefault('COMPRESS_LEVELS', DEFAULT_LEVELS)
+        config.setdefault('COMPRESS_CACHE_SIZE', 128)
+        self.app = app
+        self.mimetypes = set(config['COMPRESS_MIMETYPES'])
+        self.min_size = config['COMPRESS_MIN_SIZE']
+        self.encoders = {
+            name: ENCODERS[name](config['COMPRESS_LEVELS'].get(name, DEFAULT_LEVELS[name]))
+            for name in config['COMPRESS_ENCODINGS'] if _AVAILABLE.get(name)
+        }
+        self.cache = LRUCache(max_size=config['COMPRESS_CACHE_SIZE'])
+        app.extensions['compression'] = self
+        app.before_request(self._tag_route)
+        self.wsgi_app = app.wsgi_app
+        app.wsgi_app = self
+
+    @staticmethod
+    def _tag_route():
+        """Record the matched endpoint so savings can be reported per route"""
+        request.environ['compression.route'] = request.endpoint
+
+    def negotiate(self, header):
+        """The encoder for the best encoding the client accepts, preferring ours on ties; None for identity"""
+        accepted = parse_accept_header(header)
+        best, best_quality = None, 0
+        for name, encoder in self.encoders.items():
+            quality = accepted[name]
+            if quality > best_quality:
+                best, best_quality = encoder, quality
+        return best
+
+    def should_compress(self, status, headers):
+        if status in _SKIP_STATUSES or status < 200:
+            return False
+        if 'Content-Encoding' in headers:
+            return False
+        if headers.get('Content-Type', '').split(';')[0].strip() not in self.mimetypes:
+            return False
+        if 'no-transform' in parse_cache_control_header(headers.get('Cache-Control')):
+            return False
+        length = headers.get('Content-Length')
+        return length is None or int(length) >= self.min_size
+
+    def __call__(self, environ, start_response):
+        encoder = None
+        if environ['REQUEST_METHOD'] != 'HEAD':
+            encoder = self.negotiate(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoder is None:
+            return self.wsgi_app(environ, start_response)
+
+        captured = []
+
+        def capture(status, headers, exc_info=None):
+            captured[:] = [status, headers, exc_info]
+
+        app_iter = self.wsgi_app(environ, capture)
+        status, header_list, exc_info = captured
+        headers = Headers(header_list)
+        if not self.should_compress(int(status.split(None, 1)[0]), headers):
+            start_response(status, header_list, exc_info)
+            return app_iter
+
+        vary = parse_set_header(headers.get('Vary'))
+        vary.add('Accept-Encoding')
+        headers['Vary'] = vary.to_header()
+        route = environ.get('compression.route') or '<unmatched>'
+
+        if headers.get('Content-Length') is None:
+            # Streamed response: encode chunk by chunk instead of buffering the whole body
+            headers['Content-Encoding'] = encoder.name
+            self._weaken_etag(headers)
+            start_response(status, headers.to_wsgi_list(), exc_info)
+            return self._stream(encoder, app_iter, route)
+
+        try:
+            body = b''.join(app_iter)
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+        etag = headers.get('ETag')
+        key = (etag, encoder.name) if etag and not etag.startswith('W/') else None
+        compressed = self.cache.get(key) if key else None
+        if compressed is None:
+            compressed = encoder.compress(body)
+            if key:
+                self.cache.set(key, compressed)
+        if len(compressed) >= len(body):
+            start_response(status, header_list, exc_info)
+            return [body]
+        headers['Content-Encoding'] = encoder.name
+        headers['Content-Length'] = str(len(compressed))
+        self._weaken_etag(headers)
+        start_response(status, headers.to_wsgi_list(), exc_info)
+        self._record(route, len(body), len(compressed))
+        return [compressed]
+
+    @staticmethod
+    def _weaken_etag(headers):
+        """Mark the ETag weak: the encoded bytes differ, but If-None-Match still matches (weak comparison)"""
+        etag = headers.get('ETag')
+        if etag and not etag.startswith('W/'):
+            headers['ETag'] = 'W/' + etag
+
+    def _stream(self, encoder, app_iter, route):
+        original = compressed = 0
+        try:
+            def counted():
+                nonlocal original
+                for chunk in app_iter:
+                    original += len(chunk)
+                    yield chunk
+            for out in encoder.stream(counted()):
+                if out:
+                    compressed += len(out)
+                    yield out
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+            self._record(route, original, compressed)
+
+    def _record(self, route, original, compressed):
+        with self._lock:
+            counters = self._routes.setdefault(route, [0, 0, 0])
+            counters[0] += 1
+            counters[1] += original
+            counters[2] += compressed
+
+    def collect(self):
+        """Prometheus exposition lines for the per-route counters (a Metrics collector)"""
+        routes = self.stats()
+        families = (
+            ('compression_responses_total', 'Responses compressed', 'responses'),
+            ('compression_original_bytes_total', 'Bytes of compressed responses before encoding', 'original_bytes'),
+            ('compression_compressed_bytes_total', 'Bytes of compressed responses as sent', 'compressed_bytes'),
+            ('compression_saved_bytes_total', 'Bytes compression kept off the wire', 'saved_bytes'),
+        )
+        for name, documentation, key in families:
+            yield f'# HELP {name} {documentation}'
+            yield f'# TYPE {name} counter'
+            for route, values in routes.items():
+                yield f'{name}{{route="{escape_label(route)}"}} {values[key]}'
+
+    def stats(self):
+        """Per-route compressed response count and bytes before/after, most bytes saved first"""
+        with self._lock:
+            routes = {
+                route: {
+                    'responses': responses,
+                    'original_bytes': original,
+                    'compressed_bytes': compressed,
+                    'saved_bytes': original - compressed,
+                    'ratio': compressed / original if original else 1.0,
+                }
+                for route, (responses, original, compressed) in self._routes.items()
+            }
+        return dict(sorted(routes.items(), key=lambda item: item[1]['saved_bytes'], reverse=True))
@@ -2,22 +2,108 @@
 Pytest configuration and fixtures for Flask application testing
 """
 import pytest
+import multiprocessing
 import os
+import socketserver
 import sys
 import sqlite3
+import threading
+from email import message_from_bytes, policy
+
+# Keep the suite's own slow statements (bulk loads) out of any slow-query log configured in the
+# environment; set before DAL is imported, and inherited by writer subprocesses
+os.environ['DB_SLOW_QUERY_LOG'] = ''
+
+from werkzeug.serving import make_server
+
 from app import app as flask_app
 import DAL
+from benchmarks import harness
 
 # Test database name
 TEST_DB = 'test_projects.db'
 
+def remove_database_files(path):
+    """Delete a database file along with any WAL/shared-memory sidecar files"""
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmark', 'performance benchmarks (test_benchmarks.py)')
+    group.addoption('--benchmark', action='store_true', help='run the benchmarks, which are skipped otherwise')
+    group.addoption('--benchmark-sizes', default='100,1000,10000',
+                    help='comma-separated projects table sizes for the DAL benchmarks')
+    group.addoption('--benchmark-duration', type=float, default=3.0, help='seconds of load per HTTP route')
+    group.addoption('--benchmark-baseline', default=harness.BASELINE_PATH, help='baseline JSON to compare with')
+    group.addoption('--benchmark-threshold', type=float, default=0.25,
+                    help='fail when a benchmark is this much worse than the baseline (0.25 = 25%%)')
+    group.addoption('--benchmark-save', action='store_true', help='write this run as the new baseline')
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'benchmark: performance benchmark, run only with --benchmark')
+    config.benchmark_results = {}
+    config.benchmark_regressions = []
+
+def pytest_collection_modifyitems(config, items):
+    """Skip benchmarks unless --benchmark was given"""
+    if config.getoption('--benchmark'):
+        return
+    skip = pytest.mark.skip(reason='benchmarks run only with --benchmark')
+    for item in items:
+        if item.get_closest_marker('benchmark'):
+            item.add_marker(skip)
+
+def pytest_sessionfinish(session, exitstatus):
+    """Write the benchmark results, then save them as the baseline or check them against it"""
+    config = session.config
+    results = config.benchmark_results
+    if not results:
+        return
+    harness.save(harness.RESULTS_PATH, results)
+    baseline_path = config.getoption('--benchmark-baseline')
+    if config.getoption('--benchmark-save'):
+        harness.save(baseline_path, results)
+        return
+    baseline = harness.load(baseline_path)
+    if baseline is not None:
+        config.benchmark_regressions = harness.compare(baseline, results, config.getoption('--benchmark-threshold'))
+        if config.benchmark_regressions and session.exitstatus == pytest.ExitCode.OK:
+            session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    results = config.benchmark_results
+    if not results:
+        return
+    terminalreporter.section('benchmarks')
+    for name, result in sorted(results.items()):
+        terminalreporter.write_line(harness.format_result(name, result))
+    baseline_path = config.getoption('--benchmark-baseline')
+    if config.getoption('--benchmark-save'):
+        terminalreporter.write_line(f'Saved as the baseline: {baseline_path}')
+    elif not os.path.exists(baseline_path):
+        terminalreporter.write_line(f'No baseline at {baseline_path}; rerun with --benchmark-save to record one')
+    elif config.benchmark_regressions:
+        threshold = config.getoption('--benchmark-threshold')
+        terminalreporter.write_line(f'Regressions beyond {threshold:.0%} of {baseline_path}:', red=True)
+        for name, metric, before, after in config.benchmark_regressions:
+            terminalreporter.write_line(f'  {name} {metric}: {before:.4g} -> {after:.4g}', red=True)
+    else:
+        terminalreporter.write_line(f'No regressions against {baseline_path}', green=True)
+
 @pytest.fixture(scope='session')
 def app():
     """Create and configure a Flask app instance for testing"""
     flask_app.config.update({
         'TESTING': True,
         'WTF_CSRF_ENABLED': False,
-        'SECRET_KEY': 'test-secret-key'
+        'SECRET_KEY': 'test-secret-key',
+        # Background jobs run only when a test calls job_queue.run_pending()
+        'JOBS_WORKERS': 0,
+        # Contact messages are written only when a batch fills or a test calls flush()
+        'MESSAGES_FLUSH_INTERVAL': 0,
+        # create_app() compiles templates in memory only, unless a test points this at a directory
+        'TEMPLATE_CACHE_DIR': '',
     })
     yield flask_app
 
@@ -33,19 +119,103 @@ def test_db():
     original_db = DAL.DB_NAME
     DAL.DB_NAME = TEST_DB
     
+    # Drop pooled connections so none still point at a previous test file
+    DAL.close_pool()
+    
     # Remove test database if it exists
-    if os.path.exists(TEST_DB):
-        os.remove(TEST_DB)
+    remove_database_files(TEST_DB)
     
     # Initialize fresh database
     DAL.init_database()
     
     yield TEST_DB
     
-    # Cleanup: restore original DB name and remove test database
+    # Cleanup: drop unwritten contact messages, close pooled connections, restore original DB name and remove test database
+    flask_app.extensions['messages'].drain()
+    DAL.close_pool()
     DAL.DB_NAME = original_db
-    if os.path.exists(TEST_DB):
-        os.remove(TEST_DB)
+    remove_database_files(TEST_DB)
+
+@pytest.fixture(scope='function')
+def populate_projects(test_db):
+    """Return a helper that bulk-loads generated projects into the test database in one transaction"""
+    def populate(count, description='Generated project description'):
+        DAL.insert_projects(
+            {'title': f'Generated Project {i}', 'description': description, 'image_filename': 'generated.svg'}
+            for i in range(count)
+        )
+        return count
+    return populate
+
+@pytest.fixture(scope='function')
+def benchmark(request):
+    """Return a helper that times func (see harness.measure) and records the result under name"""
+    def run(name, func, **options):
+        result = harness.measure(func, **options)
+        request.config.benchmark_results[name] = result
+        return result
+    return run
+
+@pytest.fixture(scope='function')
+def http_server(app, test_db):
+    """Serve the app on a free local port from a forked process (so the load generator has its own GIL)"""
+    DAL.close_pool()
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    process = multiprocessing.get_context('fork').Process(target=server.serve_forever, daemon=True)
+    process.start()
+    server.server_close()
+    
+    yield f'http://127.0.0.1:{server.server_port}'
+    
+    process.terminate()
+    process.join(5)
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: acknowledge every command and keep each DATA payload"""
+    
+    def reply(self, line):
+        self.wfile.write(line + b'\r\n')
+    
+    def handle(self):
+        self.reply(b'220 localhost test SMTP')
+        lines = None
+        for line in self.rfile:
+            if lines is not None:
+                if line.rstrip(b'\r\n') == b'.':
+                    self.server.messages.append(message_from_bytes(b''.join(lines), policy=policy.default))
+                    lines = None
+                    self.reply(b'250 OK')
+                else:
+                    lines.append(line[1:] if line.startswith(b'..') else line)
+                continue
+            command = line[:4].upper()
+            if command in (b'EHLO', b'HELO'):
+                self.reply(b'250 localhost')
+            elif command == b'DATA':
+                lines = []
+                self.reply(b'354 End data with <CR><LF>.<CR><LF>')
+            elif command == b'QUIT':
+                self.reply(b'221 Bye')
+                return
+            else:
+                self.reply(b'250 OK')
+
+@pytest.fixture(scope='function')
+def smtp_server(app):
+    """A local SMTP stand-in on a free port, with the app's mail settings pointed at it"""
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _SMTPHandler)
+    server.daemon_threads = True
+    server.messages = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    original = {key: app.config[key] for key in ('MAIL_SERVER', 'MAIL_PORT', 'MAIL_USE_TLS', 'MAIL_USERNAME')}
+    app.config.update(MAIL_SERVER='127.0.0.1', MAIL_PORT=server.server_address[1], MAIL_USE_TLS=False, MAIL_USERNAME=None)
+    
+    yield server
+    
+    server.shutdown()
+    server.server_close()
+    app.config.update(original)
 
 @pytest.fixture(scope='function')
 def sample_project():
@@ -0,0 +1,258 @@
+"""
+Static site freezer
+Renders every page (the template-only pages, each page of the projects listing and
+each project's own page) into FREEZE_DIR with gzip/brotli variants, so a plain static
+file server can answer reads, and re-renders only the pages a project write affects.
+
+Freeze with: python freeze.py
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import shutil
+import sys
+import time
+
+from flask import current_app, url_for
+
+import DAL
+from assets import ENCODINGS, compress
+from jobs import queue
+
+# Pages that do not read the projects table, frozen once and left alone by project writes
+STATIC_ENDPOINTS = ('index', 'about', 'resume', 'contact', 'add_project', 'thankyou')
+
+# Listing cursors in the order their pages were frozen, and the lock serializing updates across workers
+STATE_NAME = '.freeze.json'
+LOCK_NAME = '.freeze.lock'
+
+# Projects looked up per query while freezing their pages
+DETAIL_BATCH_SIZE = 500
+
+# Pages are rewritten on every project write, where brotli's top quality (11, as for static assets)
+# costs some 15x the time of 9 for output about 15% smaller
+BROTLI_QUALITY = 9
+
+
+def frozen_path(url):
+    """File a URL path is frozen to, relative to the freeze folder: /about -> about/index.html"""
+    return os.path.join(url.strip('/'), 'index.html')
+
+
+class Freezer:
+    """Writes rendered pages to FREEZE_DIR and keeps them current as projects change
+
+    Configured from app.config:
+        FREEZE_DIR   folder to freeze into; empty (the default) leaves
+                     project writes alone, as nothing is served frozen
+
+    Pages are rendered by requesting them from the app, so they are exactly
+    what a visitor would have been sent. Every file is replaced atomically,
+    so the static server never sees half of one.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('FREEZE_DIR', os.environ.get('FREEZE_DIR', ''))
+        self.app = app
+        app.extensions['freezer'] = self
+        DAL.project_observer = self.project_changed
+
+    @property
+    def folder(self):
+        return self.app.config['FREEZE_DIR']
+
+    def _write(self, relative, data):
+        """Replace one frozen file and its precompressed variants"""
+        path = os.path.join(self.folder, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        files = [(path, data)]
+        for encoding, suffix in ENCODINGS:
+            variant = compress(encoding, data, BROTLI_QUALITY)
+            if variant is not None and len(variant) < len(data):
+                files.append((path + suffix, variant))
+            elif os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        # Variants first: a client may get the new page a moment before the old one goes, never the reverse
+        for target, content in reversed(files):
+            with open(target + '.tmp', 'wb') as f:
+                f.write(content)
+            os.replace(target + '.tmp', target)
+
+    def _remove(self, relative):
+        """Delete one frozen file, its variants and the folder it leaves empty"""
+        path = os.path.join(self.folder, relative)
+        for suffix in ('', *(suffix for _encoding, suffix in ENCODINGS)):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        try:
+            os.rmdir(os.path.dirname(path))
+        except OSError:
+            pass
+
+    def render(self, url, client):
+        """Request one page from the app and freeze it"""
+        response = client.get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f'Freezing {url} returned {response.status_code}')
+        self._write(frozen_path(url), response.get_data())
+
+    def _load_state(self):
+        try:
+            with open(os.path.join(self.folder, STATE_NAME)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _save_state(self, state):
+        path = os.path.join(self.folder, STATE_NAME)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(state, f)
+        os.replace(path + '.tmp', path)
+
+    def _check_folder(self):
+        """RuntimeError unless FREEZE_DIR is missing, empty or an earlier freeze's output, the only folders freeze() clears"""
+        if not os.path.isdir(self.folder):
+            return
+        names = set(os.listdir(self.folder)) - {LOCK_NAME}
+        if names and STATE_NAME not in names:
+            raise RuntimeError(f'{self.folder} is not empty and was not written by a freeze; refusing to clear it')
+
+    def _lock(self):
+        """Exclusive lock on the freeze folder, held while its pages and state are rewritten"""
+        os.makedirs(self.folder, exist_ok=True)
+        lock = open(os.path.join(self.folder, LOCK_NAME), 'w')
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        return lock
+
+    def _freeze_listing(self, client, cursors, start, limit):
+        """Render listing pages from index start to the last, following the cursors as they are now
+
+        cursors holds the cursor of every page after the first, as last frozen;
+        returns them updated. Pages of cursors that no longer lead anywhere are removed.
+        """
+        cursor = cursors[start - 1] if start else None
+        fresh = []
+        while True:
+            _page, next_cursor = DAL.get_projects_page(limit, cursor, summaries=True)
+            self.render(url_for('projects', cursor=cursor), client)
+            if next_cursor is None:
+                break
+            fresh.append(next_cursor)
+            cursor = next_cursor
+        for stale in set(cursors[start:]) - set(fresh):
+            self._remove(frozen_path(url_for('projects', cursor=stale)))
+        return cursors[:start] + fresh
+
+    def freeze(self):
+        """Render the whole site into an emptied FREEZE_DIR; returns how many pages were written"""
+        self._check_folder()
+        with self.app.test_request_context(), self._lock():
+            client = self.app.test_client()
+            for name in os.listdir(self.folder):
+                path = os.path.join(self.folder, name)
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                elif name != LOCK_NAME:
+                    os.remove(path)
+            for endpoint in STATIC_ENDPOINTS:
+                self.render(url_for(endpoint), client)
+            limit = self.app.config['PROJECTS_PER_PAGE']
+            cursors = self._freeze_listing(client, [], 0, limit)
+            # Walked a page at a time: each render hands this thread's pooled connection back,
+            # so no cursor can be left open on it in between
+            projects, cursor = 0, None
+            while True:
+                page, cursor = DAL.get_projects_page(DETAIL_BATCH_SIZE, cursor, summaries=True)
+                for project in page:
+                    self.render(url_for('project_detail', project_id=project['id']), client)
+                projects += len(page)
+                if cursor is None:
+                    break
+            self._save_state({'limit': limit, 'cursors': cursors})
+        return len(STATIC_ENDPOINTS) + len(cursors) + 1 + projects
+
+    def project_changed(self, changes):
+        """DAL.project_observer: queue a re-render of what the changes touch, if the site is frozen"""
+        if self.folder:
+            queue.enqueue('refreeze', changes=[list(change) for change in changes])
+
+    def refreeze(self, changes):
+        """Re-render the pages that (action, project_id, created_at) changes affect
+
+        A project's own page is rewritten, or removed with it. In the listing,
+        an update rewrites just the page holding the project. An insert or
+        delete shifts every later page boundary, so the pages from the one
+        holding the project (or the one before, whose next link may go) to
+        the last are rewritten. A change with no created_at could be on any
+        page, so it rewrites the whole listing.
+        """
+        with self.app.test_request_context(), self._lock():
+            client = self.app.test_client()
+            limit = self.app.config['PROJECTS_PER_PAGE']
+            state = self._load_state()
+            if state is None or state['limit'] != limit:
+                state = {'limit': limit, 'cursors': []}
+            cursors = state['cursors']
+            # (created_at, id) of the last project on each page but the final one
+            keys = [DAL.decode_cursor(cursor) for cursor in cursors]
+
+            start, updated = None, set()
+            for action, project_id, created_at in changes:
+                url = url_for('project_detail', project_id=project_id)
+                # Checked rather than trusted: a later write may have deleted the project since
+                if DAL.get_project_by_id(project_id) is None:
+                    self._remove(frozen_path(url))
+                else:
+                    self.render(url, client)
+                if created_at is None:
+                    start = 0
+                    continue
+                # Pages are newest first, so the project is on the page after every cursor newer than it
+                index = sum(1 for key in keys if (created_at, project_id) < key)
+                if action == 'update':
+                    updated.add(index)
+                else:
+                    shift = max(index - 1, 0) if action == 'delete' else index
+                    start = shift if start is None else min(start, shift)
+
+            for index in sorted(updated):
+                if start is None or index < start:
+                    self.render(url_for('projects', cursor=cursors[index - 1] if index else None), client)
+            if start is not None:
+                state['cursors'] = self._freeze_listing(client, cursors, start, limit)
+            self._save_state(state)
+
+
+@queue.task('refreeze')
+def refreeze(changes):
+    """Background job: bring the frozen pages in line with committed project writes"""
+    current_app.extensions['freezer'].refreeze(changes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render every page to static files for a plain file server')
+    parser.add_argument('--output', default=os.environ.get('FREEZE_DIR') or 'frozen',
+                        help='folder to freeze into (default: FREEZE_DIR, else frozen)')
+    args = parser.parse_args()
+
+    from app import create_app
+
+    app = create_app({'FREEZE_DIR': args.output})
+    started = time.perf_counter()
+    try:
+        pages = app.extensions['freezer'].freeze()
+    except RuntimeError as error:
+        sys.exit(str(error))
+    seconds = time.perf_counter() - started
+    print(f'Froze {pages} pages into {args.output} in {seconds:.1f} s')
+
+
+if __name__ == '__main__':
+    main()
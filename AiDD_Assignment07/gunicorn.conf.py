@@ -0,0 +1,51 @@
+"""
+Gunicorn configuration for serving the portfolio in production
+Run with: gunicorn -c gunicorn.conf.py wsgi:app
+
+Graceful reload: `kill -HUP <master pid>` starts fresh workers and lets the
+old ones finish their in-flight requests (up to graceful_timeout). Because the
+app is preloaded in the master, deploying new code needs a binary upgrade
+(`kill -USR2`, then `kill -QUIT` the old master) or a container restart.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', f"0.0.0.0:{os.environ.get('PORT', 8001)}")
+
+# Workers are processes; threads within each absorb time spent waiting on SQLite and slow clients
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Background threads in each worker that also check out pooled connections: the job workers
+# (JOBS_WORKERS, see jobs.py) and the contact-message flusher (see messages.py)
+background_threads = int(os.environ.get('JOBS_WORKERS', 2)) + 1
+
+# One pooled SQLite connection per request and background thread, plus one spare
+os.environ.setdefault('DB_POOL_SIZE', str(threads + background_threads + 1))
+
+# Import the app, initialize the database and compile templates once, before forking
+preload_app = True
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+# Recycle workers periodically so slow leaks cannot accumulate; jitter avoids restarting all at once
+max_requests = 5000
+max_requests_jitter = 500
+
+# Set GUNICORN_ACCESS_LOG to an empty value to turn access logging off (e.g. under load tests)
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    """Drop any pool state inherited from the master so each worker opens its own connections,
+    then start the worker's background job threads (threads do not survive a fork)"""
+    import DAL
+    from jobs import queue
+    DAL.close_pool()
+    if queue.app is not None:
+        queue.start()
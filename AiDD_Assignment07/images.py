@@ -0,0 +1,198 @@
+"""
+Project image uploads
+Streams multipart uploads straight to disk and renders resized WebP/AVIF
+derivatives in a background job, recording them on the project row
+"""
+
+import errno
+import glob
+import json
+import os
+import re
+import shutil
+import tempfile
+import uuid
+
+from flask import Request, current_app, url_for
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+import DAL
+from jobs import queue
+
+# Uploads land here, relative to IMAGES_FOLDER (project image_filename values are relative to that folder)
+UPLOAD_SUBDIR = 'uploads'
+
+# Endpoints whose multipart file parts are spooled to UPLOAD_SPOOL_FOLDER; any other route gets
+# Werkzeug's default handling (memory, or the system temp directory for large parts)
+SPOOLED_ENDPOINTS = {'add_project'}
+
+# Names save_upload gives files (uploads/<32 hex digits>.<ext>); only these are ever deleted
+_UPLOAD_NAME = re.compile(rf'^{UPLOAD_SUBDIR}/[0-9a-f]{{32}}\.[a-z]+$')
+
+# Accepted upload formats (as detected by Pillow, not by filename) and the extension each is stored under
+ALLOWED_FORMATS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp', 'GIF': '.gif'}
+
+# Derivative widths: 1x/2x of the 200px table thumbnail, then sizes for full-width views (never upscaled)
+DERIVATIVE_WIDTHS = (200, 400, 800, 1600)
+THUMBNAIL_WIDTH = 200
+
+# Encoder settings per derivative format, best compression first (emitted in this order as <source>s)
+DERIVATIVE_FORMATS = {
+    'avif': {'quality': 50},
+    'webp': {'quality': 80, 'method': 6},
+}
+
+# Largest upload accepted, in pixels: rendering derivatives decodes the whole image, about 4 bytes
+# a pixel, so this keeps that near 160MB (Pillow's own bomb check only starts at 89M pixels)
+MAX_IMAGE_PIXELS = 40_000_000
+
+
+class InvalidImage(ValueError):
+    """Raised when an upload is not an image in one of ALLOWED_FORMATS"""
+
+
+class UploadRequest(Request):
+    """Request whose multipart file parts, on SPOOLED_ENDPOINTS, are written to the spool folder in chunks
+
+    Werkzeug's default keeps parts under 500KB in memory. Writing every part to a
+    temporary file in UPLOAD_SPOOL_FOLDER, which is not served and sits on the same
+    filesystem as the upload folder, means saving it later is a hard link, not a
+    copy. Parts that are never saved are deleted when the request closes them.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint not in SPOOLED_ENDPOINTS:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        return _spool_file()
+
+
+def images_folder():
+    return current_app.config['IMAGES_FOLDER']
+
+def upload_folder():
+    return os.path.join(images_folder(), UPLOAD_SUBDIR)
+
+def spool_folder():
+    return current_app.config['UPLOAD_SPOOL_FOLDER']
+
+def _spool_file():
+    folder = spool_folder()
+    os.makedirs(folder, exist_ok=True)
+    return tempfile.NamedTemporaryFile('wb+', dir=folder, prefix='.upload-', suffix='.part')
+
+def check_size(image):
+    """InvalidImage if an opened (not yet decoded) image has more than MAX_IMAGE_PIXELS"""
+    width, height = image.size
+    if width * height > MAX_IMAGE_PIXELS:
+        raise InvalidImage(f'Images may have at most {MAX_IMAGE_PIXELS:,} pixels; this one is {width}x{height}')
+
+def detect_format(path):
+    """Pillow's format name for the image at path, or InvalidImage if it is not an accepted image"""
+    try:
+        with Image.open(path) as image:
+            image_format = image.format
+            check_size(image)
+            image.verify()
+    except Image.DecompressionBombError as error:
+        raise InvalidImage('The uploaded image is too large') from error
+    except (UnidentifiedImageError, OSError, SyntaxError) as error:
+        raise InvalidImage('The uploaded file is not a readable image') from error
+    if image_format not in ALLOWED_FORMATS:
+        raise InvalidImage(f'{image_format} images are not supported')
+    return image_format
+
+def save_upload(upload):
+    """Validate an uploaded FileStorage and store it under a random name; returns its image_filename"""
+    folder = upload_folder()
+    os.makedirs(folder, exist_ok=True)
+    spooled = upload.stream
+    if os.path.dirname(getattr(spooled, 'name', '') or '') != spool_folder():
+        # Not spooled by UploadRequest, so copy it (in chunks) to the spool folder first: it is
+        # checked there, where nothing serves it
+        spooled = _spool_file()
+        upload.save(spooled)
+    try:
+        spooled.flush()
+        name = uuid.uuid4().hex + ALLOWED_FORMATS[detect_format(spooled.name)]
+        try:
+            os.link(spooled.name, os.path.join(folder, name))
+        except OSError as error:
+            if error.errno != errno.EXDEV:
+                raise
+            # UPLOAD_SPOOL_FOLDER is on another filesystem, so the link becomes a copy
+            shutil.copyfile(spooled.name, os.path.join(folder, name))
+    finally:
+        if spooled is not upload.stream:
+            spooled.close()
+    return f'{UPLOAD_SUBDIR}/{name}'
+
+def render_derivatives(folder, image_filename):
+    """Write resized AVIF/WebP copies of an image; returns (width, height, thumbnail_filename, variants)"""
+    stem = os.path.splitext(image_filename)[0]
+    with Image.open(os.path.join(folder, image_filename)) as original:
+        # Checked again before decoding: the file may predate the cap, or not have come through save_upload
+        check_size(original)
+        image = ImageOps.exif_transpose(original)
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+    width, height = image.size
+    widths = sorted({min(target, width) for target in DERIVATIVE_WIDTHS})
+    variants = {}
+    for image_format, options in DERIVATIVE_FORMATS.items():
+        variants[image_format] = []
+        for target in widths:
+            resized = image if target == width else image.resize(
+                (target, max(1, round(height * target / width))), Image.LANCZOS
+            )
+            filename = f'{stem}-{target}w.{image_format}'
+            resized.save(os.path.join(folder, filename), **options)
+            variants[image_format].append((target, filename))
+    thumbnail_width = min(THUMBNAIL_WIDTH, width)
+    thumbnail = dict(variants['webp'])[thumbnail_width]
+    return width, height, thumbnail, variants
+
+@queue.task('render_derivatives')
+def generate_derivatives(project_id, image_filename):
+    """Background job: render an upload's derivatives and record them on its project"""
+    if DAL.get_project_by_id(project_id) is None:
+        return  # deleted before rendering started; its removal job takes the original
+    rendered = render_derivatives(images_folder(), image_filename)
+    if not DAL.set_project_images(project_id, *rendered):
+        # Deleted while rendering, so the removal job may have run before these files existed
+        schedule_removal([image_filename])
+
+def schedule_derivatives(project_id, image_filename):
+    """Queue derivative rendering for a freshly uploaded image; returns the job ID"""
+    return queue.enqueue('render_derivatives', project_id=project_id, image_filename=image_filename)
+
+def remove_upload(folder, image_filename):
+    """Delete an uploaded original and its derivatives; names save_upload did not give are left alone"""
+    if not _UPLOAD_NAME.match(image_filename):
+        return
+    stem = os.path.splitext(image_filename)[0]
+    for path in [os.path.join(folder, image_filename), *glob.glob(os.path.join(folder, f'{stem}-*w.*'))]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+@queue.task('remove_uploads')
+def remove_uploads(image_filenames):
+    """Background job: delete the files of uploads that no project uses any more"""
+    in_use = DAL.image_filenames_in_use(image_filenames)
+    for image_filename in image_filenames:
+        if image_filename not in in_use:
+            remove_upload(images_folder(), image_filename)
+
+def schedule_removal(image_filenames):
+    """Queue removal of deleted projects' uploaded images, if any were uploads; returns the job ID or None"""
+    uploads = sorted(name for name in image_filenames if _UPLOAD_NAME.match(name))
+    if not uploads:
+        return None
+    return queue.enqueue('remove_uploads', image_filenames=uploads)
+
+def srcset(project, image_format):
+    """Template filter: the srcset for one format of a project's derivatives ('' until they exist)"""
+    variants = json.loads(project['image_variants'] or '{}').get(image_format, [])
+    return ', '.join(
+        f"{url_for('static', filename='images/' + filename)} {width}w" for width, filename in variants
+    )
@@ -0,0 +1,166 @@
+"""
+Background job queue
+Jobs are persisted in the SQLite jobs table, so they survive restarts, and run on
+a small pool of worker threads with retries and exponential backoff.
+
+Register a task with @queue.task('name') and call queue.enqueue('name', **payload)
+from a route; the route returns immediately and a worker runs the task.
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+import traceback
+
+import DAL
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """SQLite-backed job queue with an in-process worker pool
+
+    Configured from app.config:
+        JOBS_WORKERS         worker threads per process; 0 runs jobs only via run_pending()
+        JOBS_POLL_INTERVAL   seconds an idle worker waits before checking for due jobs again
+        JOBS_LEASE           seconds a claimed job may run before another worker may take it over
+        JOBS_MAX_ATTEMPTS    runs before a job is parked as failed
+        JOBS_BACKOFF         delay before the first retry, doubled per attempt (with jitter)
+        JOBS_MAX_BACKOFF     cap on the retry delay
+    """
+
+    def __init__(self, app=None):
+        self.handlers = {}
+        self.app = None
+        self._threads = []
+        self._pid = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('JOBS_WORKERS', int(os.environ.get('JOBS_WORKERS', 2)))
+        app.config.setdefault('JOBS_POLL_INTERVAL', 1.0)
+        app.config.setdefault('JOBS_LEASE', 300)
+        app.config.setdefault('JOBS_MAX_ATTEMPTS', 5)
+        app.config.setdefault('JOBS_BACKOFF', 2.0)
+        app.config.setdefault('JOBS_MAX_BACKOFF', 3600)
+        self.app = app
+        app.extensions['jobs'] = self
+
+    def task(self, name):
+        """Decorator registering a function as the handler for jobs called name"""
+        def register(func):
+            self.handlers[name] = func
+            return func
+        return register
+
+    def enqueue(self, task_name, /, *, delay=0.0, max_attempts=None, **payload):
+        """Persist a job and wake a worker; returns the job ID without waiting for it to run
+
+        Keyword arguments other than delay and max_attempts are the task's (JSON-serializable) arguments.
+        """
+        if task_name not in self.handlers:
+            raise ValueError(f'No task registered as {task_name!r}')
+        job_id = DAL.enqueue_job(
+            task_name, payload, time.time() + delay, max_attempts or self.app.config['JOBS_MAX_ATTEMPTS']
+        )
+        self.start()
+        self._wakeup.set()
+        return job_id
+
+    def enqueue_many(self, task_name, payloads, /, *, delay=0.0, max_attempts=None):
+        """Persist one job per payload dict in a single transaction and wake the workers; returns the job IDs"""
+        if task_name not in self.handlers:
+            raise ValueError(f'No task registered as {task_name!r}')
+        job_ids = DAL.enqueue_jobs(
+            task_name, payloads, time.time() + delay, max_attempts or self.app.config['JOBS_MAX_ATTEMPTS']
+        )
+        if job_ids:
+            self.start()
+            self._wakeup.set()
+        return job_ids
+
+    def backoff(self, attempts):
+        """Delay before retrying a job that has failed attempts times"""
+        config = self.app.config
+        delay = min(config['JOBS_BACKOFF'] * 2 ** (attempts - 1), config['JOBS_MAX_BACKOFF'])
+        return delay * random.uniform(0.5, 1.5)
+
+    def run_job(self, job):
+        """Run one claimed job in an app context; returns True if it succeeded"""
+        try:
+            handler = self.handlers[job['name']]
+            with self.app.app_context():
+                handler(**json.loads(job['payload']))
+        except Exception as error:
+            message = ''.join(traceback.format_exception_only(error)).strip()
+            if job['attempts'] >= job['max_attempts']:
+                logger.exception('Job %s (%s) failed for good after %s attempts', job['id'], job['name'], job['attempts'])
+                DAL.fail_job(job['id'], message)
+            else:
+                logger.warning('Job %s (%s) failed, retrying: %s', job['id'], job['name'], message)
+                DAL.retry_job(job['id'], message, time.time() + self.backoff(job['attempts']))
+            return False
+        DAL.complete_job(job['id'])
+        return True
+
+    def run_pending(self, now=None):
+        """Run every job due by now (default: the current time) on this thread; returns how many ran"""
+        ran = 0
+        while True:
+            job = DAL.claim_job(time.time() if now is None else now, self.app.config['JOBS_LEASE'])
+            if job is None:
+                return ran
+            self.run_job(job)
+            ran += 1
+
+    def start(self):
+        """Start this process's workers if they are not running (safe to call after a fork)"""
+        workers = self.app.config['JOBS_WORKERS']
+        if workers <= 0 or (self._pid == os.getpid() and self._threads):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._threads:
+                return
+            self._stopping.clear()
+            self._pid = os.getpid()
+            self._threads = [
+                threading.Thread(target=self._work, name=f'jobs-{n}', daemon=True) for n in range(workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self, timeout=None):
+        """Ask the workers to finish their current job and exit"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+            self._stopping.set()
+            self._wakeup.set()
+        for thread in threads:
+            thread.join(timeout)
+
+    def _work(self):
+        interval = self.app.config['JOBS_POLL_INTERVAL']
+        while not self._stopping.is_set():
+            try:
+                job = DAL.claim_job(time.time(), self.app.config['JOBS_LEASE'])
+                if job is not None:
+                    self.run_job(job)
+            except Exception:
+                logger.exception('Job worker error')
+                job = None
+            finally:
+                DAL.release_connection()
+            if job is None:
+                self._wakeup.wait(interval)
+                self._wakeup.clear()
+
+
+# Shared queue: modules register tasks on it, app.py binds it to the app
+queue = JobQueue()
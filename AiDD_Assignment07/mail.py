@@ -0,0 +1,35 @@
+"""
+Outgoing mail
+Contact form messages are sent by a background job, so SMTP latency and outages
+never reach the request; failed sends are retried by the job queue
+"""
+
+import smtplib
+from email.message import EmailMessage
+
+from flask import current_app
+
+from jobs import queue
+
+
+def build_contact_message(name, email, subject, message):
+    """The notification sent to the site owner for one contact form submission"""
+    config = current_app.config
+    mail = EmailMessage()
+    mail['From'] = config['MAIL_SENDER']
+    mail['To'] = config['MAIL_RECIPIENT']
+    mail['Reply-To'] = email
+    mail['Subject'] = f'[Portfolio contact] {subject or "(no subject)"}'
+    mail.set_content(f'From: {name} <{email}>\n\n{message}\n')
+    return mail
+
+@queue.task('send_contact_email')
+def send_contact_email(name, email, subject, message):
+    """Deliver a contact form submission over SMTP (raises so the queue retries on failure)"""
+    config = current_app.config
+    with smtplib.SMTP(config['MAIL_SERVER'], config['MAIL_PORT'], timeout=config['MAIL_TIMEOUT']) as smtp:
+        if config['MAIL_USE_TLS']:
+            smtp.starttls()
+        if config['MAIL_USERNAME']:
+            smtp.login(config['MAIL_USERNAME'], config['MAIL_PASSWORD'])
+        smtp.send_message(build_contact_message(name, email, subject, message))
@@ -0,0 +1,171 @@
+"""
+Contact message store
+Submissions are buffered in memory and written behind the request in batches,
+one transaction (and one commit) per batch instead of one per submission.
+A batch is written when it fills, when its oldest submission has waited
+MESSAGES_FLUSH_INTERVAL seconds, and when the process shuts down.
+"""
+
+import atexit
+import datetime
+import logging
+import os
+import threading
+import time
+
+import DAL
+
+logger = logging.getLogger(__name__)
+
+
+class MessageBuffer:
+    """Write-behind buffer for contact form submissions
+
+    Configured from app.config:
+        MESSAGES_BATCH_SIZE       buffered submissions that trigger a write straight away
+        MESSAGES_FLUSH_INTERVAL   longest a submission waits in memory; 0 means no background
+                                  flusher, so batches are written only when full or on flush()
+        MESSAGES_MAX_PENDING      backlog at which add() writes on the request thread instead,
+                                  so a stuck database slows submissions down rather than growing memory
+
+    A normal shutdown flushes the buffer; submissions still buffered when the
+    process is killed outright (SIGKILL, out of memory) are lost.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.callbacks = []
+        self._pending = []
+        self._oldest = 0.0
+        self._written = 0
+        self._batches = 0
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stopping = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('MESSAGES_BATCH_SIZE', 100)
+        app.config.setdefault('MESSAGES_FLUSH_INTERVAL', 0.5)
+        app.config.setdefault('MESSAGES_MAX_PENDING', 10_000)
+        self.app = app
+        app.extensions['messages'] = self
+        atexit.register(self.close)
+
+    def after_flush(self, func):
+        """Decorator registering func(messages) to run after each batch is stored (messages carry their IDs)"""
+        self.callbacks.append(func)
+        return func
+
+    def add(self, name, email, subject, message):
+        """Buffer one submission; only touches the database when a batch is due or the backlog is full"""
+        config = self.app.config
+        background = config['MESSAGES_FLUSH_INTERVAL'] > 0
+        item = {
+            'name': name,
+            'email': email,
+            'subject': subject,
+            'message': message,
+            # Same format as SQLite's CURRENT_TIMESTAMP (UTC)
+            'created_at': datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        with self._cond:
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.append(item)
+            pending = len(self._pending)
+            if background:
+                self._start()
+                if pending >= config['MESSAGES_BATCH_SIZE']:
+                    self._cond.notify()
+        if pending >= config['MESSAGES_MAX_PENDING'] or (not background and pending >= config['MESSAGES_BATCH_SIZE']):
+            self.flush()
+
+    def flush(self):
+        """Write everything buffered so far in one transaction; returns how many submissions were written
+
+        If the write fails the submissions go back to the front of the buffer and the error is raised.
+        """
+        with self._flush_lock:
+            with self._cond:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                ids = DAL.insert_messages(batch)
+            except BaseException:
+                with self._cond:
+                    self._pending[:0] = batch
+                    self._oldest = time.monotonic()
+                raise
+            self._written += len(batch)
+            self._batches += 1
+        stored = [dict(item, id=message_id) for item, message_id in zip(batch, ids)]
+        for callback in self.callbacks:
+            try:
+                callback(stored)
+            except Exception:
+                logger.exception('Message after_flush callback %r failed', callback)
+        return len(batch)
+
+    def drain(self):
+        """Remove and return the buffered submissions without writing them"""
+        with self._cond:
+            batch, self._pending = self._pending, []
+        return batch
+
+    def stats(self):
+        """Submissions waiting in memory, written so far, and the batches they were written in"""
+        with self._cond:
+            return {'pending': len(self._pending), 'written': self._written, 'batches': self._batches}
+
+    def close(self, timeout=None):
+        """Stop the background flusher and write whatever is still buffered"""
+        with self._cond:
+            thread = self._thread if self._pid == os.getpid() else None
+            self._thread = None
+            self._stopping = True
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join(timeout)
+        with self._cond:
+            self._stopping = False
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Could not write %s buffered contact messages', self.stats()['pending'])
+        finally:
+            DAL.release_connection()
+
+    def _start(self):
+        # Called with self._cond held; the flusher thread does not survive a fork, so track the pid
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name='messages-flusher', daemon=True)
+        self._thread.start()
+
+    def _due(self):
+        config = self.app.config
+        return (
+            len(self._pending) >= config['MESSAGES_BATCH_SIZE']
+            or time.monotonic() - self._oldest >= config['MESSAGES_FLUSH_INTERVAL']
+        )
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopping and not (self._pending and self._due()):
+                    wait = self._oldest + self.app.config['MESSAGES_FLUSH_INTERVAL'] - time.monotonic()
+                    self._cond.wait(wait if self._pending else None)
+                if self._stopping:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Could not write buffered contact messages; retrying')
+            finally:
+                DAL.release_connection()
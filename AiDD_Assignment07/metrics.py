@@ -0,0 +1,253 @@
+"""
+Request instrumentation
+Records route latency, SQLite time (pool checkout, statement, fetch), template
+render time and cache hit rates. Exposes them as Prometheus text at /metrics
+and summarizes each response in a Server-Timing header.
+
+Metrics are kept in process memory, so under Gunicorn each worker reports its
+own numbers; the async routes in asgi.py bypass the Flask hooks and show up
+only in the database timers.
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+
+from flask import request, template_rendered, before_render_template
+
+import DAL
+
+# Upper bounds in seconds, from sub-millisecond cache hits up to slow streamed listings
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Server-Timing entries in the order they are reported, with their descriptions
+TIMING_ENTRIES = {
+    'conn': 'pool checkout',
+    'db': 'SQL execute',
+    'fetch': 'SQL fetch',
+    'tpl': 'template render',
+}
+
+# The current request's RequestTimings on this thread (None outside requests)
+_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(names, values):
+    return ','.join(f'{name}="{escape_label(value)}"' for name, value in zip(names, values))
+
+
+class Histogram:
+    """Prometheus histogram with one series per combination of label values"""
+
+    def __init__(self, name, documentation, labelnames, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), then the running sum
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def snapshot(self, *labels):
+        """Observation count and sum for one series"""
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                return {'count': 0, 'sum': 0.0}
+            return {'count': sum(series[:-1]), 'sum': series[-1]}
+
+    def collect(self):
+        """Exposition lines for every series, with cumulative bucket counts"""
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        for labels, values in sorted(series.items()):
+            prefix = format_labels(self.labelnames, labels)
+            separator = ',' if prefix else ''
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values):
+                cumulative += count
+                yield f'{self.name}_bucket{{{prefix}{separator}le="{bound}"}} {cumulative}'
+            yield f'{self.name}_sum{{{prefix}}} {values[-1]}'
+            yield f'{self.name}_count{{{prefix}}} {cumulative}'
+
+
+class RequestTimings:
+    """Time spent so far in each Server-Timing category during one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.handled = None
+        self.seconds = dict.fromkeys(TIMING_ENTRIES, 0.0)
+        self.queries = 0
+
+    def server_timing(self):
+        """The Server-Timing header value: the whole handler as app, then each category that took any time"""
+        entries = [f'app;dur={(self.handled - self.started) * 1000:.2f}']
+        for name, description in TIMING_ENTRIES.items():
+            if self.seconds[name]:
+                if name == 'db':
+                    description = f'{self.queries} statements'
+                entries.append(f'{name};dur={self.seconds[name] * 1000:.2f};desc="{description}"')
+        return ', '.join(entries)
+
+
+class Metrics:
+    """Instrumentation for an app, served in Prometheus text format
+
+    Configured from app.config:
+        METRICS_PATH            URL of the exposition endpoint; None leaves it unregistered
+        METRICS_SERVER_TIMING   add a Server-Timing header to every response
+
+    Register it before the other extensions so its before_request hook runs
+    first and its after_request hook last.
+    """
+
+    # DAL phases as Server-Timing categories
+    _PHASES = {'acquire': 'conn', 'execute': 'db', 'fetch': 'fetch'}
+
+    def __init__(self, app=None):
+        self.app = None
+        self.requests = Histogram(
+            'http_request_duration_seconds',
+            'Time from routing a request until its response body was written',
+            ('endpoint', 'method', 'status'),
+        )
+        self.writes = Histogram(
+            'http_response_write_seconds',
+            'Time spent writing (or streaming) the response body after the view returned',
+            ('endpoint',),
+        )
+        self.queries = Histogram(
+            'db_query_seconds',
+            'SQLite time per pool checkout, statement execute and fetch, by SQL verb',
+            ('phase', 'operation'),
+        )
+        self.templates = Histogram(
+            'template_render_seconds',
+            'Jinja render time per template (streamed templates include the time to send them)',
+            ('template',),
+        )
+        self.caches = {}
+        self.collectors = []
+        self._rendering = threading.local()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_PATH', '/metrics')
+        app.config.setdefault('METRICS_SERVER_TIMING', True)
+        self.app = app
+        app.extensions['metrics'] = self
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._clear)
+        before_render_template.connect(self._template_started, app)
+        template_rendered.connect(self._template_finished, app)
+        DAL.query_observer = self.observe_query
+        if app.config['METRICS_PATH']:
+            app.add_url_rule(app.config['METRICS_PATH'], 'metrics', self.expose)
+
+    def register_cache(self, name, stats):
+        """Report a cache's counters; stats() returns a dict like cache.LRUCache.stats()"""
+        self.caches[name] = stats
+
+    def register_collector(self, collect):
+        """Add the exposition lines collect() returns (HELP, TYPE and samples) to every scrape"""
+        self.collectors.append(collect)
+
+    def observe_query(self, phase, operation, seconds):
+        self.queries.observe(seconds, phase, operation)
+        timings = _timings.get()
+        if timings is not None:
+            timings.seconds[self._PHASES[phase]] += seconds
+            if phase == 'execute':
+                timings.queries += 1
+
+    def _start(self):
+        _timings.set(RequestTimings())
+
+    def _finish(self, response):
+        timings = _timings.get()
+        if timings is None:
+            return response
+        timings.handled = time.perf_counter()
+        if self.app.config['METRICS_SERVER_TIMING']:
+            response.headers['Server-Timing'] = timings.server_timing()
+        endpoint = request.endpoint or '<unmatched>'
+        labels = (endpoint, request.method, str(response.status_code))
+
+        def record():
+            written = time.perf_counter()
+            self.writes.observe(written - timings.handled, endpoint)
+            self.requests.observe(written - timings.started, *labels)
+
+        # Runs once the server has written the body, so streamed responses are timed in full
+        response.call_on_close(record)
+        return response
+
+    @staticmethod
+    def _clear(exception=None):
+        _timings.set(None)
+
+    def _template_started(self, sender, template, context, **extra):
+        stack = getattr(self._rendering, 'stack', None)
+        if stack is None:
+            stack = self._rendering.stack = []
+        stack.append(time.perf_counter())
+
+    def _template_finished(self, sender, template, context, **extra):
+        stack = getattr(self._rendering, 'stack', None)
+        if not stack:
+            return
+        seconds = time.perf_counter() - stack.pop()
+        self.templates.observe(seconds, template.name or '<string>')
+        timings = _timings.get()
+        if timings is not None and timings.handled is None:
+            timings.seconds['tpl'] += seconds
+
+    def collect_caches(self):
+        """Exposition lines for every registered cache's counters"""
+        stats = {name: get_stats() for name, get_stats in sorted(self.caches.items())}
+        families = (
+            ('cache_hits_total', 'counter', 'Cache lookups served from memory', 'hits'),
+            ('cache_misses_total', 'counter', 'Cache lookups that had to load the value', 'misses'),
+            ('cache_evictions_total', 'counter', 'Entries evicted to stay within the size limit', 'evictions'),
+            ('cache_entries', 'gauge', 'Entries currently held', 'size'),
+            ('cache_hit_ratio', 'gauge', 'Hits over all lookups since startup', 'hit_rate'),
+        )
+        for name, metric_type, documentation, key in families:
+            yield f'# HELP {name} {documentation}'
+            yield f'# TYPE {name} {metric_type}'
+            for cache, values in stats.items():
+                yield f'{name}{{cache="{escape_label(cache)}"}} {values[key]}'
+
+    def render(self):
+        """The full Prometheus text exposition"""
+        lines = []
+        for histogram in (self.requests, self.writes, self.queries, self.templates):
+            lines.extend(histogram.collect())
+        lines.extend(self.collect_caches())
+        for collect in self.collectors:
+            lines.extend(collect())
+        return '\n'.join(lines) + '\n'
+
+    def expose(self):
+        """Prometheus scrape endpoint"""
+        response = self.app.response_class(self.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+        response.headers['Cache-Control'] = 'no-store'
+        return response
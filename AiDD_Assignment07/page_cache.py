@@ -0,0 +1,140 @@
+"""
+Rendered page cache for template-only routes
+Serves pre-rendered HTML bytes from memory, keyed by endpoint and template context,
+and renders layout fragments (header, footer) once for every page that repeats them
+"""
+
+import datetime
+import hashlib
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import has_request_context, request
+from jinja2 import meta, pass_context
+from markupsafe import Markup
+
+from cache import LRUCache
+
+# Context values of these types can change a page's output; objects like request/g/session are ignored
+_HASHABLE_TYPES = (str, int, float, bool, type(None))
+
+
+class PageCache:
+    """Cache of rendered pages and fragments, dropped whenever a template file changes on disk"""
+
+    def __init__(self, app=None, max_size=64, check_interval=1.0):
+        self.entries = LRUCache(max_size=max_size)
+        self.fragments = LRUCache(max_size=max_size)
+        self._fragment_names = {}
+        self.check_interval = check_interval
+        self._signature = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.app = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['page_cache'] = self
+        app.add_template_global(self.fragment, 'fragment')
+
+    def _template_signature(self):
+        """Latest modification time across the template folder"""
+        latest = 0.0
+        template_dir = os.path.join(self.app.root_path, self.app.template_folder)
+        for root, _dirs, files in os.walk(template_dir):
+            for name in files:
+                latest = max(latest, os.stat(os.path.join(root, name)).st_mtime)
+        return latest
+
+    def template_version(self):
+        """Latest template mtime, clearing the cache when it moves; rechecked at most once per interval"""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return self._signature
+        with self._lock:
+            if now - self._checked_at >= self.check_interval:
+                signature = self._template_signature()
+                if signature != self._signature:
+                    self.clear()
+                    self._signature = signature
+                self._checked_at = now
+            return self._signature
+
+    def context_hash(self):
+        """Hash of the scalar values the context processors would inject (e.g. current_year)"""
+        context = {}
+        self.app.update_template_context(context)
+        scalars = sorted(
+            (key, value) for key, value in context.items() if isinstance(value, _HASHABLE_TYPES)
+        )
+        return hashlib.sha1(repr(scalars).encode()).hexdigest()
+
+    def _fragment_variables(self, name):
+        """Names a partial reads from its context, found once from its source"""
+        names = self._fragment_names.get(name)
+        if names is None:
+            env = self.app.jinja_env
+            source = env.loader.get_source(env, name)[0]
+            names = self._fragment_names[name] = sorted(meta.find_undeclared_variables(env.parse(source)))
+        return names
+
+    @pass_context
+    def fragment(self, context, name, **variables):
+        """Template global rendering a partial once per distinct set of scalar inputs, then from memory
+
+        The partial sees the calling template's context plus variables. It is
+        keyed on the scalar values of the names it reads, so it must not
+        depend on anything else (lists, objects). Used by base.html for the
+        header and footer every page repeats.
+        """
+        self.template_version()
+        script_root = request.script_root if has_request_context() else ''
+        inputs = [(key, variables[key] if key in variables else context.get(key))
+                  for key in self._fragment_variables(name)]
+        cache_key = (name, script_root, tuple(item for item in inputs if isinstance(item[1], _HASHABLE_TYPES)))
+        markup = self.fragments.get(cache_key)
+        if markup is None:
+            markup = Markup(self.app.jinja_env.get_template(name).render(context.get_all(), **variables))
+            self.fragments.set(cache_key, markup)
+        return markup
+
+    def cached(self, view):
+        """Decorator serving a view's rendered page from memory after its first render
+
+        Cached pages carry a strong ETag (a hash of the body) and a Last-Modified
+        of when they were rendered, so revalidating clients get a 304 straight
+        from memory.
+        """
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(*args, **kwargs)
+            self.template_version()
+            key = (request.endpoint, request.script_root, self.context_hash())
+            entry = self.entries.get(key)
+            if entry is None:
+                response = self.app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                body = response.get_data()
+                rendered_at = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+                entry = (body, hashlib.sha1(body).hexdigest(), rendered_at)
+                self.entries.set(key, entry)
+            body, etag, rendered_at = entry
+            response = self.app.response_class(body, mimetype='text/html')
+            response.set_etag(etag)
+            response.last_modified = rendered_at
+            return response.make_conditional(request)
+        return wrapper
+
+    def clear(self):
+        self.entries.clear()
+        self.fragments.clear()
+        self._fragment_names.clear()
+
+    def stats(self):
+        return self.entries.stats()
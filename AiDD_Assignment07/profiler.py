@@ -0,0 +1,208 @@
+"""
+On-demand request profiling for production workers
+A request is profiled when it carries an X-Profile header signed with PROFILE_SECRET, or at
+random for a PROFILE_SAMPLE_RATE fraction of requests. Profiles are spooled to
+PROFILE_DIR: folded stacks (.folded, for flamegraph.pl or speedscope) from a
+stack sampler, or cProfile stats (.prof, for pstats or snakeviz).
+
+When neither trigger is configured the only per-request cost is one header lookup.
+Mint a header value with `flask --app app profile-token`.
+"""
+
+import cProfile
+import collections
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+
+import click
+from flask import request
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+PROFILE_MODES = ('sample', 'cprofile')
+
+
+def fold(frame):
+    """A stack in folded form: frames from the outermost in, separated by semicolons"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        # co_qualname (Class.method) is Python 3.11+; 3.10 has only the bare name
+        name = getattr(code, 'co_qualname', code.co_name)
+        names.append(f'{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """Samples one thread's stack every interval seconds from a helper thread"""
+
+    def __init__(self, thread_id, interval, max_seconds):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.counts = collections.Counter()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._done.set()
+        self._thread.join()
+
+    def _run(self):
+        deadline = time.monotonic() + self.max_seconds
+        while not self._done.wait(self.interval) and time.monotonic() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            self.counts[fold(frame)] += 1
+            del frame
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as output:
+            for stack, count in self.counts.most_common():
+                output.write(f'{stack} {count}\n')
+
+
+class CProfileRecorder:
+    """Deterministic profile of the calling thread"""
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def dump(self, path):
+        self.profile.dump_stats(path)
+
+
+class Profiler:
+    """Per-request profiling hook
+
+    Configured from app.config:
+        PROFILE_SAMPLE_RATE    fraction of requests profiled at random (0 disables)
+        PROFILE_DIR            spool directory for profiles
+        PROFILE_MODE           'sample' (folded stacks) or 'cprofile'
+        PROFILE_INTERVAL       seconds between stack samples
+        PROFILE_MAX_SECONDS    the sampler gives up on requests running longer than this
+        PROFILE_MAX_FILES      newest profiles kept in PROFILE_DIR
+        PROFILE_SECRET         key signing profiling tokens; unset (the default)
+                               ignores the header, so only sampling can profile
+        PROFILE_HEADER         request header carrying a signed profiling token
+        PROFILE_TOKEN_MAX_AGE  seconds a token stays valid
+
+    The profile runs from before_request until the request context is torn
+    down, so streamed responses are profiled until their last chunk. Register
+    it before other extensions so their hooks are included.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._sequence = itertools.count()
+        self._write_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PROFILE_SAMPLE_RATE', 0.0)
+        app.config.setdefault('PROFILE_DIR', 'profiles')
+        app.config.setdefault('PROFILE_MODE', 'sample')
+        app.config.setdefault('PROFILE_SECRET', None)
+        app.config.setdefault('PROFILE_INTERVAL', 0.001)
+        app.config.setdefault('PROFILE_MAX_SECONDS', 30)
+        app.config.setdefault('PROFILE_MAX_FILES', 200)
+        app.config.setdefault('PROFILE_HEADER', 'X-Profile')
+        app.config.setdefault('PROFILE_TOKEN_MAX_AGE', 3600)
+        self.app = app
+        app.extensions['profiler'] = self
+        app.before_request(self._start)
+        app.after_request(self._tag)
+        app.teardown_request(self._finish)
+
+        @app.cli.command('profile-token')
+        @click.option('--mode', type=click.Choice(PROFILE_MODES), default=None, help='profile type (default: PROFILE_MODE)')
+        def profile_token(mode):
+            """Print a signed X-Profile header value for profiling requests on demand"""
+            try:
+                click.echo(self.make_token(mode))
+            except RuntimeError as error:
+                raise click.ClickException(str(error))
+
+    def _serializer(self):
+        # Not SECRET_KEY: a token makes the worker write files, so it gets a secret of its own
+        return URLSafeTimedSerializer(self.app.config['PROFILE_SECRET'], salt='request-profile')
+
+    def make_token(self, mode=None):
+        """A header value that turns profiling on for requests carrying it, until PROFILE_TOKEN_MAX_AGE"""
+        if not self.app.config['PROFILE_SECRET']:
+            raise RuntimeError('PROFILE_SECRET is not set, so profiling tokens are disabled')
+        return self._serializer().dumps({'mode': mode or self.app.config['PROFILE_MODE']})
+
+    def requested_mode(self):
+        """The profiling mode for the current request, or None to leave it alone"""
+        config = self.app.config
+        # Straight from the WSGI environ: cheaper than request.headers on the path every request takes
+        token = request.environ.get('HTTP_' + config['PROFILE_HEADER'].upper().replace('-', '_'))
+        if token is not None and config['PROFILE_SECRET']:
+            try:
+                mode = self._serializer().loads(token, max_age=config['PROFILE_TOKEN_MAX_AGE'])['mode']
+            except (BadSignature, KeyError, TypeError):
+                return None
+            return mode if mode in PROFILE_MODES else None
+        rate = config['PROFILE_SAMPLE_RATE']
+        if rate and random.random() < rate:
+            return config['PROFILE_MODE']
+        return None
+
+    def _start(self):
+        mode = self.requested_mode()
+        if mode is None:
+            return
+        config = self.app.config
+        if mode == 'cprofile':
+            recorder = CProfileRecorder()
+        else:
+            recorder = StackSampler(threading.get_ident(), config['PROFILE_INTERVAL'], config['PROFILE_MAX_SECONDS'])
+        endpoint = (request.endpoint or 'unmatched').replace('.', '-')
+        extension = '.prof' if mode == 'cprofile' else '.folded'
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._sequence)}-{endpoint}{extension}"
+        request.environ['profiler.run'] = (recorder, name)
+        recorder.start()
+
+    def _tag(self, response):
+        # Only callers holding a token learn where their profile went
+        run = request.environ.get('profiler.run')
+        if run is not None and self.app.config['PROFILE_SECRET'] and self.app.config['PROFILE_HEADER'] in request.headers:
+            response.headers['X-Profile-File'] = run[1]
+        return response
+
+    def _finish(self, exception=None):
+        run = request.environ.pop('profiler.run', None)
+        if run is None:
+            return
+        recorder, name = run
+        recorder.stop()
+        folder = self.app.config['PROFILE_DIR']
+        with self._write_lock:
+            os.makedirs(folder, exist_ok=True)
+            recorder.dump(os.path.join(folder, name))
+            self._prune(folder)
+
+    def _prune(self, folder):
+        """Delete the oldest profiles beyond PROFILE_MAX_FILES"""
+        profiles = sorted(
+            (entry for entry in os.scandir(folder) if entry.name.endswith(('.folded', '.prof'))),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in profiles[:max(len(profiles) - self.app.config['PROFILE_MAX_FILES'], 0)]:
+            os.remove(entry.path)
@@ -0,0 +1,146 @@
+"""
+Test suite for the JSON REST API (api.py)
+Tests paginated reads and batch create/update/delete endpoints
+"""
+import pytest
+import DAL
+
+
+class TestApiReads:
+    """Test class for GET endpoints"""
+    
+    def test_list_projects_paginated(self, client, test_db, populate_projects):
+        """Test that listing follows next_cursor through every page"""
+        populate_projects(5)
+        
+        first = client.get('/api/projects?limit=3').get_json()
+        assert len(first['projects']) == 3
+        assert first['next_cursor']
+        
+        second = client.get(f"/api/projects?limit=3&cursor={first['next_cursor']}").get_json()
+        assert len(second['projects']) == 2
+        assert second['next_cursor'] is None
+    
+    def test_get_single_project(self, client, test_db, sample_project):
+        """Test fetching one project as JSON"""
+        project_id = DAL.insert_project(**sample_project)
+        response = client.get(f'/api/projects/{project_id}')
+        assert response.status_code == 200
+        assert response.get_json()['title'] == sample_project['title']
+    
+    def test_missing_project_is_json_404(self, client, test_db):
+        """Test that unknown IDs produce a JSON error"""
+        response = client.get('/api/projects/99999')
+        assert response.status_code == 404
+        assert 'error' in response.get_json()
+    
+    def test_bad_cursor_is_json_400(self, client, test_db):
+        """Test that a malformed cursor is rejected with a JSON error"""
+        response = client.get('/api/projects?cursor=garbage')
+        assert response.status_code == 400
+        assert 'error' in response.get_json()
+
+
+class TestApiBatchWrites:
+    """Test class for batch POST, PATCH and DELETE"""
+    
+    def test_create_single_object(self, client, test_db, sample_project):
+        """Test that a lone JSON object is accepted"""
+        response = client.post('/api/projects', json=sample_project)
+        assert response.status_code == 201
+        ids = response.get_json()['ids']
+        assert DAL.get_project_by_id(ids[0])['title'] == sample_project['title']
+    
+    def test_create_ten_thousand_in_one_transaction(self, client, test_db, monkeypatch):
+        """Test that a 10k-item array is loaded by one request and one commit"""
+        writes = []
+        original = DAL.run_write
+        monkeypatch.setattr(DAL, 'run_write', lambda work: writes.append(1) or original(work))
+        
+        items = [
+            {'title': f'Batch {i}', 'description': 'Loaded via API', 'image_filename': 'batch.svg'}
+            for i in range(10_000)
+        ]
+        response = client.post('/api/projects', json=items)
+        
+        assert response.status_code == 201
+        body = response.get_json()
+        assert body['created'] == 10_000
+        assert len(set(body['ids'])) == 10_000
+        assert len(writes) == 1
+        assert len(DAL.get_all_projects()) == 10_000
+        assert DAL.get_project_by_id(body['ids'][-1])['title'] == 'Batch 9999'
+    
+    def test_create_rejects_whole_batch_on_invalid_item(self, client, test_db, sample_project):
+        """Test that one bad item fails the request without inserting anything"""
+        response = client.post('/api/projects', json=[sample_project, {'title': 'No description'}])
+        assert response.status_code == 400
+        assert 'Item 1' in response.get_json()['error']
+        assert DAL.get_all_projects() == []
+    
+    @pytest.mark.parametrize('body', [None, [], 'text', [1, 2]])
+    def test_create_rejects_malformed_bodies(self, client, test_db, body):
+        """Test that non-object payloads are rejected"""
+        if body is None:
+            response = client.post('/api/projects', data='not json', content_type='application/json')
+        else:
+            response = client.post('/api/projects', json=body)
+        assert response.status_code == 400
+    
+    def test_create_rejects_oversized_batch(self, app, client, test_db, sample_project, monkeypatch):
+        """Test that batches above API_MAX_BATCH are refused"""
+        monkeypatch.setitem(app.config, 'API_MAX_BATCH', 2)
+        response = client.post('/api/projects', json=[sample_project] * 3)
+        assert response.status_code == 400
+    
+    def test_patch_updates_only_given_fields(self, client, test_db, multiple_projects):
+        """Test that PATCH changes the listed fields and leaves the rest"""
+        ids = DAL.insert_projects(multiple_projects)
+        response = client.patch('/api/projects', json=[
+            {'id': ids[0], 'title': 'Patched One'},
+            {'id': ids[1], 'description': 'Patched description'},
+            {'id': 99999, 'title': 'Missing'},
+        ])
+        
+        assert response.get_json()['updated'] == 2
+        first = DAL.get_project_by_id(ids[0])
+        assert first['title'] == 'Patched One'
+        assert first['description'] == multiple_projects[0]['description']
+        assert DAL.get_project_by_id(ids[1])['description'] == 'Patched description'
+    
+    def test_patch_requires_ids(self, client, test_db):
+        """Test that PATCH items without an integer id are rejected"""
+        response = client.patch('/api/projects', json=[{'title': 'No id'}])
+        assert response.status_code == 400
+    
+    def test_delete_by_id_list(self, client, test_db, multiple_projects):
+        """Test that DELETE removes every listed project and reports the count"""
+        ids = DAL.insert_projects(multiple_projects)
+        response = client.delete('/api/projects', json={'ids': ids[:2] + [99999]})
+        
+        assert response.get_json()['deleted'] == 2
+        remaining = DAL.get_all_projects()
+        assert [p['id'] for p in remaining] == [ids[2]]
+    
+    def test_delete_rejects_non_integer_ids(self, client, test_db):
+        """Test that DELETE validates the id list"""
+        response = client.delete('/api/projects', json={'ids': ['1']})
+        assert response.status_code == 400
+
+
+class TestApiSearch:
+    """Test class for /api/search"""
+    
+    def test_search_returns_ranked_results(self, client, test_db):
+        """Test that search returns matches with rank and highlighted snippet"""
+        DAL.insert_project('Kafka Streaming', 'Event ingestion', 'a.svg')
+        DAL.insert_project('Batch ETL', 'Nightly loads, not kafka based', 'b.svg')
+        
+        body = client.get('/api/search?q=kafka').get_json()
+        assert [r['title'] for r in body['results']] == ['Kafka Streaming', 'Batch ETL']
+        assert '<mark>kafka</mark>' in body['results'][1]['snippet']
+    
+    def test_search_requires_query(self, client, test_db):
+        """Test that an empty query is a 400"""
+        response = client.get('/api/search?q=')
+        assert response.status_code == 400
@@ -0,0 +1,154 @@
+"""
+Test suite for the static asset pipeline (assets.py)
+Tests minification, the fingerprint manifest and precompressed serving
+"""
+import gzip
+import os
+import shutil
+
+import pytest
+from flask import Flask, url_for
+
+import assets
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+
+@pytest.fixture
+def built_static(tmp_path):
+    """A copy of the static folder with the pipeline's output built into it"""
+    static_dir = tmp_path / 'static'
+    shutil.copytree(STATIC_DIR, static_dir, ignore=shutil.ignore_patterns(assets.DIST_DIR))
+    manifest = assets.build(str(static_dir))
+    return static_dir, manifest
+
+
+@pytest.fixture
+def asset_app(built_static):
+    """A bare Flask app serving the built static folder"""
+    static_dir, _manifest = built_static
+    app = Flask(__name__, static_folder=str(static_dir))
+    assets.StaticAssets(app)
+    return app
+
+
+class TestMinifiers:
+    """Test class for the CSS and JS minifiers"""
+
+    def test_css_whitespace_and_comments(self):
+        """Test that comments and whitespace go but selectors and calc() keep their meaning"""
+        source = '/* header */\n.a .b > .c {\n  top: calc(100% + 0.5rem);\n  color: red;\n}\n'
+        assert assets.minify_css(source) == '.a .b>.c{top:calc(100% + 0.5rem);color:red}'
+
+    def test_css_strings_untouched(self):
+        """Test that string literals keep their spaces and comment-like text"""
+        source = 'a:after { content: " ( /* not a comment */ ) "; }'
+        assert assets.minify_css(source) == 'a:after{content:" ( /* not a comment */ ) "}'
+
+    def test_js_keeps_code_lines(self):
+        """Test that only comment-only lines, indentation and blank lines are dropped"""
+        source = '/**\n * Docs\n */\nfunction f() {\n  // note\n\n  return "//kept";\n}\n'
+        assert assets.minify_js(source) == 'function f() {\nreturn "//kept";\n}\n'
+
+
+class TestBuild:
+    """Test class for the build step"""
+
+    def test_manifest_fingerprints_every_file(self, built_static):
+        """Test that every static file maps to a content-hashed path under dist/"""
+        static_dir, manifest = built_static
+        assert set(manifest['assets']) >= {'css/styles.css', 'js/script.js', 'images/headshot.jpg'}
+        for filename, hashed in manifest['assets'].items():
+            assert hashed.startswith('dist/')
+            assert (static_dir / hashed).exists()
+        assert manifest['assets']['css/styles.css'] != 'dist/css/styles.css'
+
+    def test_css_and_js_are_minified(self, built_static):
+        """Test that built CSS/JS are smaller than their sources"""
+        static_dir, manifest = built_static
+        for filename in ('css/styles.css', 'js/script.js'):
+            built = (static_dir / manifest['assets'][filename]).stat().st_size
+            assert built < (static_dir / filename).stat().st_size
+
+    def test_precompressed_variants(self, built_static):
+        """Test that text assets get gzip/brotli variants and JPEGs do not"""
+        static_dir, manifest = built_static
+        css = manifest['assets']['css/styles.css']
+        expected = ['br', 'gzip'] if assets.brotli is not None else ['gzip']
+        assert manifest['precompressed'][css] == expected
+        assert gzip.decompress((static_dir / (css + '.gz')).read_bytes()) == (static_dir / css).read_bytes()
+        assert manifest['assets']['images/headshot.jpg'] not in manifest['precompressed']
+
+    def test_build_is_reproducible(self, built_static):
+        """Test that rebuilding unchanged sources yields the same fingerprints"""
+        static_dir, manifest = built_static
+        assert assets.build(str(static_dir)) == manifest
+
+
+class TestStaticAssets:
+    """Test class for fingerprinted URLs and precompressed serving"""
+
+    def test_url_for_emits_fingerprinted_path(self, asset_app, built_static):
+        """Test that url_for('static') points at the hashed file"""
+        _static_dir, manifest = built_static
+        with asset_app.test_request_context():
+            assert url_for('static', filename='css/styles.css') == '/static/' + manifest['assets']['css/styles.css']
+            assert url_for('static', filename='missing.css') == '/static/missing.css'
+
+    def test_digest_follows_manifest(self, asset_app, built_static):
+        """Test that the template context carries a digest that moves when a rebuild changes any asset"""
+        static_dir, _manifest = built_static
+        static_assets = asset_app.extensions['static_assets']
+        with asset_app.test_request_context():
+            context = {}
+            asset_app.update_template_context(context)
+        assert context['static_digest'] == static_assets.digest != ''
+        with open(static_dir / 'css' / 'styles.css', 'a') as f:
+            f.write('\n.rebuilt { color: red; }\n')
+        assets.build(str(static_dir))
+        before = static_assets.digest
+        static_assets.load()
+        assert static_assets.digest != before
+        assert static_assets.modified > 0
+
+    def test_url_for_unchanged_in_debug(self, asset_app):
+        """Test that debug mode keeps plain URLs so edits show up without a rebuild"""
+        asset_app.debug = True
+        with asset_app.test_request_context():
+            assert url_for('static', filename='css/styles.css') == '/static/css/styles.css'
+
+    def test_serves_negotiated_encoding(self, asset_app, built_static):
+        """Test that the precompressed variant matching Accept-Encoding is served"""
+        static_dir, manifest = built_static
+        css = manifest['assets']['css/styles.css']
+        client = asset_app.test_client()
+
+        response = client.get('/static/' + css, headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.mimetype == 'text/css'
+        assert response.data == (static_dir / (css + '.gz')).read_bytes()
+        assert 'Accept-Encoding' in response.headers['Vary']
+
+        if assets.brotli is not None:
+            response = client.get('/static/' + css, headers={'Accept-Encoding': 'gzip, br'})
+            assert response.headers['Content-Encoding'] == 'br'
+
+        response = client.get('/static/' + css)
+        assert 'Content-Encoding' not in response.headers
+        assert response.data == (static_dir / css).read_bytes()
+
+    def test_fingerprinted_files_are_immutable(self, asset_app, built_static):
+        """Test that hashed URLs are cacheable for a year"""
+        _static_dir, manifest = built_static
+        response = asset_app.test_client().get('/static/' + manifest['assets']['images/headshot.jpg'])
+        assert response.status_code == 200
+        assert response.cache_control.immutable
+        assert response.cache_control.public
+        assert response.cache_control.max_age == assets.IMMUTABLE_MAX_AGE
+        assert 'Content-Encoding' not in response.headers
+
+    def test_original_paths_still_served(self, asset_app):
+        """Test that unfingerprinted URLs keep working, without the immutable header"""
+        response = asset_app.test_client().get('/static/css/styles.css')
+        assert response.status_code == 200
+        assert not response.cache_control.immutable
@@ -0,0 +1,181 @@
+"""
+Test suite for the async DAL (DAL_async.py) and the ASGI entry point (asgi.py)
+Coroutines are driven with asyncio.run; ASGI requests go through a minimal in-process harness
+"""
+import asyncio
+import json
+import os
+
+import pytest
+
+import DAL
+import DAL_async
+
+
+@pytest.fixture
+def asgi_app(monkeypatch):
+    """The ASGI app, imported without leaking its DB pool sizing into other tests' environment"""
+    for name in ('DB_POOL_SIZE', 'DB_EXECUTOR_WORKERS'):
+        if name in os.environ:
+            monkeypatch.setenv(name, os.environ[name])
+        else:
+            monkeypatch.delenv(name, raising=False)
+    import asgi
+    return asgi.app
+
+
+def asgi_request(app, path, query=''):
+    """Send one GET through the ASGI app; returns (status, headers, body)"""
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'root_path': '',
+        'query_string': query.encode(),
+        'headers': [(b'host', b'testserver')],
+        'client': ('127.0.0.1', 50000),
+        'server': ('testserver', 80),
+    }
+    messages = []
+
+    async def run():
+        requested = False
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await asyncio.Event().wait()  # the client never disconnects
+
+        async def send(message):
+            messages.append(message)
+
+        await app(scope, receive, send)
+
+    asyncio.run(run())
+    start = messages[0]
+    body = b''.join(m.get('body', b'') for m in messages[1:])
+    return start['status'], dict(start['headers']), body
+
+
+class TestAsyncDAL:
+    """Test class for the coroutine mirrors of the DAL"""
+
+    def test_insert_and_get(self, test_db, sample_project):
+        """Test that an inserted project can be read back through the async API"""
+        async def scenario():
+            project_id = await DAL_async.insert_project(**sample_project)
+            return await DAL_async.get_project_by_id(project_id)
+
+        project = asyncio.run(scenario())
+        assert project['title'] == sample_project['title']
+
+    def test_batch_writes_and_paging(self, test_db, multiple_projects):
+        """Test batch insert, partial update, keyset paging and batch delete"""
+        async def scenario():
+            ids = await DAL_async.insert_projects(multiple_projects)
+            await DAL_async.update_projects([{'id': ids[0], 'title': 'Renamed'}])
+            first, cursor = await DAL_async.get_projects_page(2)
+            rest, end = await DAL_async.get_projects_page(2, cursor)
+            deleted = await DAL_async.delete_projects(ids)
+            return ids, first, rest, end, deleted, await DAL_async.get_all_projects()
+
+        ids, first, rest, end, deleted, remaining = asyncio.run(scenario())
+        assert [p['id'] for p in first + rest] == list(reversed(ids))
+        assert rest[-1]['title'] == 'Renamed'
+        assert end is None
+        assert deleted == len(ids)
+        assert remaining == []
+
+    def test_search(self, test_db, multiple_projects):
+        """Test full-text search through the async API"""
+        asyncio.run(DAL_async.insert_projects(multiple_projects))
+        results = asyncio.run(DAL_async.search_projects('two'))
+        assert [r['title'] for r in results] == ['Project Two']
+
+    def test_concurrent_calls_return_connections(self, test_db, populate_projects):
+        """Test that many concurrent awaits share the executor and leave every pool slot free"""
+        populate_projects(10)
+        DAL.release_connection()  # the loader's lease on this thread
+
+        async def scenario():
+            return await asyncio.gather(*(DAL_async.get_projects_page(5) for _ in range(200)))
+
+        pages = asyncio.run(scenario())
+        assert all(len(page) == 5 for page, _cursor in pages)
+        pool = DAL.get_pool()
+        assert pool._slots._value == pool.size
+
+    def test_runs_off_the_event_loop_thread(self, test_db):
+        """Test that DAL work happens on the dedicated executor, not the loop's thread"""
+        import threading
+
+        thread_name = asyncio.run(DAL_async.run(lambda: threading.current_thread().name))
+        assert thread_name.startswith('dal')
+
+
+class TestAsgiApp:
+    """Test class for the ASGI entry point"""
+
+    def test_list_projects(self, asgi_app, test_db, populate_projects):
+        """Test that the async listing follows next_cursor through every page"""
+        populate_projects(5)
+
+        status, headers, body = asgi_request(asgi_app, '/api/projects', 'limit=3')
+        first = json.loads(body)
+        assert status == 200
+        assert headers[b'content-type'] == b'application/json'
+        assert len(first['projects']) == 3
+
+        _status, _headers, body = asgi_request(asgi_app, '/api/projects', f"limit=3&cursor={first['next_cursor']}")
+        second = json.loads(body)
+        assert len(second['projects']) == 2
+        assert second['next_cursor'] is None
+
+    def test_matches_flask_api(self, asgi_app, client, test_db, multiple_projects):
+        """Test that async handlers return the same JSON as the Flask blueprint"""
+        ids = DAL.insert_projects(multiple_projects)
+        for path, query in (('/api/projects', 'limit=2'), (f'/api/projects/{ids[1]}', ''), ('/api/search', 'q=project')):
+            _status, _headers, body = asgi_request(asgi_app, path, query)
+            assert json.loads(body) == client.get(f'{path}?{query}').get_json()
+
+    def test_errors_are_json(self, asgi_app, test_db):
+        """Test that missing projects, bad cursors and empty searches get JSON errors"""
+        for path, query, code in (
+            ('/api/projects/9999', '', 404),
+            ('/api/projects', 'cursor=not-a-cursor', 400),
+            ('/api/search', 'q=', 400),
+        ):
+            status, _headers, body = asgi_request(asgi_app, path, query)
+            assert status == code
+            assert 'error' in json.loads(body)
+
+    def test_other_routes_fall_through_to_flask(self, asgi_app, test_db):
+        """Test that HTML pages are still served by the Flask app"""
+        status, headers, body = asgi_request(asgi_app, '/about')
+        assert status == 200
+        assert headers[b'content-type'].startswith(b'text/html')
+        assert b'<html' in body.lower()
+
+    def test_lifespan(self, asgi_app, test_db):
+        """Test that startup and shutdown complete and shutdown drains the executor"""
+        sent = []
+
+        async def scenario():
+            queue = asyncio.Queue()
+            for message in ('lifespan.startup', 'lifespan.shutdown'):
+                queue.put_nowait({'type': message})
+
+            async def send(message):
+                sent.append(message['type'])
+
+            await asgi_app({'type': 'lifespan'}, queue.get, send)
+
+        asyncio.run(scenario())
+        assert sent == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+        assert DAL_async._executor is None
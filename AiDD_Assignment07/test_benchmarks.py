@@ -0,0 +1,143 @@
+"""
+Benchmark suite for the DAL and the main routes
+Opt-in: run with `pytest test_benchmarks.py --benchmark`. Results are written to
+benchmarks/results.json and checked against benchmarks/baseline.json (record
+one with --benchmark-save); see the benchmark options in conftest.py.
+"""
+import itertools
+
+import pytest
+
+import DAL
+from benchmarks.loadtest import run_load
+
+pytestmark = pytest.mark.benchmark
+
+
+def pytest_generate_tests(metafunc):
+    if 'table_size' in metafunc.fixturenames:
+        sizes = [int(size) for size in metafunc.config.getoption('--benchmark-sizes').split(',')]
+        metafunc.parametrize('table_size', sizes)
+
+
+@pytest.fixture
+def table(populate_projects, table_size):
+    """A projects table of table_size rows, with the pooled connection's caches warm"""
+    populate_projects(table_size)
+    DAL.get_all_projects()
+    return table_size
+
+
+def cold(func):
+    """Benchmark options for a read measured without the project cache"""
+    return {'func': func, 'setup': DAL._project_cache.clear}
+
+
+class TestDALReads:
+    """Benchmark class for DAL reads at each table size (project cache cleared before every call)"""
+
+    def test_get_all_projects(self, benchmark, table):
+        benchmark(f'dal.get_all_projects[{table}]', **cold(DAL.get_all_projects))
+
+    def test_get_projects_page(self, benchmark, table):
+        benchmark(f'dal.get_projects_page[{table}]', **cold(lambda: DAL.get_projects_page(50)))
+
+    def test_get_projects_page_deep(self, benchmark, table):
+        page, cursor = DAL.get_projects_page(max(table - 50, 1))
+        benchmark(f'dal.get_projects_page_deep[{table}]', **cold(lambda: DAL.get_projects_page(50, cursor)))
+
+    def test_get_project_by_id(self, benchmark, table):
+        ids = itertools.cycle(range(1, table + 1))
+        benchmark(f'dal.get_project_by_id[{table}]', **cold(lambda: DAL.get_project_by_id(next(ids))))
+
+    def test_search_projects(self, benchmark, table):
+        benchmark(f'dal.search_projects[{table}]', **cold(lambda: DAL.search_projects('generated', 20)))
+
+    def test_iter_projects(self, benchmark, table):
+        benchmark(f'dal.iter_projects[{table}]', lambda: sum(1 for _ in DAL.iter_projects()))
+
+    def test_get_projects_version(self, benchmark, table):
+        benchmark(f'dal.get_projects_version[{table}]', DAL.get_projects_version)
+
+
+class TestReplicaReads:
+    """Benchmark class for DAL reads in READ_REPLICA mode (project cache cleared before every call)"""
+
+    @pytest.fixture(autouse=True)
+    def replica(self, monkeypatch, table):
+        monkeypatch.setattr(DAL, 'READ_REPLICA', True)
+        DAL.get_all_projects()
+
+    def test_get_all_projects(self, benchmark, table):
+        benchmark(f'replica.get_all_projects[{table}]', **cold(DAL.get_all_projects))
+
+    def test_get_projects_page(self, benchmark, table):
+        benchmark(f'replica.get_projects_page[{table}]', **cold(lambda: DAL.get_projects_page(50)))
+
+    def test_get_project_by_id(self, benchmark, table):
+        ids = itertools.cycle(range(1, table + 1))
+        benchmark(f'replica.get_project_by_id[{table}]', **cold(lambda: DAL.get_project_by_id(next(ids))))
+
+    def test_refresh(self, benchmark, table):
+        replica = DAL.get_replica()
+        benchmark(f'replica.refresh[{table}]', replica._copy)
+
+
+class TestDALWrites:
+    """Benchmark class for DAL writes at each table size"""
+
+    def test_insert_project(self, benchmark, table):
+        benchmark(f'dal.insert_project[{table}]', lambda: DAL.insert_project('Bench', 'Benchmark row', 'bench.svg'))
+
+    def test_update_project(self, benchmark, table):
+        benchmark(f'dal.update_project[{table}]', lambda: DAL.update_project(1, 'Renamed', 'Updated row', 'bench.svg'))
+
+    def test_delete_project(self, benchmark, table):
+        ids = iter(range(1, table + 1))
+        benchmark(f'dal.delete_project[{table}]', lambda: DAL.delete_project(next(ids)), max_runs=table)
+
+    def test_insert_projects_batch(self, benchmark, table):
+        rows = [{'title': f'Batch {i}', 'description': 'Batch row', 'image_filename': 'bench.svg'} for i in range(100)]
+        benchmark(f'dal.insert_projects_x100[{table}]', lambda: DAL.insert_projects(rows))
+
+    def test_insert_messages_batch(self, benchmark, test_db):
+        messages = [
+            {'name': 'Bench', 'email': 'bench@example.com', 'subject': 'Hi', 'message': f'Message {i}',
+             'created_at': '2024-01-01 00:00:00'}
+            for i in range(100)
+        ]
+        benchmark('dal.insert_messages_x100', lambda: DAL.insert_messages(messages))
+
+    def test_job_round_trip(self, benchmark, test_db):
+        def round_trip():
+            DAL.enqueue_job('bench', {}, 0, 1)
+            DAL.complete_job(DAL.claim_job(1, 60)['id'])
+        benchmark('dal.job_enqueue_claim_complete', round_trip)
+
+
+class TestHTTPLoad:
+    """Benchmark class for concurrent load against the main routes on a local server"""
+
+    CONCURRENCY = 8
+
+    def load(self, request, name, base_url, paths, **options):
+        result = run_load(base_url, paths, self.CONCURRENCY, request.config.getoption('--benchmark-duration'), **options)
+        request.config.benchmark_results[name] = result
+        assert result['requests'] and not result['errors']
+        return result
+
+    @pytest.mark.parametrize('path', ['/', '/projects'])
+    def test_get(self, request, http_server, populate_projects, path):
+        populate_projects(1000)
+        run_load(http_server, [path], self.CONCURRENCY, 0.5)  # warm up
+        self.load(request, f'http.GET {path}', http_server, [path])
+
+    def test_add_project(self, request, http_server):
+        form = ('title=Load+test&description=Added+under+load&image_filename=bench.svg', 'application/x-www-form-urlencoded')
+        self.load(request, 'http.POST /add_project', http_server, ['/add_project'], method='POST', body_factory=lambda: form)
+
+    def test_delete_project(self, request, http_server, populate_projects):
+        populate_projects(20_000)
+        paths = [f'/delete_project/{project_id}' for project_id in range(1, 20_001)]
+        self.load(request, 'http.POST /delete_project/<id>', http_server, paths, method='POST',
+                  body_factory=lambda: (b'', 'application/x-www-form-urlencoded'))
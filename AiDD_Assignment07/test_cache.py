@@ -0,0 +1,71 @@
+"""
+Test suite for the in-process cache (cache.py)
+Tests LRU eviction, expiry and hit/miss accounting
+"""
+import time
+
+from cache import LRUCache
+
+
+class TestLRUCache:
+    """Test class for the size- and time-bounded LRU cache"""
+    
+    def test_get_and_set(self):
+        """Test storing and retrieving a value"""
+        cache = LRUCache(max_size=2)
+        cache.set('a', 1)
+        assert cache.get('a') == 1
+        assert cache.get('missing') is None
+    
+    def test_least_recently_used_entry_evicted(self):
+        """Test that the entry not touched for longest is evicted first"""
+        cache = LRUCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
+        assert cache.stats()['evictions'] == 1
+    
+    def test_entries_expire_after_ttl(self):
+        """Test that entries older than the TTL are treated as misses"""
+        cache = LRUCache(max_size=2, ttl=0.01)
+        cache.set('a', 1)
+        time.sleep(0.02)
+        assert cache.get('a') is None
+        assert len(cache) == 0
+    
+    def test_get_or_load_caches_falsy_values(self):
+        """Test that a loaded None is cached rather than reloaded"""
+        cache = LRUCache(max_size=2)
+        calls = []
+        
+        def loader():
+            calls.append(1)
+            return None
+        
+        assert cache.get_or_load('k', loader) is None
+        assert cache.get_or_load('k', loader) is None
+        assert len(calls) == 1
+    
+    def test_hit_and_miss_counters(self):
+        """Test that stats report hits, misses and hit rate"""
+        cache = LRUCache(max_size=2)
+        cache.get('a')
+        cache.set('a', 1)
+        cache.get('a')
+        cache.get('a')
+        
+        stats = cache.stats()
+        assert stats['hits'] == 2
+        assert stats['misses'] == 1
+        assert stats['hit_rate'] == 2 / 3
+    
+    def test_zero_size_disables_caching(self):
+        """Test that a cache with max_size 0 never stores anything"""
+        cache = LRUCache(max_size=0)
+        cache.set('a', 1)
+        assert cache.get('a') is None
@@ -0,0 +1,125 @@
+"""
+Test suite for the response compression middleware (compression.py)
+Tests encoding negotiation, size/type thresholds, streaming, caching and per-route savings
+"""
+import gzip
+
+import pytest
+
+import compression
+import DAL
+
+
+def decode(response):
+    """Decompress a response body according to its Content-Encoding"""
+    encoding = response.headers.get('Content-Encoding')
+    if encoding == 'gzip':
+        return gzip.decompress(response.data)
+    if encoding == 'br':
+        return compression.brotli.decompress(response.data)
+    if encoding == 'zstd':
+        return compression.zstandard.ZstdDecompressor().decompressobj().decompress(response.data)
+    return response.data
+
+
+class TestNegotiation:
+    """Test class for Accept-Encoding negotiation"""
+
+    @pytest.mark.parametrize('encoding', ['gzip', 'br', 'zstd'])
+    def test_encodes_html(self, client, test_db, encoding):
+        """Test that each supported encoding round-trips to the identity body"""
+        if not compression._AVAILABLE[encoding]:
+            pytest.skip(f'{encoding} encoder not installed')
+        plain = client.get('/resume')
+        response = client.get('/resume', headers={'Accept-Encoding': encoding})
+        assert response.headers['Content-Encoding'] == encoding
+        assert int(response.headers['Content-Length']) == len(response.data) < len(plain.data)
+        assert decode(response) == plain.data
+        assert 'Accept-Encoding' in response.headers['Vary']
+
+    def test_quality_values(self, client, test_db):
+        """Test that client q-values outrank the server's preference order"""
+        response = client.get('/resume', headers={'Accept-Encoding': 'br;q=0.5, zstd;q=0.5, gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        response = client.get('/resume', headers={'Accept-Encoding': 'gzip;q=0'})
+        assert 'Content-Encoding' not in response.headers
+
+    def test_identity_without_accept_encoding(self, client, test_db):
+        """Test that clients not asking for compression get the response untouched"""
+        response = client.get('/resume')
+        assert 'Content-Encoding' not in response.headers
+        assert 'Vary' not in response.headers
+
+    def test_head_not_encoded(self, client, test_db):
+        """Test that HEAD responses keep the identity headers"""
+        response = client.head('/resume', headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in response.headers
+
+
+class TestThresholds:
+    """Test class for content type and size thresholds"""
+
+    def test_small_bodies_skipped(self, client, test_db, sample_project):
+        """Test that bodies under COMPRESS_MIN_SIZE are sent as they are"""
+        project_id = DAL.insert_project(**sample_project)
+        response = client.get(f'/api/projects/{project_id}', headers={'Accept-Encoding': 'gzip'})
+        assert len(response.data) < client.application.config['COMPRESS_MIN_SIZE']
+        assert 'Content-Encoding' not in response.headers
+
+    def test_json_compressed(self, client, test_db, populate_projects):
+        """Test that large JSON responses are compressed"""
+        populate_projects(50)
+        response = client.get('/api/projects', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert len(decode(response)) > len(response.data)
+
+    def test_images_skipped(self, client):
+        """Test that already-compressed types are not re-encoded"""
+        response = client.get('/static/images/headshot.jpg', headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in response.headers
+
+    def test_no_transform_respected(self, app, client):
+        """Test that Cache-Control: no-transform opts a response out"""
+        headers = {'Content-Type': 'text/plain', 'Cache-Control': 'no-transform', 'Content-Length': '1000'}
+        assert not app.extensions['compression'].should_compress(200, headers)
+
+
+class TestCachingAndStreaming:
+    """Test class for ETag handling, the compressed body cache and streamed responses"""
+
+    def test_etag_weakened_and_revalidates(self, client, test_db):
+        """Test that encoded responses carry a weak ETag that still yields 304"""
+        response = client.get('/resume', headers={'Accept-Encoding': 'gzip'})
+        etag = response.headers['ETag']
+        assert etag.startswith('W/')
+        revalidated = client.get('/resume', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        assert revalidated.status_code == 304
+
+    def test_compressed_bodies_cached_by_etag(self, app, client, test_db):
+        """Test that a page-cached response is compressed once per encoding"""
+        cache = app.extensions['compression'].cache
+        client.get('/about', headers={'Accept-Encoding': 'gzip'})
+        hits = cache.stats()['hits']
+        first = client.get('/about', headers={'Accept-Encoding': 'gzip'})
+        second = client.get('/about', headers={'Accept-Encoding': 'gzip'})
+        assert cache.stats()['hits'] == hits + 2
+        assert first.data == second.data
+
+    def test_streamed_response_encoded_incrementally(self, client, test_db, populate_projects):
+        """Test that a streamed listing is compressed without a Content-Length"""
+        populate_projects(200)
+        plain = client.get('/projects?stream=1')
+        response = client.get('/projects?stream=1', headers={'Accept-Encoding': 'gzip'})
+        assert response.is_streamed
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Content-Length' not in response.headers
+        assert decode(response) == plain.data
+
+    def test_bytes_saved_per_route(self, app, client, test_db):
+        """Test that savings are reported under the route's endpoint"""
+        before = app.extensions['compression'].stats().get('resume', {'responses': 0, 'saved_bytes': 0})
+        response = client.get('/resume', headers={'Accept-Encoding': 'gzip'})
+        after = app.extensions['compression'].stats()['resume']
+        assert after['responses'] == before['responses'] + 1
+        assert after['saved_bytes'] - before['saved_bytes'] == len(decode(response)) - len(response.data)
+        assert 0 < after['ratio'] < 1
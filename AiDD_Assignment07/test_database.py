@@ -2,6 +2,11 @@
 Test suite for database operations (DAL.py)
 Tests all CRUD operations for the projects database
 """
+import json
+import os
+import subprocess
+import sys
+
 import pytest
 import DAL
 
@@ -207,3 +212,667 @@ class TestDatabaseOperations:
         
         project = DAL.get_project_by_id(project_id)
         assert project['description'] == long_description
+
+
+class TestConnectionPool:
+    """Test class for pooled connection reuse and teardown"""
+    
+    def test_connection_reused_within_thread(self, test_db):
+        """Test that repeated calls on one thread share a single connection"""
+        first = DAL.get_db_connection()
+        DAL.get_all_projects()
+        assert DAL.get_db_connection() is first
+    
+    def test_released_connection_returns_to_pool(self, test_db):
+        """Test that a released connection is handed out again instead of reopened"""
+        first = DAL.get_db_connection()
+        DAL.release_connection()
+        assert DAL.get_db_connection() is first
+    
+    def test_connection_reused_across_threads(self, test_db):
+        """Test that worker threads draw from the same bounded pool"""
+        import threading
+        
+        seen = []
+        
+        def worker():
+            seen.append(DAL.get_db_connection())
+            DAL.release_connection()
+        
+        for _ in range(3):
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+        
+        assert seen[0] is seen[1] is seen[2]
+    
+    def test_swapping_db_name_switches_pool(self, test_db, tmp_path):
+        """Test that changing DB_NAME routes queries to the new database"""
+        DAL.insert_project('Only In Test DB', 'desc', 'image.svg')
+        
+        DAL.DB_NAME = str(tmp_path / 'other.db')
+        try:
+            DAL.init_database()
+            assert DAL.get_pool().database == DAL.DB_NAME
+            assert len(DAL.get_all_projects()) == 0
+        finally:
+            DAL.close_pool()
+            DAL.DB_NAME = test_db
+        
+        assert len(DAL.get_all_projects()) == 1
+    
+    def test_pool_is_bounded(self, tmp_path):
+        """Test that acquiring beyond the pool size times out"""
+        pool = DAL.ConnectionPool(str(tmp_path / 'bounded.db'), size=2, timeout=0.05)
+        held = [pool.acquire(), pool.acquire()]
+        with pytest.raises(DAL.PoolTimeoutError):
+            pool.acquire()
+        
+        pool.release(held.pop())
+        held.append(pool.acquire())
+        for conn in held:
+            pool.release(conn)
+        pool.close()
+    
+    def test_unhealthy_connection_is_replaced(self, tmp_path):
+        """Test that a dead idle connection is discarded on checkout"""
+        pool = DAL.ConnectionPool(str(tmp_path / 'health.db'), size=1)
+        conn = pool.acquire()
+        pool.release(conn)
+        conn.close()
+        
+        replacement = pool.acquire()
+        assert replacement is not conn
+        assert replacement.execute('SELECT 1').fetchone()[0] == 1
+        pool.release(replacement)
+        pool.close()
+    
+    def test_release_rolls_back_open_transaction(self, test_db):
+        """Test that uncommitted work is not leaked to the next borrower"""
+        conn = DAL.get_db_connection()
+        conn.execute("INSERT INTO projects (title, description, image_filename) VALUES ('x', 'y', 'z')")
+        assert conn.in_transaction
+        DAL.release_connection()
+        
+        assert len(DAL.get_all_projects()) == 0
+
+
+def _write_burst(db_name, writer, rows, ready, start):
+    """Writer process body: wait for the start signal, then insert rows as fast as possible"""
+    DAL.DB_NAME = db_name
+    DAL.get_db_connection()
+    ready.release()
+    start.wait()
+    for i in range(rows):
+        DAL.insert_project(f'Writer {writer} #{i}', 'Contention test row', 'burst.svg')
+    DAL.close_pool()
+
+
+class TestStorageConfiguration:
+    """Test class for journal mode, PRAGMAs and the serialized write path"""
+    
+    def test_wal_mode_enabled(self, test_db):
+        """Test that init_database switches the file to write-ahead logging"""
+        conn = DAL.get_db_connection()
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    
+    def test_pragmas_applied_to_pooled_connections(self, test_db):
+        """Test that every pooled connection carries the configured PRAGMAs"""
+        conn = DAL.get_db_connection()
+        assert conn.execute('PRAGMA busy_timeout').fetchone()[0] == DAL.PRAGMAS['busy_timeout']
+        assert conn.execute('PRAGMA cache_size').fetchone()[0] == DAL.PRAGMAS['cache_size']
+        assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+    
+    def test_write_retries_while_locked(self, test_db, monkeypatch):
+        """Test that a writer backs off and retries while another process holds the lock"""
+        import sqlite3
+        import threading
+        
+        monkeypatch.setattr(DAL, 'WRITE_BACKOFF', 0.01)
+        blocker = sqlite3.connect(test_db, timeout=0, check_same_thread=False)
+        blocker.execute('BEGIN IMMEDIATE')
+        DAL.get_db_connection().execute('PRAGMA busy_timeout = 0')
+        threading.Timer(0.05, blocker.rollback).start()
+        
+        project_id = DAL.insert_project('Retried', 'Written after backoff', 'retry.svg')
+        blocker.close()
+        
+        assert DAL.get_project_by_id(project_id)['title'] == 'Retried'
+    
+    def test_failed_write_rolls_back(self, test_db):
+        """Test that an exception inside the write path leaves no partial changes"""
+        def work(conn):
+            conn.execute("INSERT INTO projects (title, description, image_filename) VALUES ('a', 'b', 'c')")
+            raise RuntimeError('boom')
+        
+        with pytest.raises(RuntimeError):
+            DAL.run_write(work)
+        assert len(DAL.get_all_projects()) == 0
+    
+    def test_read_latency_steady_during_write_bursts(self, test_db):
+        """Test that readers are not blocked while other processes write concurrently"""
+        import multiprocessing
+        import time
+        
+        def read_latency():
+            started = time.perf_counter()
+            DAL.get_all_projects()
+            return time.perf_counter() - started
+        
+        for i in range(200):
+            DAL.insert_project(f'Seed #{i}', 'Existing row', 'seed.svg')
+        baseline = sorted(read_latency() for _ in range(200))
+        
+        context = multiprocessing.get_context('spawn')
+        ready, start = context.Semaphore(0), context.Event()
+        writers = [
+            context.Process(target=_write_burst, args=(test_db, writer, 300, ready, start))
+            for writer in range(3)
+        ]
+        for process in writers:
+            process.start()
+        for _ in writers:
+            assert ready.acquire(timeout=30)
+        
+        # Sample reads for as long as the write burst lasts
+        start.set()
+        during = []
+        while any(process.is_alive() for process in writers):
+            during.append(read_latency())
+        for process in writers:
+            process.join()
+            assert process.exitcode == 0
+        
+        assert len(DAL.get_all_projects()) == 200 + 900
+        during.sort()
+        baseline_p95 = baseline[int(len(baseline) * 0.95)]
+        burst_p95 = during[int(len(during) * 0.95)]
+        # Rollback-journal readers stall behind commits for hundreds of milliseconds;
+        # WAL readers only pay for the extra rows and CPU shared with the writers
+        assert burst_p95 < max(baseline_p95 * 50, 0.05), (baseline_p95, burst_p95)
+
+
+class TestProjectCache:
+    """Test class for the versioned read-through project cache"""
+    
+    def test_repeated_reads_hit_cache(self, test_db, sample_project):
+        """Test that reading an unchanged table is served from the cache"""
+        DAL.insert_project(**sample_project)
+        before = DAL.cache_stats()
+        
+        DAL.get_all_projects()
+        DAL.get_all_projects()
+        
+        after = DAL.cache_stats()
+        assert after['misses'] - before['misses'] == 1
+        assert after['hits'] - before['hits'] == 1
+    
+    def test_cached_list_cannot_be_mutated_by_callers(self, test_db, sample_project):
+        """Test that callers receive a copy of the cached listing"""
+        DAL.insert_project(**sample_project)
+        DAL.get_all_projects().clear()
+        assert len(DAL.get_all_projects()) == 1
+    
+    def test_writes_invalidate_cache(self, test_db, sample_project):
+        """Test that insert, update and delete are visible on the next read"""
+        project_id = DAL.insert_project(**sample_project)
+        assert DAL.get_project_by_id(project_id)['title'] == sample_project['title']
+        
+        DAL.update_project(project_id, 'Renamed', 'desc', 'image.svg')
+        assert DAL.get_project_by_id(project_id)['title'] == 'Renamed'
+        assert DAL.get_all_projects()[0]['title'] == 'Renamed'
+        
+        DAL.delete_project(project_id)
+        assert DAL.get_project_by_id(project_id) is None
+        assert DAL.get_all_projects() == []
+    
+    def test_write_from_another_process_invalidates_cache(self, test_db, sample_project):
+        """Test that a commit on a separate connection advances the generation"""
+        import sqlite3
+        
+        DAL.insert_project(**sample_project)
+        assert len(DAL.get_all_projects()) == 1
+        generation = DAL.get_projects_generation()
+        
+        # A separate connection stands in for another gunicorn worker
+        other = sqlite3.connect(test_db)
+        with other:
+            other.execute("INSERT INTO projects (title, description, image_filename) VALUES ('b', 'c', 'd')")
+        other.close()
+        
+        assert DAL.get_projects_generation() > generation
+        assert len(DAL.get_all_projects()) == 2
+
+
+@pytest.fixture
+def replica(test_db, monkeypatch):
+    """Turn on READ_REPLICA mode for one test"""
+    monkeypatch.setattr(DAL, 'READ_REPLICA', True)
+    return DAL.get_replica()
+
+
+class TestReadReplica:
+    """Test class for the in-memory read replica (READ_REPLICA mode)"""
+    
+    def test_reads_served_from_memory(self, replica, sample_project):
+        """Test that project reads run on the in-memory copy, not a pooled file connection"""
+        project_id = DAL.insert_project(**sample_project)
+        assert DAL.read_connection() is replica.conn
+        assert replica.conn.execute('PRAGMA database_list').fetchone()['file'] == ''
+        assert DAL.get_project_by_id(project_id)['title'] == sample_project['title']
+        assert [p['id'] for p in DAL.get_all_projects()] == [project_id]
+    
+    def test_writes_refresh_replica(self, replica, sample_project):
+        """Test that every kind of projects write is visible on the next read"""
+        project_id = DAL.insert_project(**sample_project)
+        assert DAL.get_project_by_id(project_id) is not None
+        DAL.update_project(project_id, 'Renamed', 'desc', 'image.svg')
+        assert DAL.get_project_by_id(project_id)['title'] == 'Renamed'
+        assert [r['title'] for r in DAL.search_projects('renamed')] == ['Renamed']
+        DAL.delete_project(project_id)
+        assert DAL.get_project_by_id(project_id) is None
+        assert DAL.get_all_projects() == []
+    
+    def test_write_from_another_process_refreshes_replica(self, replica, test_db):
+        """Test that a commit on a separate connection is picked up through the data version"""
+        import sqlite3
+        
+        assert DAL.get_all_projects() == []
+        other = sqlite3.connect(test_db)
+        with other:
+            other.execute("INSERT INTO projects (title, description, image_filename) VALUES ('b', 'c', 'd')")
+        other.close()
+        assert [p['title'] for p in DAL.get_all_projects()] == ['b']
+    
+    def test_unchanged_projects_skip_refresh(self, replica, sample_project):
+        """Test that reads and writes to other tables do not copy the database again"""
+        DAL.insert_project(**sample_project)
+        DAL.get_all_projects()
+        refreshes = replica.refreshes
+        DAL.get_project_by_id(1)
+        DAL.get_all_projects()
+        DAL.enqueue_job('noop', {}, 0, 1)
+        DAL.get_projects_page(10)
+        assert replica.refreshes == refreshes
+    
+    def test_stream_survives_refresh(self, replica, populate_projects):
+        """Test that a listing being streamed keeps reading its own copy across a refresh"""
+        populate_projects(50)
+        rows = DAL.iter_projects(batch_size=10)
+        first = next(rows)
+        DAL.insert_project('Later', 'Inserted mid-stream', 'later.svg')
+        assert DAL.get_all_projects()[0]['title'] == 'Later'
+        assert len([first, *rows]) == 50
+    
+    def test_replica_replaced_after_fork(self, replica, monkeypatch):
+        """Test that a forked worker builds its own copy instead of using the parent's"""
+        monkeypatch.setattr(replica, 'pid', replica.pid + 1)
+        assert DAL.get_replica() is not replica
+        replica.close()
+    
+    def test_unusable_flag_warns(self):
+        """Test that DB_READ_REPLICA=1 on a sqlite3 module that is not serialized is reported, not silently ignored"""
+        result = subprocess.run(
+            [sys.executable, '-c', 'import sqlite3; sqlite3.threadsafety = 1; import DAL; print(DAL.READ_REPLICA)'],
+            env={**os.environ, 'DB_READ_REPLICA': '1'},
+            cwd=os.path.dirname(os.path.abspath(DAL.__file__)),
+            capture_output=True, text=True, check=True,
+        )
+        assert result.stdout.strip() == 'False'
+        assert 'DB_READ_REPLICA=1 ignored' in result.stderr
+
+
+class TestProjectSummaries:
+    """Test class for the summarised listing rows (summaries=True)"""
+    
+    def test_long_description_truncated(self, test_db):
+        """Test that descriptions longer than SUMMARY_LENGTH are cut and flagged"""
+        DAL.insert_project('Long', 'x' * (DAL.SUMMARY_LENGTH + 50), 'a.svg')
+        summary = DAL.get_all_projects(summaries=True)[0]
+        assert isinstance(summary, DAL.ProjectSummary)
+        assert summary['summary'] == 'x' * DAL.SUMMARY_LENGTH
+        assert summary['truncated'] is True
+    
+    def test_description_at_limit_kept_whole(self, test_db):
+        """Test that a description exactly SUMMARY_LENGTH long is not flagged"""
+        DAL.insert_project('Exact', 'y' * DAL.SUMMARY_LENGTH, 'a.svg')
+        summary = DAL.get_all_projects(summaries=True)[0]
+        assert summary.summary == 'y' * DAL.SUMMARY_LENGTH
+        assert summary.truncated is False
+    
+    def test_summary_reads_like_a_row(self, test_db, sample_project):
+        """Test that summaries index by column name and convert to dicts like sqlite3.Row"""
+        project_id = DAL.insert_project(**sample_project)
+        summary = DAL.get_all_projects(summaries=True)[0]
+        row = DAL.get_project_by_id(project_id)
+        for column in ('id', 'title', 'image_filename', 'created_at'):
+            assert summary[column] == row[column]
+        assert summary[0] == project_id
+        assert dict(summary)['title'] == sample_project['title']
+        assert 'description' not in summary.keys()
+    
+    def test_summary_pages_match_full_pages(self, test_db, populate_projects):
+        """Test that summary pages walk the same projects, with interchangeable cursors"""
+        populate_projects(25)
+        full, full_cursor = DAL.get_projects_page(10)
+        slim, slim_cursor = DAL.get_projects_page(10, summaries=True)
+        assert [p['id'] for p in slim] == [p['id'] for p in full]
+        assert slim_cursor == full_cursor
+        rest = DAL.get_projects_page(10, slim_cursor, summaries=True)[0]
+        assert [p['id'] for p in rest] == [p['id'] for p in DAL.get_projects_page(10, full_cursor)[0]]
+    
+    def test_iter_summaries(self, test_db, populate_projects):
+        """Test that streaming can yield summaries too"""
+        populate_projects(12)
+        rows = list(DAL.iter_projects(batch_size=5, summaries=True))
+        assert len(rows) == 12
+        assert all(isinstance(row, DAL.ProjectSummary) for row in rows)
+
+
+class TestKeysetPagination:
+    """Test class for keyset-paginated project listing"""
+    
+    def test_pages_cover_every_project_once(self, test_db):
+        """Test that walking the cursors returns each project exactly once, newest first"""
+        ids = [DAL.insert_project(f'Project {i}', 'desc', 'image.svg') for i in range(7)]
+        
+        seen, cursor = [], None
+        while True:
+            page, cursor = DAL.get_projects_page(3, cursor)
+            assert len(page) <= 3
+            seen.extend(project['id'] for project in page)
+            if cursor is None:
+                break
+        
+        # All rows share a created_at second, so id breaks the tie
+        assert seen == list(reversed(ids))
+    
+    def test_last_page_has_no_cursor(self, test_db, multiple_projects):
+        """Test that a page holding the remaining rows reports no next cursor"""
+        for project in multiple_projects:
+            DAL.insert_project(**project)
+        page, cursor = DAL.get_projects_page(len(multiple_projects))
+        assert len(page) == len(multiple_projects)
+        assert cursor is None
+    
+    def test_invalid_cursor_raises_value_error(self, test_db):
+        """Test that a tampered cursor is rejected"""
+        with pytest.raises(ValueError):
+            DAL.get_projects_page(10, 'not-a-cursor')
+    
+    def test_page_query_uses_composite_index(self, test_db):
+        """Test that deep pages are served by an index range scan rather than a sort"""
+        conn = DAL.get_db_connection()
+        plan = conn.execute('''
+            EXPLAIN QUERY PLAN
+            SELECT * FROM projects WHERE (created_at, id) < (?, ?)
+            ORDER BY created_at DESC, id DESC LIMIT 10
+        ''', ('2030-01-01 00:00:00', 1)).fetchall()
+        details = ' '.join(row['detail'] for row in plan)
+        assert 'idx_projects_created_at_id' in details
+        assert 'TEMP B-TREE' not in details
+
+
+class TestStreamingReads:
+    """Test class for the lazily fetched project iterator"""
+    
+    def test_iter_projects_matches_listing(self, test_db, populate_projects):
+        """Test that the generator yields the same rows as the full listing"""
+        populate_projects(25)
+        streamed = [project['id'] for project in DAL.iter_projects(batch_size=4)]
+        listed = [project['id'] for project in DAL.get_all_projects()]
+        assert streamed == listed
+    
+    def test_iter_projects_is_lazy(self, test_db, populate_projects):
+        """Test that only one batch is fetched before the first row is produced"""
+        populate_projects(100)
+        rows = DAL.iter_projects(batch_size=10)
+        first = next(rows)
+        assert first['title'] == 'Generated Project 99'
+        rows.close()
+
+
+class TestBulkImportExport:
+    """Test class for the streaming CSV/JSONL import and export"""
+    
+    def records(self, count):
+        return (
+            {'title': f'Imported {i}', 'description': f'Imported project {i}', 'image_filename': 'i.svg'}
+            for i in range(count)
+        )
+    
+    def test_import_commits_in_batches(self, test_db):
+        """Test that records are inserted batch_size per transaction, reporting the running count"""
+        counts = []
+        assert DAL.import_projects(self.records(25), batch_size=10, progress=counts.append) == 25
+        assert counts == [10, 20, 25]
+        assert len(DAL.get_all_projects()) == 25
+    
+    def test_bulk_batches_keep_search_and_generation(self, test_db, monkeypatch):
+        """Test that batches over FTS_BULK_THRESHOLD are indexed, bump the generation and restore the triggers"""
+        monkeypatch.setattr(DAL, 'FTS_BULK_THRESHOLD', 5)
+        generation = DAL.get_projects_generation()
+        DAL.import_projects(self.records(12), batch_size=6)
+        assert DAL.get_projects_generation() == generation + 2
+        assert [row['title'] for row in DAL.search_projects('Imported 7')][0] == 'Imported 7'
+        DAL.insert_project('Added later', 'Indexed by the trigger again', 'a.svg')
+        assert DAL.get_projects_generation() == generation + 3
+        assert len(DAL.search_projects('later')) == 1
+    
+    def test_bad_record_keeps_committed_batches(self, test_db):
+        """Test that a record missing a required field stops the import after the batches before it"""
+        records = list(self.records(5))
+        records[3]['title'] = ''
+        with pytest.raises(ValueError, match='Record 4: missing title'):
+            DAL.import_projects(records, batch_size=2)
+        assert len(DAL.get_all_projects()) == 2
+    
+    @pytest.mark.parametrize('file_format', ['csv', 'jsonl'])
+    def test_round_trip(self, test_db, tmp_path, file_format):
+        """Test that an export imports back with every column but the id"""
+        DAL.import_projects(self.records(3))
+        DAL.set_project_images(2, 640, 480, 'thumb.webp', {'webp': [[320, 'small.webp']]})
+        before = [dict(row) for row in DAL.get_all_projects()]
+        path = tmp_path / f'projects.{file_format}'
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            DAL.write_project_file(file, file_format, DAL.export_projects(batch_size=2))
+        DAL.delete_projects(row['id'] for row in before)
+        with open(path, encoding='utf-8', newline='') as file:
+            assert DAL.import_projects(DAL.read_project_file(file, file_format)) == 3
+        after = [dict(row) for row in DAL.get_all_projects()]
+        for row in before + after:
+            del row['id']
+        assert after == before
+    
+    def test_jsonl_errors_name_the_line(self, tmp_path):
+        """Test that a malformed JSONL line is reported with its line number"""
+        path = tmp_path / 'bad.jsonl'
+        path.write_text('{"title": "a"}\n\n[1, 2]\n')
+        with open(path, encoding='utf-8') as file:
+            with pytest.raises(ValueError, match='Line 3: expected one JSON object'):
+                list(DAL.read_project_file(file, 'jsonl'))
+    
+    def test_command_line(self, test_db, tmp_path, capsys):
+        """Test the import and export commands, with the format taken from the extension"""
+        source = tmp_path / 'in.jsonl'
+        source.write_text(''.join(json.dumps(record) + '\n' for record in self.records(4)))
+        assert DAL.main(['--db', test_db, 'import', str(source)]) == 0
+        assert 'Imported 4 projects in' in capsys.readouterr().err
+        target = tmp_path / 'out.csv'
+        assert DAL.main(['--db', test_db, 'export', str(target), '--batch-size', '3']) == 0
+        assert 'Exported 4 projects in' in capsys.readouterr().err
+        lines = target.read_text().splitlines()
+        assert lines[0] == ','.join(DAL.EXPORT_COLUMNS)
+        assert len(lines) == 5
+    
+    def test_command_line_import_error(self, test_db, tmp_path, capsys):
+        """Test that a bad record ends the import command with status 1 and a message"""
+        source = tmp_path / 'in.csv'
+        source.write_text('title,description,image_filename\nOne,First,a.svg\nTwo,,b.svg\n')
+        assert DAL.main(['--db', test_db, 'import', str(source)]) == 1
+        assert 'Record 2: missing description' in capsys.readouterr().err
+    
+    def test_command_line_rejects_nested_values(self, test_db, tmp_path, capsys):
+        """Test that a JSON object or array value is reported with its record number, not as a traceback"""
+        source = tmp_path / 'in.jsonl'
+        source.write_text('{"title": "One", "description": "First", "image_filename": "a.svg"}\n'
+                          '{"title": {"a": 1}, "description": "Second", "image_filename": "b.svg"}\n')
+        assert DAL.main(['--db', test_db, 'import', str(source)]) == 1
+        assert 'Record 2: title must be a string or a number, not dict' in capsys.readouterr().err
+    
+    def test_command_line_needs_a_format(self, test_db, tmp_path):
+        """Test that a file whose extension names no format is refused"""
+        with pytest.raises(SystemExit):
+            DAL.main(['--db', test_db, 'export', str(tmp_path / 'projects.txt')])
+
+
+class TestFullTextSearch:
+    """Test class for the FTS5 project search"""
+    
+    def test_search_finds_inserted_projects(self, test_db):
+        """Test that new projects are searchable through the insert trigger"""
+        DAL.insert_project('Pothole Detection', 'Computer vision over dashcam video', 'pothole.svg')
+        DAL.insert_project('SAP Migration', 'Moving finance data pipelines', 'sap.svg')
+        
+        results = DAL.search_projects('dashcam')
+        assert [r['title'] for r in results] == ['Pothole Detection']
+    
+    def test_search_follows_updates_and_deletes(self, test_db):
+        """Test that the index tracks edits and removals"""
+        project_id = DAL.insert_project('Old Name', 'Original description', 'image.svg')
+        DAL.update_project(project_id, 'Renamed Project', 'Rewritten description', 'image.svg')
+        assert DAL.search_projects('original') == []
+        assert len(DAL.search_projects('rewritten')) == 1
+        
+        DAL.delete_project(project_id)
+        assert DAL.search_projects('renamed') == []
+    
+    def test_title_matches_rank_first(self, test_db):
+        """Test that BM25 weighting puts title matches above description matches"""
+        DAL.insert_project('Warehouse Cleanup', 'Mentions analytics once', 'a.svg')
+        DAL.insert_project('Analytics Platform', 'A platform for reporting', 'b.svg')
+        
+        results = DAL.search_projects('analytics')
+        assert results[0]['title'] == 'Analytics Platform'
+        assert results[0]['rank'] <= results[1]['rank']
+    
+    def test_snippet_marks_matches(self, test_db):
+        """Test that snippets wrap matched terms in the marker characters"""
+        DAL.insert_project('Streaming', 'Kafka streaming ingestion into the lake', 'a.svg')
+        snippet = DAL.search_projects('kafka')[0]['snippet']
+        assert f'{DAL.SNIPPET_START}Kafka{DAL.SNIPPET_END}' in snippet
+    
+    def test_prefix_and_multi_term_queries(self, test_db):
+        """Test that words match as prefixes and all words are required"""
+        DAL.insert_project('Data Engineering', 'Batch pipelines', 'a.svg')
+        DAL.insert_project('Data Science', 'Modelling work', 'b.svg')
+        
+        assert len(DAL.search_projects('dat')) == 2
+        assert [r['title'] for r in DAL.search_projects('data pipe')] == ['Data Engineering']
+    
+    @pytest.mark.parametrize('query', ['', '   ', '"', 'AND OR NOT', '*)(', 'title:'])
+    def test_search_syntax_is_sanitised(self, test_db, query):
+        """Test that FTS5 operators in user input never raise"""
+        DAL.insert_project('Anything', 'Something', 'a.svg')
+        assert isinstance(DAL.search_projects(query), list)
+    
+    def test_bulk_insert_is_indexed(self, test_db, populate_projects):
+        """Test that the set-based indexing path for large batches keeps search in sync"""
+        populate_projects(DAL.FTS_BULK_THRESHOLD + 5)
+        DAL.insert_project('Afterwards', 'Inserted after the bulk load', 'a.svg')
+        
+        conn = DAL.get_db_connection()
+        assert conn.execute(
+            "SELECT count(*) FROM projects_fts WHERE projects_fts MATCH 'generated'"
+        ).fetchone()[0] == DAL.FTS_BULK_THRESHOLD + 5
+        assert len(DAL.search_projects('afterwards')) == 1
+    
+    def test_existing_rows_indexed_on_upgrade(self, tmp_path):
+        """Test that init_database indexes projects created before search existed"""
+        import sqlite3
+        
+        path = str(tmp_path / 'legacy.db')
+        legacy = sqlite3.connect(path)
+        legacy.execute('''
+            CREATE TABLE projects (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, description TEXT NOT NULL,
+                image_filename TEXT NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        legacy.execute("INSERT INTO projects (title, description, image_filename) VALUES ('Legacy', 'Before FTS', 'a.svg')")
+        legacy.commit()
+        legacy.close()
+        
+        original = DAL.DB_NAME
+        DAL.close_pool()
+        DAL.DB_NAME = path
+        try:
+            DAL.init_database()
+            assert [r['title'] for r in DAL.search_projects('legacy')] == ['Legacy']
+        finally:
+            DAL.close_pool()
+            DAL.DB_NAME = original
+    
+    def test_search_uses_fts_index(self, test_db):
+        """Test that search is served by the FTS index rather than a table scan"""
+        conn = DAL.get_db_connection()
+        plan = conn.execute('''
+            EXPLAIN QUERY PLAN
+            SELECT projects.* FROM projects_fts JOIN projects ON projects.id = projects_fts.rowid
+            WHERE projects_fts MATCH '"data"*'
+        ''').fetchall()
+        details = ' '.join(row['detail'] for row in plan)
+        assert 'VIRTUAL TABLE INDEX' in details
+        assert 'SEARCH projects USING INTEGER PRIMARY KEY' in details
+
+
+class TestImageColumns:
+    """Test class for the image derivative columns"""
+    
+    def test_set_project_images(self, test_db, sample_project):
+        """Test that derivative metadata is stored and the variants round-trip as JSON"""
+        import json
+        
+        project_id = DAL.insert_project(**sample_project)
+        variants = {'webp': [[200, 'uploads/a-200w.webp']], 'avif': [[200, 'uploads/a-200w.avif']]}
+        assert DAL.set_project_images(project_id, 800, 600, 'uploads/a-200w.webp', variants) == 1
+        
+        project = DAL.get_project_by_id(project_id)
+        assert (project['image_width'], project['image_height']) == (800, 600)
+        assert project['thumbnail_filename'] == 'uploads/a-200w.webp'
+        assert json.loads(project['image_variants']) == variants
+    
+    def test_image_update_skips_search_reindex(self, test_db, sample_project):
+        """Test that recording derivatives leaves the project searchable exactly once"""
+        project_id = DAL.insert_project(**sample_project)
+        DAL.set_project_images(project_id, 10, 10, 'uploads/t.webp', {})
+        assert len(DAL.search_projects('test')) == 1
+    
+    def test_existing_database_gains_columns(self, tmp_path):
+        """Test that init_database adds the image columns to an older projects table"""
+        import sqlite3
+        
+        path = str(tmp_path / 'legacy.db')
+        legacy = sqlite3.connect(path)
+        legacy.execute('''
+            CREATE TABLE projects (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, description TEXT NOT NULL,
+                image_filename TEXT NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        legacy.execute("INSERT INTO projects (title, description, image_filename) VALUES ('Legacy', 'Old row', 'a.svg')")
+        legacy.commit()
+        legacy.close()
+        
+        original = DAL.DB_NAME
+        DAL.close_pool()
+        DAL.DB_NAME = path
+        try:
+            DAL.init_database()
+            project = DAL.get_all_projects()[0]
+            assert project['title'] == 'Legacy'
+            assert project['thumbnail_filename'] is None
+            assert project['image_variants'] is None
+        finally:
+            DAL.close_pool()
+            DAL.DB_NAME = original
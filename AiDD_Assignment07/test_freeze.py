@@ -0,0 +1,144 @@
+"""
+Test suite for the static site freezer (freeze.py)
+Tests the frozen file layout, precompressed variants and incremental re-rendering after writes
+"""
+import gzip
+import os
+import re
+
+import pytest
+
+import DAL
+from jobs import queue as job_queue
+
+
+@pytest.fixture
+def freezer(app, test_db, tmp_path, monkeypatch):
+    """The app's freezer writing into a temporary folder, with two projects per listing page"""
+    monkeypatch.setitem(app.config, 'FREEZE_DIR', str(tmp_path / 'frozen'))
+    monkeypatch.setitem(app.config, 'PROJECTS_PER_PAGE', 2)
+    return app.extensions['freezer']
+
+
+def frozen(freezer, url):
+    with open(os.path.join(freezer.folder, url.strip('/'), 'index.html'), 'rb') as f:
+        return f.read()
+
+
+def listing_urls(client):
+    """Every page of the live listing, first to last, by following its next links"""
+    urls, url = [], '/projects'
+    while url:
+        urls.append(url)
+        match = re.search(rb'href="([^"]+)" rel="next"', client.get(url).data)
+        url = match.group(1).decode() if match else None
+    return urls
+
+
+def assert_listing_frozen(freezer, client):
+    """The frozen listing is exactly the live one, with no pages left over"""
+    urls = listing_urls(client)
+    for url in urls:
+        assert frozen(freezer, url) == client.get(url).data
+    pages_dir = os.path.join(freezer.folder, 'projects', 'page')
+    pages = sorted(os.listdir(pages_dir)) if os.path.isdir(pages_dir) else []
+    assert pages == sorted(url.rsplit('/', 1)[1] for url in urls[1:])
+
+
+class TestFreeze:
+    """Test class for rendering the whole site to files"""
+
+    def test_every_page_frozen(self, freezer, client, populate_projects):
+        """Test that static pages, each listing page and each project page are written as the app serves them"""
+        populate_projects(5)
+        assert freezer.freeze() == 6 + 3 + 5
+        for url in ('/', '/about', '/resume', '/contact', '/add_project', '/thankyou'):
+            assert frozen(freezer, url) == client.get(url).data
+        for project in DAL.get_all_projects():
+            url = f"/projects/{project['id']}"
+            assert frozen(freezer, url) == client.get(url).data
+        assert_listing_frozen(freezer, client)
+
+    def test_precompressed_variants(self, freezer, client):
+        """Test that each page gets a gzip variant of the same bytes"""
+        freezer.freeze()
+        path = os.path.join(freezer.folder, 'index.html')
+        with gzip.open(path + '.gz') as f:
+            assert f.read() == client.get('/').data
+
+    def test_refuses_foreign_folder(self, freezer):
+        """Test that a folder holding anything but an earlier freeze is left untouched"""
+        os.makedirs(freezer.folder)
+        keep = os.path.join(freezer.folder, 'app.py')
+        with open(keep, 'w') as f:
+            f.write('not frozen')
+        with pytest.raises(RuntimeError):
+            freezer.freeze()
+        assert os.listdir(freezer.folder) == ['app.py']
+
+    def test_freeze_empties_folder(self, freezer, populate_projects):
+        """Test that pages of projects deleted before a freeze do not survive it"""
+        project_id = DAL.insert_project('Gone', 'Deleted before the next freeze', 'a.svg')
+        freezer.freeze()
+        DAL.delete_project(project_id)
+        freezer.freeze()
+        assert not os.path.exists(os.path.join(freezer.folder, 'projects', str(project_id)))
+
+
+class TestIncrementalFreeze:
+    """Test class for re-rendering only what a project write affects"""
+
+    def test_writes_ignored_without_freeze_dir(self, app, test_db, monkeypatch):
+        """Test that no job is queued while nothing is served frozen"""
+        monkeypatch.setitem(app.config, 'FREEZE_DIR', '')
+        DAL.insert_project('Live only', 'Not frozen', 'a.svg')
+        assert DAL.count_jobs() == {}
+
+    def test_update_rewrites_one_listing_page(self, freezer, client, populate_projects):
+        """Test that an update rewrites the project's page and the listing page holding it, nothing else"""
+        populate_projects(6)
+        freezer.freeze()
+        job_queue.run_pending()  # the refreeze populate_projects queued
+        urls = listing_urls(client)
+        before = {url: os.stat(os.path.join(freezer.folder, url.strip('/'), 'index.html')).st_mtime_ns for url in urls}
+        middle = DAL.get_projects_page(2, urls[1].rsplit('/', 1)[1])[0][0]
+        DAL.update_project(middle['id'], 'Renamed project', 'New description', 'a.svg')
+        job_queue.run_pending()
+        assert b'Renamed project' in frozen(freezer, f"/projects/{middle['id']}")
+        assert b'Renamed project' in frozen(freezer, urls[1])
+        for url in (urls[0], urls[2]):
+            assert os.stat(os.path.join(freezer.folder, url.strip('/'), 'index.html')).st_mtime_ns == before[url]
+        assert_listing_frozen(freezer, client)
+
+    def test_insert_shifts_listing(self, freezer, client, populate_projects):
+        """Test that a new project gets its page and the listing pages after it are re-cut"""
+        populate_projects(4)
+        freezer.freeze()
+        project_id = DAL.insert_project('Newest project', 'Just added', 'a.svg')
+        job_queue.run_pending()
+        assert b'Newest project' in frozen(freezer, f'/projects/{project_id}')
+        assert_listing_frozen(freezer, client)
+
+    def test_delete_removes_pages(self, freezer, client, populate_projects):
+        """Test that deleting the only project on the last page removes that page and the link to it"""
+        populate_projects(5)
+        freezer.freeze()
+        oldest = DAL.get_projects_page(5)[0][-1]
+        DAL.delete_project(oldest['id'])
+        job_queue.run_pending()
+        assert not os.path.exists(os.path.join(freezer.folder, 'projects', str(oldest['id'])))
+        assert len(listing_urls(client)) == 2
+        assert_listing_frozen(freezer, client)
+
+    def test_batch_writes_rewrite_listing(self, freezer, client, populate_projects):
+        """Test that batch inserts and deletes, which do not report created_at, still leave an exact listing"""
+        populate_projects(3)
+        freezer.freeze()
+        project_ids = DAL.insert_projects(
+            {'title': f'Batch {i}', 'description': 'Batch project', 'image_filename': 'a.svg'} for i in range(3)
+        )
+        DAL.delete_projects(project_ids[:1])
+        job_queue.run_pending()
+        assert not os.path.exists(os.path.join(freezer.folder, 'projects', str(project_ids[0])))
+        assert b'Batch 2' in frozen(freezer, f'/projects/{project_ids[2]}')
+        assert_listing_frozen(freezer, client)
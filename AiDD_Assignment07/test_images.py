@@ -0,0 +1,232 @@
+"""
+Test suite for image uploads and derivative generation (images.py)
+Tests streamed multipart uploads, validation, background rendering and srcset output
+"""
+import errno
+import io
+import json
+import os
+
+import pytest
+from PIL import Image
+
+import DAL
+import images
+from jobs import queue as job_queue
+
+
+def image_bytes(size=(1000, 600), image_format='PNG'):
+    """An in-memory image file of the given size and format"""
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (40, 90, 160)).save(buffer, image_format)
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.fixture
+def image_folder(app, tmp_path):
+    """Point uploads, derivatives and the upload spool at a temporary folder"""
+    original = app.config['IMAGES_FOLDER'], app.config['UPLOAD_SPOOL_FOLDER']
+    app.config['IMAGES_FOLDER'] = str(tmp_path)
+    app.config['UPLOAD_SPOOL_FOLDER'] = str(tmp_path / 'spool')
+    yield tmp_path
+    app.config['IMAGES_FOLDER'], app.config['UPLOAD_SPOOL_FOLDER'] = original
+
+
+def upload_files(image_folder):
+    folder = image_folder / images.UPLOAD_SUBDIR
+    return sorted(os.listdir(folder)) if folder.exists() else []
+
+
+def upload(client, data, filename='shot.png', title='Uploaded Project'):
+    return client.post('/add_project', data={
+        'title': title,
+        'description': 'Has a real uploaded image',
+        'image': (data, filename),
+    }, content_type='multipart/form-data')
+
+
+class TestUpload:
+    """Test class for the multipart upload on /add_project"""
+
+    def test_upload_creates_project(self, client, test_db, image_folder):
+        """Test that an uploaded image is stored under uploads/ and linked to the project"""
+        response = upload(client, image_bytes())
+        assert response.status_code == 302
+
+        project = DAL.get_all_projects()[0]
+        assert project['image_filename'].startswith('uploads/')
+        assert project['image_filename'].endswith('.png')
+        assert (image_folder / project['image_filename']).exists()
+
+    def test_upload_spooled_outside_static(self, app, image_folder):
+        """Test that file parts are written to the unserved spool folder, not held in memory"""
+        with app.test_request_context('/add_project', method='POST', data={'image': (image_bytes(), 'a.png')}):
+            from flask import request
+            stream = request.files['image'].stream
+            assert os.path.dirname(stream.name) == str(image_folder / 'spool')
+            assert os.path.getsize(stream.name) > 0
+        assert upload_files(image_folder) == []
+
+    def test_other_routes_not_spooled(self, app, image_folder):
+        """Test that file parts posted anywhere but add_project get Werkzeug's default handling"""
+        with app.test_request_context('/contact', method='POST', data={'image': (image_bytes(), 'a.png')}):
+            from flask import request
+            stream = request.files['image'].stream
+            assert not str(getattr(stream, 'name', '')).startswith(str(image_folder))
+        assert not (image_folder / 'spool').exists()
+
+    def test_no_partial_files_left(self, client, test_db, image_folder):
+        """Test that temporary upload parts are removed once the request ends"""
+        upload(client, image_bytes())
+        job_queue.run_pending()
+        assert os.listdir(image_folder / 'spool') == []
+        assert [name for name in upload_files(image_folder) if name.endswith('.part')] == []
+
+    def test_spool_on_another_filesystem(self, client, test_db, image_folder, monkeypatch):
+        """Test that the upload is copied when it cannot be hard-linked out of the spool"""
+        def cross_device(source, target):
+            raise OSError(errno.EXDEV, 'Invalid cross-device link')
+
+        monkeypatch.setattr(os, 'link', cross_device)
+        assert upload(client, image_bytes()).status_code == 302
+        project = DAL.get_all_projects()[0]
+        assert (image_folder / project['image_filename']).exists()
+
+    def test_format_detected_from_content(self, client, test_db, image_folder):
+        """Test that the stored extension follows the real format, not the uploaded name"""
+        upload(client, image_bytes(image_format='JPEG'), filename='misnamed.png')
+        assert DAL.get_all_projects()[0]['image_filename'].endswith('.jpg')
+
+    def test_rejects_non_images(self, client, test_db, image_folder):
+        """Test that a non-image upload is refused without creating a project or a file"""
+        response = upload(client, io.BytesIO(b'not an image at all'), filename='evil.png')
+        assert response.status_code == 400
+        assert b'not a readable image' in response.data
+        assert DAL.get_all_projects() == []
+        assert os.listdir(image_folder / images.UPLOAD_SUBDIR) == []
+
+    def test_rejects_oversized_images(self, client, test_db, image_folder, monkeypatch):
+        """Test that images over MAX_IMAGE_PIXELS are turned away before anything decodes them"""
+        monkeypatch.setattr(images, 'MAX_IMAGE_PIXELS', 1000 * 599)
+        response = upload(client, image_bytes())
+        assert response.status_code == 400
+        assert b'at most' in response.data
+        assert DAL.get_all_projects() == []
+        assert os.listdir(image_folder / images.UPLOAD_SUBDIR) == []
+
+    def test_rejects_decompression_bombs(self, client, test_db, image_folder, monkeypatch):
+        """Test that Pillow's decompression bomb error is a form error, not a 500"""
+        monkeypatch.setattr(images, 'MAX_IMAGE_PIXELS', 10**9)
+        monkeypatch.setattr(Image, 'MAX_IMAGE_PIXELS', 1000)
+        response = upload(client, image_bytes())
+        assert response.status_code == 400
+        assert b'too large' in response.data
+
+    def test_missing_title_leaves_no_file(self, client, test_db, image_folder):
+        """Test that a form turned away for its text fields does not store the upload"""
+        response = upload(client, image_bytes(), title='')
+        assert response.status_code == 200
+        assert DAL.get_all_projects() == []
+        folder = image_folder / images.UPLOAD_SUBDIR
+        assert not folder.exists() or os.listdir(folder) == []
+
+    def test_filename_field_still_accepted(self, client, test_db, sample_project):
+        """Test that naming an existing static image keeps working without an upload"""
+        response = client.post('/add_project', data=sample_project)
+        assert response.status_code == 302
+        assert DAL.get_all_projects()[0]['image_filename'] == sample_project['image_filename']
+
+
+class TestDerivatives:
+    """Test class for background derivative rendering"""
+
+    def test_derivatives_recorded(self, client, test_db, image_folder):
+        """Test that AVIF/WebP variants and a thumbnail are rendered and stored on the row"""
+        upload(client, image_bytes((1000, 600)))
+        job_queue.run_pending()
+
+        project = DAL.get_all_projects()[0]
+        variants = json.loads(project['image_variants'])
+        assert set(variants) == set(images.DERIVATIVE_FORMATS)
+        assert [width for width, _name in variants['webp']] == [200, 400, 800, 1000]
+        assert (project['image_width'], project['image_height']) == (1000, 600)
+        assert project['thumbnail_filename'] == dict(variants['webp'])[images.THUMBNAIL_WIDTH]
+        for entries in variants.values():
+            for width, name in entries:
+                with Image.open(image_folder / name) as derivative:
+                    assert derivative.size == (width, round(600 * width / 1000))
+
+    def test_small_images_not_upscaled(self, test_db, image_folder):
+        """Test that an image narrower than every target gets a single original-width variant"""
+        os.makedirs(image_folder / 'uploads')
+        with open(image_folder / 'uploads' / 'tiny.png', 'wb') as f:
+            f.write(image_bytes((120, 80)).read())
+        width, height, thumbnail, variants = images.render_derivatives(str(image_folder), 'uploads/tiny.png')
+        assert (width, height) == (120, 80)
+        assert variants['avif'] == [(120, 'uploads/tiny-120w.avif')]
+        assert thumbnail == 'uploads/tiny-120w.webp'
+
+    def test_listing_emits_srcset(self, client, test_db, image_folder):
+        """Test that the projects table shows the thumbnail with AVIF/WebP srcsets once rendered"""
+        upload(client, image_bytes((1000, 600)))
+        job_queue.run_pending()
+
+        html = client.get('/projects').get_data(as_text=True)
+        project = DAL.get_all_projects()[0]
+        assert 'type="image/avif"' in html
+        assert f"/static/images/{project['thumbnail_filename']}" in html
+        assert '-400w.webp 400w' in html
+        assert f"/static/images/{project['image_filename']}" not in html
+
+    def test_listing_falls_back_before_rendering(self, client, test_db, sample_project):
+        """Test that projects without derivatives still show their original image"""
+        DAL.insert_project(**sample_project)
+        html = client.get('/projects').get_data(as_text=True)
+        assert f"/static/images/{sample_project['image_filename']}" in html
+        assert '<picture>' not in html
+
+
+class TestUploadRemoval:
+    """Test class for deleting uploaded images along with their projects"""
+
+    def test_delete_removes_upload_and_derivatives(self, client, test_db, image_folder):
+        """Test that deleting a project removes its original and every rendered derivative"""
+        upload(client, image_bytes())
+        job_queue.run_pending()
+        project = DAL.get_all_projects()[0]
+        assert len(upload_files(image_folder)) > 1
+        client.post(f"/delete_project/{project['id']}")
+        job_queue.run_pending()
+        assert upload_files(image_folder) == []
+
+    def test_api_batch_delete_removes_uploads(self, client, test_db, image_folder):
+        """Test that the batch delete endpoint removes the uploads of every deleted project"""
+        for title in ('First', 'Second'):
+            upload(client, image_bytes(), title=title)
+        ids = [project['id'] for project in DAL.get_all_projects()]
+        client.delete('/api/projects', json={'ids': ids})
+        job_queue.run_pending()
+        assert upload_files(image_folder) == []
+
+    def test_shared_and_static_images_kept(self, client, test_db, image_folder):
+        """Test that files another project still uses, and images not uploaded, are never deleted"""
+        upload(client, image_bytes())
+        job_queue.run_pending()
+        image_filename = DAL.get_all_projects()[0]['image_filename']
+        keep_id = DAL.insert_project('Same image', 'Shares the upload', image_filename)
+        static_id = DAL.insert_project('Static', 'Points at a bundled image', '../images/project1.svg')
+        client.post(f'/delete_project/{static_id}')
+        delete_id = next(p['id'] for p in DAL.get_all_projects() if p['id'] not in (keep_id, static_id))
+        client.post(f'/delete_project/{delete_id}')
+        job_queue.run_pending()
+        assert (image_folder / image_filename).exists()
+
+    def test_deleted_before_rendering(self, client, test_db, image_folder):
+        """Test that a project deleted before its derivatives were rendered leaves no files behind"""
+        upload(client, image_bytes())
+        project = DAL.get_all_projects()[0]
+        client.post(f"/delete_project/{project['id']}")
+        job_queue.run_pending()
+        assert upload_files(image_folder) == []
+        assert DAL.count_jobs() == {}
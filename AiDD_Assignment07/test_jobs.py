@@ -0,0 +1,203 @@
+"""
+Test suite for the background job queue (jobs.py) and contact mail delivery (mail.py)
+Tests persistence, retries with backoff, lease recovery, worker threads and SMTP sending
+"""
+import threading
+import time
+
+import pytest
+
+import DAL
+from jobs import JobQueue, queue as job_queue
+
+
+@pytest.fixture
+def task(app):
+    """Register a throwaway task on the shared queue; records its payloads and fails while failures > 0"""
+    class Recorder:
+        calls = []
+        failures = 0
+
+    @job_queue.task('test_task')
+    def test_task(**payload):
+        if Recorder.failures:
+            Recorder.failures -= 1
+            raise RuntimeError('temporary failure')
+        Recorder.calls.append(payload)
+
+    yield Recorder
+    job_queue.handlers.pop('test_task', None)
+
+
+class TestJobQueue:
+    """Test class for enqueueing and running jobs"""
+
+    def test_enqueue_persists_without_running(self, app, test_db, task):
+        """Test that enqueue only records the job and returns its ID"""
+        job_id = job_queue.enqueue('test_task', value=1)
+        job = DAL.get_job(job_id)
+        assert job['status'] == 'queued'
+        assert job['attempts'] == 0
+        assert task.calls == []
+
+    def test_run_pending_runs_and_removes(self, app, test_db, task):
+        """Test that due jobs run with their payload and are deleted afterwards"""
+        job_id = job_queue.enqueue('test_task', value=1, name='payload keys may clash with nothing')
+        assert job_queue.run_pending() == 1
+        assert task.calls == [{'value': 1, 'name': 'payload keys may clash with nothing'}]
+        assert DAL.get_job(job_id) is None
+
+    def test_delayed_jobs_wait(self, app, test_db, task):
+        """Test that a delayed job is not due until its time comes"""
+        job_queue.enqueue('test_task', delay=60, value=1)
+        assert job_queue.run_pending() == 0
+        assert job_queue.run_pending(now=time.time() + 61) == 1
+
+    def test_unknown_task_rejected(self, app, test_db):
+        """Test that enqueueing an unregistered task fails fast"""
+        with pytest.raises(ValueError):
+            job_queue.enqueue('no_such_task')
+        with pytest.raises(ValueError):
+            job_queue.enqueue_many('no_such_task', [{}])
+
+    def test_enqueue_many_in_one_transaction(self, app, test_db, task):
+        """Test that a batch of payloads becomes one job each, in order"""
+        job_ids = job_queue.enqueue_many('test_task', [{'value': n} for n in range(3)])
+        assert [DAL.get_job(job_id)['payload'] for job_id in job_ids] == [f'{{"value": {n}}}' for n in range(3)]
+        assert job_queue.enqueue_many('test_task', []) == []
+        job_queue.run_pending()
+        assert task.calls == [{'value': n} for n in range(3)]
+
+    def test_failure_retried_with_backoff(self, app, test_db, task):
+        """Test that a failing job is requeued for later with its error recorded"""
+        task.failures = 1
+        before = time.time()
+        job_id = job_queue.enqueue('test_task', value=1)
+        job_queue.run_pending()
+
+        job = DAL.get_job(job_id)
+        assert job['status'] == 'queued'
+        assert job['attempts'] == 1
+        assert 'temporary failure' in job['last_error']
+        assert job['run_at'] >= before + app.config['JOBS_BACKOFF'] * 0.5
+        assert task.calls == []
+
+        job_queue.run_pending(now=time.time() + app.config['JOBS_MAX_BACKOFF'] * 2)
+        assert DAL.get_job(job_id) is None
+        assert task.calls == [{'value': 1}]
+
+    def test_exhausted_jobs_parked_as_failed(self, app, test_db, task):
+        """Test that a job failing on every attempt ends up failed and stays for inspection"""
+        task.failures = 10
+        job_id = job_queue.enqueue('test_task', max_attempts=3, value=1)
+        job_queue.run_pending(now=time.time() + app.config['JOBS_MAX_BACKOFF'] * 2)
+
+        job = DAL.get_job(job_id)
+        assert job['status'] == 'failed'
+        assert job['attempts'] == 3
+        assert DAL.count_jobs() == {'failed': 1}
+
+    def test_backoff_grows_and_is_capped(self, app):
+        """Test that retry delays double per attempt within the jitter band, up to the cap"""
+        base, cap = app.config['JOBS_BACKOFF'], app.config['JOBS_MAX_BACKOFF']
+        for attempts in (1, 2, 3):
+            assert base * 2 ** (attempts - 1) * 0.5 <= job_queue.backoff(attempts) <= base * 2 ** (attempts - 1) * 1.5
+        assert job_queue.backoff(100) <= cap * 1.5
+
+    def test_expired_lease_reclaimed(self, app, test_db, task):
+        """Test that a job whose worker died mid-run is picked up again after its lease"""
+        job_id = job_queue.enqueue('test_task', value=1)
+        now = time.time()
+        assert DAL.claim_job(now, app.config['JOBS_LEASE'])['id'] == job_id
+        assert job_queue.run_pending(now=now) == 0
+
+        assert job_queue.run_pending(now=now + app.config['JOBS_LEASE'] + 1) == 1
+        assert task.calls == [{'value': 1}]
+
+    def test_idle_poll_takes_no_write_lock(self, app, test_db, task, monkeypatch):
+        """Test that polling a queue with nothing due is a plain read, not a write transaction"""
+        job_queue.enqueue('test_task', value=1, delay=60)
+
+        def no_writes(work, conn=None):
+            raise AssertionError('idle poll started a write')
+
+        monkeypatch.setattr(DAL, 'run_write', no_writes)
+        assert DAL.claim_job(time.time(), app.config['JOBS_LEASE']) is None
+
+    def test_jobs_survive_restart(self, app, test_db, task):
+        """Test that queued jobs are still there for a fresh queue after connections are dropped"""
+        job_queue.enqueue('test_task', value=1)
+        DAL.close_pool()
+
+        restarted = JobQueue()
+        restarted.app = app
+        restarted.handlers = dict(job_queue.handlers)
+        assert restarted.run_pending() == 1
+        assert task.calls == [{'value': 1}]
+
+    def test_worker_threads_run_jobs(self, app, test_db, task):
+        """Test that started workers pick up a job as soon as it is enqueued"""
+        done = threading.Event()
+        job_queue.handlers['test_done'] = lambda: done.set()
+        app.config['JOBS_WORKERS'] = 1
+        try:
+            job_queue.enqueue('test_done')
+            assert done.wait(5)
+        finally:
+            job_queue.stop(timeout=5)
+            app.config['JOBS_WORKERS'] = 0
+            job_queue.handlers.pop('test_done', None)
+
+
+class TestContactMail:
+    """Test class for contact form mail through the queue"""
+
+    contact = {
+        'name': 'Jane Doe',
+        'email': 'jane@example.com',
+        'subject': 'Hello',
+        'message': 'Interested in working together.',
+    }
+
+    def test_contact_returns_before_sending(self, app, client, test_db, smtp_server):
+        """Test that the form response only buffers the submission, and storing it queues the mail"""
+        response = client.post('/contact', data=self.contact)
+        assert response.status_code == 302
+        assert DAL.count_jobs() == {}
+        app.extensions['messages'].flush()
+        assert smtp_server.messages == []
+        assert DAL.count_jobs() == {'queued': 1}
+
+    def test_contact_mail_delivered(self, app, client, test_db, smtp_server):
+        """Test that the job sends the submission to the owner with a Reply-To of the sender"""
+        client.post('/contact', data=self.contact)
+        app.extensions['messages'].flush()
+        assert job_queue.run_pending() == 1
+
+        [mail] = smtp_server.messages
+        assert mail['To'] == app.config['MAIL_RECIPIENT']
+        assert mail['Reply-To'] == 'jane@example.com'
+        assert 'Hello' in mail['Subject']
+        assert 'Interested in working together.' in mail.get_content()
+
+    def test_smtp_outage_retried(self, app, client, test_db, smtp_server):
+        """Test that mail is kept and retried when the SMTP server is unreachable"""
+        port = smtp_server.server_address[1]
+        app.config['MAIL_PORT'] = 1  # nothing listens here
+        client.post('/contact', data=self.contact)
+        app.extensions['messages'].flush()
+        job_queue.run_pending()
+        [job] = DAL.get_db_connection().execute('SELECT * FROM jobs').fetchall()
+        assert job['status'] == 'queued'
+        assert job['last_error']
+
+        app.config['MAIL_PORT'] = port
+        job_queue.run_pending(now=time.time() + app.config['JOBS_MAX_BACKOFF'] * 2)
+        assert len(smtp_server.messages) == 1
+        assert DAL.count_jobs() == {}
+
+    def test_incomplete_submission_not_queued(self, app, client, test_db):
+        """Test that a submission without an email or message sends nothing"""
+        client.post('/contact', data={'name': 'No Email'})
+        app.extensions['messages'].flush()
+        assert DAL.count_jobs() == {}
@@ -0,0 +1,135 @@
+"""
+Test suite for the contact message store (messages.py and the DAL messages table)
+Tests batched writes, flush thresholds, failure handling and the shutdown flush
+"""
+import time
+
+import pytest
+
+import DAL
+from messages import MessageBuffer
+
+
+@pytest.fixture
+def buffer(app, test_db):
+    """The app's message buffer, with its thresholds restored after the test"""
+    message_buffer = app.extensions['messages']
+    original = {key: app.config[key] for key in ('MESSAGES_BATCH_SIZE', 'MESSAGES_FLUSH_INTERVAL', 'MESSAGES_MAX_PENDING')}
+    yield message_buffer
+    message_buffer.close(timeout=5)
+    app.config.update(original)
+    message_buffer.drain()
+
+
+def submit(message_buffer, count):
+    for n in range(count):
+        message_buffer.add(f'Sender {n}', f'sender{n}@example.com', 'Hello', f'Message {n}')
+
+
+class TestMessagesTable:
+    """Test class for the messages table in the DAL"""
+
+    def test_insert_messages_returns_ids(self, test_db):
+        """Test that a batch is inserted in order with contiguous IDs"""
+        messages = [
+            {'name': f'N{n}', 'email': f'{n}@example.com', 'subject': None, 'message': f'M{n}',
+             'created_at': f'2024-01-0{n + 1} 12:00:00'}
+            for n in range(3)
+        ]
+        ids = DAL.insert_messages(messages)
+        assert len(ids) == 3 and ids == list(range(ids[0], ids[0] + 3))
+        assert DAL.count_messages() == 3
+        assert [row['message'] for row in DAL.get_messages()] == ['M2', 'M1', 'M0']
+        assert DAL.get_messages(limit=1)[0]['created_at'] == '2024-01-03 12:00:00'
+
+    def test_insert_no_messages(self, test_db):
+        """Test that an empty batch writes nothing"""
+        assert DAL.insert_messages([]) == []
+        assert DAL.count_messages() == 0
+
+
+class TestMessageBuffer:
+    """Test class for the write-behind buffer"""
+
+    def test_add_does_not_write(self, buffer):
+        """Test that a submission stays in memory until a flush"""
+        submit(buffer, 1)
+        assert DAL.count_messages() == 0
+        assert buffer.stats()['pending'] == 1
+        assert buffer.flush() == 1
+        assert DAL.count_messages() == 1
+        assert buffer.flush() == 0
+
+    def test_full_batch_written_in_one_transaction(self, app, buffer):
+        """Test that filling a batch writes it at once as a single batch"""
+        app.config['MESSAGES_BATCH_SIZE'] = 5
+        before = buffer.stats()
+        submit(buffer, 4)
+        assert DAL.count_messages() == 0
+        submit(buffer, 1)
+        assert DAL.count_messages() == 5
+        after = buffer.stats()
+        assert after['batches'] == before['batches'] + 1
+        assert after['written'] == before['written'] + 5
+
+    def test_submission_time_kept(self, buffer):
+        """Test that rows carry when they were submitted, not when they were written"""
+        submit(buffer, 1)
+        submitted_at = buffer._pending[0]['created_at']
+        buffer.flush()
+        assert DAL.get_messages()[0]['created_at'] == submitted_at
+
+    def test_failed_write_kept_for_retry(self, buffer, monkeypatch):
+        """Test that a failed write puts the batch back instead of losing it"""
+        def insert_messages(messages):
+            raise RuntimeError('disk full')
+
+        submit(buffer, 3)
+        monkeypatch.setattr(DAL, 'insert_messages', insert_messages)
+        with pytest.raises(RuntimeError):
+            buffer.flush()
+        assert buffer.stats()['pending'] == 3
+        monkeypatch.undo()
+        assert buffer.flush() == 3
+        assert [row['message'] for row in DAL.get_messages()] == ['Message 2', 'Message 1', 'Message 0']
+
+    def test_backlog_written_inline(self, app, buffer):
+        """Test that reaching MESSAGES_MAX_PENDING writes on the submitting thread"""
+        app.config.update(MESSAGES_FLUSH_INTERVAL=60, MESSAGES_BATCH_SIZE=1000, MESSAGES_MAX_PENDING=3)
+        submit(buffer, 3)
+        assert DAL.count_messages() == 3
+
+    def test_background_flush_after_interval(self, app, buffer):
+        """Test that the flusher writes a partial batch once it has waited long enough"""
+        app.config.update(MESSAGES_FLUSH_INTERVAL=0.05, MESSAGES_BATCH_SIZE=1000)
+        submit(buffer, 2)
+        deadline = time.monotonic() + 5
+        while DAL.count_messages() < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert DAL.count_messages() == 2
+
+    def test_close_flushes(self, app, buffer):
+        """Test that shutting down writes what is still buffered"""
+        app.config.update(MESSAGES_FLUSH_INTERVAL=60, MESSAGES_BATCH_SIZE=1000)
+        submit(buffer, 4)
+        assert DAL.count_messages() == 0
+        buffer.close(timeout=5)
+        assert DAL.count_messages() == 4
+
+    def test_after_flush_gets_ids(self, app, test_db):
+        """Test that callbacks receive the stored submissions with their IDs"""
+        message_buffer = MessageBuffer()
+        message_buffer.app = app
+        seen = []
+        message_buffer.after_flush(seen.extend)
+        submit(message_buffer, 2)
+        message_buffer.flush()
+        assert [message['id'] for message in seen] == [row['id'] for row in reversed(DAL.get_messages())]
+
+    def test_contact_form_stored(self, app, client, buffer):
+        """Test that a contact submission is stored and queues one notification mail"""
+        client.post('/contact', data={'name': 'Jane', 'email': 'jane@example.com', 'subject': 'Hi', 'message': 'Hello!'})
+        buffer.flush()
+        [row] = DAL.get_messages()
+        assert (row['name'], row['email'], row['subject'], row['message']) == ('Jane', 'jane@example.com', 'Hi', 'Hello!')
+        assert DAL.count_jobs() == {'queued': 1}
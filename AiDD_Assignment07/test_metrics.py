@@ -0,0 +1,118 @@
+"""
+Test suite for request instrumentation (metrics.py)
+Tests the Server-Timing header, the Prometheus exposition and the DAL query timers
+"""
+import pytest
+
+import DAL
+from metrics import Histogram
+
+
+@pytest.fixture
+def metrics(app):
+    return app.extensions['metrics']
+
+
+class TestHistogram:
+    """Test class for the histogram and its exposition format"""
+
+    def test_buckets_are_cumulative(self):
+        """Test that each bucket counts every observation at or below its bound"""
+        histogram = Histogram('test_seconds', 'Test histogram', ('route',), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value, 'home')
+        lines = list(histogram.collect())
+        assert 'test_seconds_bucket{route="home",le="0.1"} 2' in lines
+        assert 'test_seconds_bucket{route="home",le="1.0"} 3' in lines
+        assert 'test_seconds_bucket{route="home",le="+Inf"} 4' in lines
+        assert 'test_seconds_count{route="home"} 4' in lines
+        assert histogram.snapshot('home') == {'count': 4, 'sum': pytest.approx(2.65)}
+
+    def test_label_values_escaped(self):
+        """Test that quotes, backslashes and newlines in label values are escaped"""
+        histogram = Histogram('test_seconds', 'Test histogram', ('route',))
+        histogram.observe(0.1, 'a"b\\c\nd')
+        assert any('route="a\\"b\\\\c\\nd"' in line for line in histogram.collect())
+
+
+class TestServerTiming:
+    """Test class for the Server-Timing response header"""
+
+    def test_header_breaks_down_projects(self, client, test_db, sample_project):
+        """Test that the listing reports handler, SQL and template time"""
+        DAL.insert_project(**sample_project)
+        response = client.get('/projects')
+        entries = {entry.split(';')[0]: entry for entry in response.headers['Server-Timing'].split(', ')}
+        assert entries['app'].startswith('app;dur=')
+        assert {'db', 'tpl'} <= entries.keys()
+        assert 'statements' in entries['db']
+
+    def test_header_can_be_disabled(self, app, client):
+        """Test that METRICS_SERVER_TIMING turns the header off"""
+        app.config['METRICS_SERVER_TIMING'] = False
+        try:
+            assert 'Server-Timing' not in client.get('/about').headers
+        finally:
+            app.config['METRICS_SERVER_TIMING'] = True
+
+
+class TestExposition:
+    """Test class for the /metrics endpoint"""
+
+    def test_route_latency_recorded(self, client, metrics, test_db):
+        """Test that each request lands in its route's latency histogram once written"""
+        before = metrics.requests.snapshot('about', 'GET', '200')['count']
+        client.get('/about').close()  # servers close every response; the test client leaves it to the caller
+        assert metrics.requests.snapshot('about', 'GET', '200')['count'] == before + 1
+        body = client.get('/metrics').get_data(as_text=True)
+        assert 'http_request_duration_seconds_count{endpoint="about",method="GET",status="200"}' in body
+
+    def test_streamed_write_recorded(self, client, metrics, test_db, populate_projects):
+        """Test that a streamed listing's write time is recorded after the body is sent"""
+        populate_projects(20)
+        before = metrics.writes.snapshot('projects')['count']
+        response = client.get('/projects?stream=1')
+        assert response.is_streamed
+        response.get_data()
+        response.close()
+        assert metrics.writes.snapshot('projects')['count'] == before + 1
+
+    def test_query_and_template_timers(self, client, metrics, test_db):
+        """Test that SQL fetches and template renders are timed"""
+        fetches = metrics.queries.snapshot('fetch', 'SELECT')['count']
+        renders = metrics.templates.snapshot('projects.html')['count']
+        client.get('/projects')
+        assert metrics.queries.snapshot('fetch', 'SELECT')['count'] > fetches
+        assert metrics.templates.snapshot('projects.html')['count'] == renders + 1
+
+    def test_cache_counters(self, client, test_db):
+        """Test that registered caches report hits, misses and hit ratio"""
+        client.get('/about')
+        client.get('/about')
+        body = client.get('/metrics').get_data(as_text=True)
+        assert '# TYPE cache_hits_total counter' in body
+        for cache in ('project', 'page', 'compressed_body'):
+            assert f'cache_hit_ratio{{cache="{cache}"}}' in body
+
+    def test_compression_counters(self, client):
+        """Test that bytes saved by response compression are exported per route"""
+        client.get('/resume', headers={'Accept-Encoding': 'gzip'})
+        body = client.get('/metrics').get_data(as_text=True)
+        assert '# TYPE compression_saved_bytes_total counter' in body
+        saved = [line for line in body.splitlines() if line.startswith('compression_saved_bytes_total{route="resume"}')]
+        assert int(saved[0].rsplit(' ', 1)[1]) > 0
+        assert 'compression_original_bytes_total{route="resume"}' in body
+
+    def test_content_type(self, client):
+        """Test that the endpoint speaks the Prometheus text format and is never cached"""
+        response = client.get('/metrics')
+        assert response.content_type.startswith('text/plain; version=0.0.4')
+        assert response.headers['Cache-Control'] == 'no-store'
+
+    def test_observer_off_skips_timing(self, metrics, test_db, monkeypatch):
+        """Test that DAL queries are not timed without an observer"""
+        monkeypatch.setattr(DAL, 'query_observer', None)
+        before = metrics.queries.snapshot('execute', 'SELECT')['count']
+        DAL.get_all_projects()
+        DAL.get_db_connection().execute('SELECT 1').fetchall()
+        assert metrics.queries.snapshot('execute', 'SELECT')['count'] == before
@@ -0,0 +1,127 @@
+"""
+Test suite for on-demand request profiling (profiler.py)
+Tests signed-header and sampled triggers, both profile formats and spool pruning
+"""
+import os
+import pstats
+
+import pytest
+from itsdangerous import URLSafeTimedSerializer
+
+
+@pytest.fixture
+def profiler(app, tmp_path):
+    """The app's profiler spooling into a temporary directory"""
+    original = {key: app.config[key] for key in ('PROFILE_DIR', 'PROFILE_SAMPLE_RATE', 'PROFILE_MAX_FILES', 'PROFILE_SECRET')}
+    app.config['PROFILE_DIR'] = str(tmp_path)
+    app.config['PROFILE_SECRET'] = 'test-profile-secret'
+    yield app.extensions['profiler']
+    app.config.update(original)
+
+
+def profiles(app):
+    folder = app.config['PROFILE_DIR']
+    return sorted(os.listdir(folder)) if os.path.isdir(folder) else []
+
+
+class TestProfileTriggers:
+    """Test class for deciding which requests are profiled"""
+
+    def test_off_by_default(self, app, client, profiler):
+        """Test that requests without a token or sample rate are not profiled"""
+        response = client.get('/about')
+        assert 'X-Profile-File' not in response.headers
+        assert profiles(app) == []
+
+    def test_signed_header_profiles(self, app, client, profiler):
+        """Test that a valid token profiles the request and names the spooled file"""
+        response = client.get('/about', headers={'X-Profile': profiler.make_token()})
+        name = response.headers['X-Profile-File']
+        assert name.endswith('-about.folded')
+        assert profiles(app) == [name]
+
+    @pytest.mark.parametrize('token', ['not-a-token', 'eyJtb2RlIjoic2FtcGxlIn0.forged.signature'])
+    def test_bad_token_ignored(self, app, client, profiler, token):
+        """Test that unsigned or tampered tokens do nothing"""
+        response = client.get('/about', headers={'X-Profile': token})
+        assert response.status_code == 200
+        assert profiles(app) == []
+
+    def test_secret_key_token_ignored(self, app, client, profiler):
+        """Test that a token signed with the app's SECRET_KEY instead of PROFILE_SECRET does nothing"""
+        token = URLSafeTimedSerializer(app.secret_key, salt='request-profile').dumps({'mode': 'cprofile'})
+        client.get('/about', headers={'X-Profile': token})
+        assert profiles(app) == []
+
+    def test_header_ignored_without_secret(self, app, client, profiler):
+        """Test that with PROFILE_SECRET unset no token is accepted or minted"""
+        token = profiler.make_token()
+        app.config['PROFILE_SECRET'] = None
+        response = client.get('/about', headers={'X-Profile': token})
+        assert 'X-Profile-File' not in response.headers
+        assert profiles(app) == []
+        with pytest.raises(RuntimeError):
+            profiler.make_token()
+
+    def test_expired_token_ignored(self, app, client, profiler):
+        """Test that tokens older than PROFILE_TOKEN_MAX_AGE are rejected"""
+        token = profiler.make_token()
+        app.config['PROFILE_TOKEN_MAX_AGE'] = -1
+        try:
+            client.get('/about', headers={'X-Profile': token})
+        finally:
+            app.config['PROFILE_TOKEN_MAX_AGE'] = 3600
+        assert profiles(app) == []
+
+    def test_sample_rate(self, app, client, profiler):
+        """Test that a sample rate of 1 profiles every request without telling the client"""
+        app.config['PROFILE_SAMPLE_RATE'] = 1.0
+        response = client.get('/about')
+        assert 'X-Profile-File' not in response.headers
+        assert len(profiles(app)) == 1
+
+
+class TestProfileOutput:
+    """Test class for the spooled profile formats"""
+
+    def test_folded_stacks(self, app, client, test_db, populate_projects, profiler):
+        """Test that the sampler writes flamegraph folded lines: stack, space, count"""
+        populate_projects(2000)
+        app.config['PROFILE_INTERVAL'] = 0.0005
+        try:
+            response = client.get('/projects?stream=1', headers={'X-Profile': profiler.make_token()})
+            name = response.headers['X-Profile-File']
+            response.get_data()
+            response.close()  # the profile is written once the streamed body is done
+        finally:
+            app.config['PROFILE_INTERVAL'] = 0.001
+        with open(os.path.join(app.config['PROFILE_DIR'], name)) as folded:
+            lines = folded.read().splitlines()
+        assert lines
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            assert int(count) > 0
+            assert ';' in stack
+
+    def test_cprofile_stats(self, app, client, profiler):
+        """Test that cprofile mode writes stats pstats can load"""
+        response = client.get('/about', headers={'X-Profile': profiler.make_token('cprofile')})
+        name = response.headers['X-Profile-File']
+        assert name.endswith('.prof')
+        stats = pstats.Stats(os.path.join(app.config['PROFILE_DIR'], name))
+        assert stats.total_calls > 0
+
+    def test_spool_pruned(self, app, client, profiler):
+        """Test that only the newest PROFILE_MAX_FILES profiles are kept"""
+        app.config['PROFILE_MAX_FILES'] = 2
+        token = profiler.make_token()
+        names = [client.get('/about', headers={'X-Profile': token}).headers['X-Profile-File'] for _ in range(4)]
+        assert set(profiles(app)) <= set(names)
+        assert len(profiles(app)) == 2
+
+    def test_token_command(self, app, profiler):
+        """Test that the CLI prints a token the app accepts"""
+        result = app.test_cli_runner().invoke(args=['profile-token', '--mode', 'cprofile'])
+        token = result.output.strip()
+        with app.test_request_context('/', headers={'X-Profile': token}):
+            assert app.extensions['profiler'].requested_mode() == 'cprofile'
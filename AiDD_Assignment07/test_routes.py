@@ -130,7 +130,7 @@ class TestProjectsRoutes:
 class TestContactForm:
     """Test class for contact form functionality"""
     
-    def test_contact_form_submission(self, client):
+    def test_contact_form_submission(self, client, test_db):
         """Test submitting contact form with valid data"""
         contact_data = {
             'name': 'John Doe',
@@ -177,6 +177,36 @@ class TestContextProcessors:
         assert current_year.encode() in response.data
 
 
+class TestLayout:
+    """Test class for the shared base.html layout and its header/footer partials"""
+    
+    @pytest.mark.parametrize('path,label', [
+        ('/', 'Home'), ('/about', 'About'), ('/resume', 'Resume'), ('/projects', 'Projects'), ('/contact', 'Contact'),
+    ])
+    def test_current_page_marked_in_nav(self, client, test_db, path, label):
+        """Test that only the current page's nav link is marked active"""
+        html = client.get(path).get_data(as_text=True)
+        assert f'class="active" aria-current="page">{label}</a>' in html
+        assert html.count('class="active"') == 1
+    
+    def test_pages_outside_nav_mark_nothing(self, client):
+        """Test that pages missing from the nav leave every link unmarked"""
+        for path in ('/add_project', '/thankyou'):
+            assert b'class="active"' not in client.get(path).data
+    
+    def test_social_links_only_on_home(self, client):
+        """Test that the footer's social links appear on the home page only"""
+        assert b'class="social-links"' in client.get('/').data
+        assert b'class="social-links"' not in client.get('/about').data
+    
+    def test_page_metadata(self, client):
+        """Test that each page fills the layout's title and Open Graph blocks"""
+        about = client.get('/about').get_data(as_text=True)
+        assert '<title>About — Aneesh Yaramati</title>' in about
+        assert '<meta property="og:title" content="About — Aneesh Yaramati">' in about
+        assert 'og:title' not in client.get('/add_project').get_data(as_text=True)
+
+
 class TestIntegrationScenarios:
     """Test class for end-to-end integration scenarios"""
     
@@ -270,7 +300,7 @@ class TestFormValidation:
         projects = DAL.get_all_projects()
         assert len(projects) == 1
     
-    def test_contact_form_with_special_characters(self, client):
+    def test_contact_form_with_special_characters(self, client, test_db):
         """Test contact form with special characters"""
         contact_data = {
             'name': "O'Brien",
@@ -280,3 +310,413 @@ class TestFormValidation:
         }
         response = client.post('/contact', data=contact_data, follow_redirects=True)
         assert response.status_code == 200
+
+
+class TestConnectionTeardown:
+    """Test class for returning pooled connections after each request"""
+    
+    def test_app_context_teardown_releases_connection(self, app, test_db):
+        """Test that leaving the app context hands the connection back to the pool"""
+        DAL.release_connection()
+        pool = DAL.get_pool()
+        
+        with app.app_context():
+            conn = DAL.get_db_connection()
+            assert len(pool._idle) == 0
+        
+        assert getattr(DAL._local, 'lease', None) is None
+        assert pool._idle == [conn]
+
+
+class TestPageCache:
+    """Test class for the rendered-page cache on template-only routes"""
+    
+    @staticmethod
+    def count_renders(app):
+        from flask import template_rendered
+        
+        rendered = []
+        
+        def record(sender, template, context, **extra):
+            rendered.append(template.name)
+        
+        template_rendered.connect(record, app)
+        return rendered, lambda: template_rendered.disconnect(record, app)
+    
+    def test_second_request_skips_render(self, app, client):
+        """Test that a cached page is served without running Jinja again"""
+        from app import page_cache
+        
+        page_cache.clear()
+        rendered, stop = self.count_renders(app)
+        try:
+            first = client.get('/about')
+            second = client.get('/about')
+        finally:
+            stop()
+        
+        assert first.data == second.data
+        assert second.mimetype == 'text/html'
+        assert rendered == ['about.html']
+    
+    def test_template_change_invalidates_cache(self, app, client, monkeypatch):
+        """Test that editing a template on disk forces a fresh render"""
+        import os
+        import time
+        from app import page_cache
+        
+        monkeypatch.setattr(page_cache, 'check_interval', 0)
+        client.get('/resume')
+        
+        path = os.path.join(app.root_path, 'templates', 'resume.html')
+        stat = os.stat(path)
+        os.utime(path, (stat.st_atime, time.time() + 60))
+        rendered, stop = self.count_renders(app)
+        try:
+            client.get('/resume')
+        finally:
+            stop()
+            os.utime(path, (stat.st_atime, stat.st_mtime))
+        
+        assert rendered == ['resume.html']
+    
+    def test_year_rollover_renders_new_page(self, client, monkeypatch):
+        """Test that the injected year is part of the cache key"""
+        import datetime
+        import app as app_module
+        
+        client.get('/')
+        next_year = datetime.datetime.now().year + 1
+        
+        class NextYear(datetime.datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return datetime.datetime(next_year, 1, 1)
+        
+        monkeypatch.setattr(app_module.datetime, 'datetime', NextYear)
+        response = client.get('/')
+        assert str(next_year).encode() in response.data
+    
+    def test_layout_fragments_reused(self, client, test_db):
+        """Test that an uncached page takes its header and footer from the fragment cache"""
+        from app import page_cache
+        
+        page_cache.clear()
+        client.get('/projects')
+        hits = page_cache.fragments.hits
+        client.get('/projects')
+        assert page_cache.fragments.hits == hits + 2
+        assert page_cache.fragments.stats()['size'] == 2
+    
+    def test_dynamic_routes_not_cached(self, client, test_db, sample_project):
+        """Test that the projects listing still reflects database changes"""
+        client.get('/projects')
+        DAL.insert_project(**sample_project)
+        response = client.get('/projects')
+        assert sample_project['title'].encode() in response.data
+
+
+class TestConditionalRequests:
+    """Test class for ETag / Last-Modified validators and 304 responses"""
+    
+    def test_cached_page_returns_304_for_matching_etag(self, client):
+        """Test that revisiting a static page with its ETag returns 304 and no body"""
+        first = client.get('/about')
+        assert first.headers.get('ETag')
+        assert first.headers.get('Last-Modified')
+        
+        second = client.get('/about', headers={'If-None-Match': first.headers['ETag']})
+        assert second.status_code == 304
+        assert second.data == b''
+    
+    def test_stale_etag_returns_full_page(self, client):
+        """Test that a non-matching ETag gets the full page"""
+        response = client.get('/about', headers={'If-None-Match': '"stale"'})
+        assert response.status_code == 200
+        assert len(response.data) > 0
+    
+    def test_other_routes_get_body_etag(self, client):
+        """Test that uncached routes still emit a strong ETag and honour it"""
+        first = client.get('/contact')
+        etag = first.headers.get('ETag')
+        assert etag and not etag.startswith('W/')
+        
+        second = client.get('/contact', headers={'If-None-Match': etag})
+        assert second.status_code == 304
+    
+    def test_projects_304_skips_database_read(self, client, test_db, sample_project, monkeypatch):
+        """Test that a matching ETag on /projects is answered before loading projects"""
+        DAL.insert_project(**sample_project)
+        etag = client.get('/projects').headers['ETag']
+        
+        def fail():
+            raise AssertionError('projects should not be loaded for a 304')
+        
+        monkeypatch.setattr(DAL, 'get_all_projects', fail)
+        response = client.get('/projects', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+    
+    def test_projects_if_modified_since(self, client, test_db, sample_project):
+        """Test that If-Modified-Since is honoured when no ETag is sent"""
+        DAL.insert_project(**sample_project)
+        last_modified = client.get('/projects').headers['Last-Modified']
+        
+        response = client.get('/projects', headers={'If-Modified-Since': last_modified})
+        assert response.status_code == 304
+    
+    def test_projects_etag_changes_after_write(self, client, test_db, sample_project):
+        """Test that adding a project invalidates the listing's ETag"""
+        etag = client.get('/projects').headers['ETag']
+        DAL.insert_project(**sample_project)
+        
+        response = client.get('/projects', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        assert sample_project['title'].encode() in response.data
+    
+    def test_projects_validators_change_after_asset_build(self, app, client, test_db, monkeypatch):
+        """Test that new fingerprinted assets invalidate the listing's ETag and Last-Modified"""
+        first = client.get('/projects')
+        static_assets = app.extensions['static_assets']
+        monkeypatch.setattr(static_assets, 'digest', 'rebuilt')
+        monkeypatch.setattr(static_assets, 'modified', 4102444800.0)  # 2100-01-01
+        
+        response = client.get('/projects', headers={'If-None-Match': first.headers['ETag']})
+        assert response.status_code == 200
+        response = client.get('/projects', headers={'If-Modified-Since': first.headers['Last-Modified']})
+        assert response.status_code == 200
+        assert response.headers['Last-Modified'] == 'Fri, 01 Jan 2100 00:00:00 GMT'
+
+
+class TestProjectDetail:
+    """Test class for the summarised listing and the /projects/<id> detail page"""
+    
+    def test_listing_shows_summary_with_link(self, client, test_db):
+        """Test that long descriptions are cut in the listing and linked to the full text"""
+        description = 'word ' * 200 + 'ENDING'
+        project_id = DAL.insert_project('Long One', description, 'long.svg')
+        html = client.get('/projects').get_data(as_text=True)
+        assert 'ENDING' not in html
+        assert f'href="/projects/{project_id}">Read more</a>' in html
+        assert client.get('/projects?stream=1').get_data(as_text=True).count('Read more') == 1
+    
+    def test_short_description_not_linked(self, client, test_db, sample_project):
+        """Test that descriptions that fit are shown whole, without a read-more link"""
+        DAL.insert_project(**sample_project)
+        html = client.get('/projects').get_data(as_text=True)
+        assert sample_project['description'] in html
+        assert 'Read more' not in html
+    
+    def test_detail_page_shows_full_description(self, client, test_db):
+        """Test that the detail route renders the whole description and marks Projects in the nav"""
+        description = 'word ' * 200 + 'ENDING'
+        project_id = DAL.insert_project('Long One', description, 'long.svg')
+        response = client.get(f'/projects/{project_id}')
+        html = response.get_data(as_text=True)
+        assert response.status_code == 200
+        assert 'ENDING' in html
+        assert '<title>Long One — Aneesh Yaramati</title>' in html
+        assert 'class="active" aria-current="page">Projects</a>' in html
+    
+    def test_detail_page_escapes_content(self, client, test_db):
+        """Test that project text is HTML-escaped on the detail page"""
+        project_id = DAL.insert_project('<b>Bold</b>', '<script>alert(1)</script>', 'x.svg')
+        html = client.get(f'/projects/{project_id}').get_data(as_text=True)
+        assert '<script>alert(1)</script>' not in html
+        assert '&lt;script&gt;' in html
+    
+    def test_missing_project_is_404(self, client, test_db):
+        """Test that an unknown project ID is a 404"""
+        assert client.get('/projects/999').status_code == 404
+
+
+class TestProjectsPagination:
+    """Test class for cursor (/projects/page/<cursor> or ?cursor=) and ?limit= support on the projects page"""
+    
+    def test_limit_and_next_link(self, client, test_db):
+        """Test that a limited page shows only its rows plus a link to older projects"""
+        for i in range(5):
+            DAL.insert_project(f'Paged Project {i}', 'desc', 'image.svg')
+        
+        response = client.get('/projects?limit=2')
+        assert b'Paged Project 4' in response.data
+        assert b'Paged Project 3' in response.data
+        assert b'Paged Project 2' not in response.data
+        assert b'Older projects' in response.data
+    
+    def test_following_cursor_returns_next_page(self, client, test_db):
+        """Test that the cursor from one page yields the following rows"""
+        for i in range(3):
+            DAL.insert_project(f'Paged Project {i}', 'desc', 'image.svg')
+        _, cursor = DAL.get_projects_page(2)
+        
+        response = client.get(f'/projects?limit=2&cursor={cursor}')
+        assert b'Paged Project 0' in response.data
+        assert b'Paged Project 2' not in response.data
+        assert b'Older projects' not in response.data
+    
+    def test_default_page_links_to_cursor_path(self, client, test_db, app, monkeypatch):
+        """Test that at the default page size the next link is a plain path, which serves the next page"""
+        monkeypatch.setitem(app.config, 'PROJECTS_PER_PAGE', 2)
+        for i in range(3):
+            DAL.insert_project(f'Paged Project {i}', 'desc', 'image.svg')
+        _, cursor = DAL.get_projects_page(2)
+        
+        assert f'href="/projects/page/{cursor}"'.encode() in client.get('/projects').data
+        response = client.get(f'/projects/page/{cursor}')
+        assert b'Paged Project 0' in response.data
+        assert b'Paged Project 1' not in response.data
+    
+    def test_invalid_cursor_is_bad_request(self, client, test_db):
+        """Test that a malformed cursor returns 400"""
+        response = client.get('/projects?cursor=garbage')
+        assert response.status_code == 400
+    
+    def test_pages_have_distinct_etags(self, client, test_db):
+        """Test that different pages of the listing do not share a validator"""
+        first = client.get('/projects?limit=1').headers['ETag']
+        second = client.get('/projects?limit=2').headers['ETag']
+        assert first != second
+
+
+class TestStreamingProjects:
+    """Test class for the streamed rendering of /projects"""
+    
+    def test_stream_renders_every_project(self, client, test_db, multiple_projects):
+        """Test that ?stream=1 returns the complete listing as a streamed response"""
+        for project in multiple_projects:
+            DAL.insert_project(**project)
+        
+        response = client.get('/projects?stream=1')
+        assert response.status_code == 200
+        assert response.is_streamed
+        for project in multiple_projects:
+            assert project['title'].encode() in response.data
+        assert b'Older projects' not in response.data
+    
+    def test_stream_empty_table(self, client, test_db):
+        """Test that streaming an empty table still shows the empty state"""
+        response = client.get('/projects?stream=1')
+        assert b'No projects found' in response.data
+    
+    def test_stream_memory_bounded_on_large_table(self, client, populate_projects):
+        """Test that first bytes arrive with bounded memory from a 500k-row table"""
+        import time
+        import tracemalloc
+        
+        populate_projects(500_000)
+        
+        tracemalloc.start()
+        started = time.perf_counter()
+        response = client.get('/projects?stream=1', buffered=False)
+        chunks = response.iter_encoded()
+        received = 0
+        first_byte = None
+        # Render well past the first fetch batches without buffering the whole page
+        while received < 4 * 1024 * 1024:
+            received += len(next(chunks))
+            if first_byte is None:
+                first_byte = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        response.close()
+        
+        assert first_byte < 1.0
+        # fetchall() of 500k rows alone would need well over 100 MB
+        assert peak < 20 * 1024 * 1024
+
+
+class TestProjectSearch:
+    """Test class for searching projects from the listing page"""
+    
+    def test_search_shows_matches_only(self, client, test_db):
+        """Test that ?q= narrows the listing to matching projects"""
+        DAL.insert_project('Pothole Detection', 'Computer vision model', 'a.svg')
+        DAL.insert_project('SAP Migration', 'Finance pipelines', 'b.svg')
+        
+        response = client.get('/projects?q=pothole')
+        assert b'Pothole Detection' in response.data
+        assert b'SAP Migration' not in response.data
+    
+    def test_search_snippet_is_escaped_and_highlighted(self, client, test_db):
+        """Test that user text in snippets is escaped while matches are marked"""
+        DAL.insert_project('Unsafe', '<script>alert(1)</script> vision', 'a.svg')
+        
+        response = client.get('/projects?q=vision')
+        assert b'<script>alert(1)</script>' not in response.data
+        assert b'<mark>vision</mark>' in response.data
+    
+    def test_search_without_results(self, client, test_db):
+        """Test that an unmatched search shows the empty state for the query"""
+        response = client.get('/projects?q=nothing')
+        assert b'No projects match' in response.data
+
+
+class TestAppFactory:
+    """Test class for the production entry point"""
+    
+    def test_create_app_applies_config(self, app):
+        """Test that config overrides passed to the factory are applied"""
+        from app import create_app
+        
+        try:
+            assert create_app({'FACTORY_TEST_FLAG': True}) is app
+            assert app.config['FACTORY_TEST_FLAG'] is True
+        finally:
+            app.config.pop('FACTORY_TEST_FLAG', None)
+    
+    def test_create_app_precompiles_templates(self, app):
+        """Test that every template is compiled before the first request"""
+        from app import create_app
+        
+        app.jinja_env.cache.clear()
+        create_app()
+        cached = {key[1] for key in app.jinja_env.cache.keys()}
+        assert set(app.jinja_env.list_templates()) <= cached
+    
+    def test_create_app_writes_bytecode_cache(self, app, tmp_path):
+        """Test that the factory stores compiled templates for the next start to load"""
+        from app import create_app
+        
+        app.jinja_env.cache.clear()
+        try:
+            create_app({'TEMPLATE_CACHE_DIR': str(tmp_path)})
+            assert len(list(tmp_path.glob('*.cache'))) == len(app.jinja_env.list_templates())
+        finally:
+            app.config['TEMPLATE_CACHE_DIR'] = ''
+            app.jinja_env.bytecode_cache = None
+            app.jinja_env.cache.clear()
+    
+    def test_create_app_leaves_no_open_connections(self, app):
+        """Test that the factory closes the pool so nothing is shared across a fork"""
+        from app import create_app
+        
+        create_app()
+        assert DAL._pool is None
+        assert getattr(DAL._local, 'lease', None) is None
+    
+    def test_gunicorn_config(self, monkeypatch):
+        """Test that the gunicorn config preloads and sizes workers from the CPU count"""
+        import multiprocessing
+        import os
+        import runpy
+        
+        # The config seeds DB_POOL_SIZE in the environment; keep that out of other tests
+        monkeypatch.setenv('DB_POOL_SIZE', os.environ.get('DB_POOL_SIZE', '5'))
+        config = runpy.run_path(os.path.join(os.path.dirname(__file__), 'gunicorn.conf.py'))
+        if 'WEB_CONCURRENCY' not in os.environ:
+            assert config['workers'] == multiprocessing.cpu_count() * 2 + 1
+        assert config['preload_app'] is True
+        assert config['worker_class'] == 'gthread'
+        assert callable(config['post_fork'])
+    
+    def test_gunicorn_pool_covers_background_threads(self, monkeypatch):
+        """Test that the pool has a connection for every request thread, job worker and the message flusher"""
+        import os
+        import runpy
+        
+        monkeypatch.delenv('DB_POOL_SIZE', raising=False)
+        monkeypatch.setenv('GUNICORN_THREADS', '4')
+        monkeypatch.setenv('JOBS_WORKERS', '3')
+        runpy.run_path(os.path.join(os.path.dirname(__file__), 'gunicorn.conf.py'))
+        assert os.environ['DB_POOL_SIZE'] == str(4 + 3 + 1 + 1)
@@ -0,0 +1,156 @@
+"""
+Test suite for the DAL slow-query log, query plans and the DAL.py command line
+Tests threshold logging, index recommendations and the slow-query report
+"""
+import json
+import logging
+
+import pytest
+
+import DAL
+
+
+@pytest.fixture
+def slow_log(tmp_path, monkeypatch):
+    """Log every statement as slow into a temporary file; returns a reader for the logged entries"""
+    path = tmp_path / 'slow_queries.log'
+    monkeypatch.setattr(DAL, 'SLOW_QUERY_LOG', str(path))
+    monkeypatch.setattr(DAL, 'SLOW_QUERY_MS', 1e-6)
+
+    def entries():
+        if not path.exists():
+            return []
+        return [json.loads(line) for line in path.read_text().splitlines()]
+    entries.path = str(path)
+    return entries
+
+
+@pytest.fixture
+def without_created_at_index(test_db):
+    DAL.get_db_connection().execute('DROP INDEX idx_projects_created_at_id')
+
+
+class TestSlowQueryLog:
+    """Test class for logging statements over the threshold"""
+
+    def test_fast_queries_not_logged(self, test_db, tmp_path, monkeypatch):
+        """Test that statements under SLOW_QUERY_MS leave no trace"""
+        monkeypatch.setattr(DAL, 'SLOW_QUERY_LOG', str(tmp_path / 'slow.log'))
+        DAL.get_project_by_id(1)
+        assert not (tmp_path / 'slow.log').exists()
+
+    def test_slow_query_logged_with_plan(self, test_db, slow_log, caplog):
+        """Test that a slow statement is logged with its query plan, as JSON and as a warning"""
+        with caplog.at_level(logging.WARNING, logger='DAL'):
+            DAL.get_db_connection().execute('SELECT * FROM projects ORDER BY created_at DESC, id DESC').fetchall()
+        [entry] = [e for e in slow_log() if e['sql'].startswith('SELECT * FROM projects ORDER BY')]
+        assert entry['ms'] > 0
+        assert any('idx_projects_created_at_id' in line for line in entry['plan'])
+        assert 'Slow query' in caplog.text and 'idx_projects_created_at_id' in caplog.text
+
+    def test_logged_once_per_statement(self, populate_projects, slow_log):
+        """Test that a statement fetched in many batches is logged a single time"""
+        populate_projects(50)
+        cursor = DAL.get_db_connection().execute('SELECT * FROM projects')
+        while cursor.fetchmany(5):
+            pass
+        assert sum(e['sql'] == 'SELECT * FROM projects' for e in slow_log()) == 1
+
+    def test_transaction_control_not_logged(self, test_db, slow_log):
+        """Test that BEGIN/COMMIT, whose time is mostly waiting for the write lock, are not slow queries"""
+        DAL.insert_project('Logged', 'Its INSERT is logged, its transaction is not', 'a.svg')
+        statements = [e['sql'].split()[0].upper() for e in slow_log()]
+        assert 'INSERT' in statements
+        assert not set(statements) & {'BEGIN', 'COMMIT', 'ROLLBACK'}
+
+    def test_file_log_off_by_default(self, test_db, caplog, monkeypatch):
+        """Test that without SLOW_QUERY_LOG a slow statement is only a warning"""
+        monkeypatch.setattr(DAL, 'SLOW_QUERY_LOG', '')
+        monkeypatch.setattr(DAL, 'SLOW_QUERY_MS', 1e-6)
+        with caplog.at_level(logging.WARNING, logger='DAL'):
+            DAL.get_all_projects()
+        assert 'Slow query' in caplog.text
+
+    def test_threshold_zero_disables(self, test_db, slow_log, monkeypatch):
+        """Test that SLOW_QUERY_MS = 0 turns logging off"""
+        monkeypatch.setattr(DAL, 'SLOW_QUERY_MS', 0)
+        DAL.get_all_projects()
+        assert slow_log() == []
+
+
+class TestQueryPlans:
+    """Test class for EXPLAIN QUERY PLAN capture and index recommendations"""
+
+    listing = 'SELECT * FROM projects ORDER BY created_at DESC, id DESC'
+
+    def test_listing_uses_index(self, test_db):
+        """Test that the newest-first listing needs no new index"""
+        conn = DAL.get_db_connection()
+        assert not any('TEMP B-TREE' in line for line in DAL.explain(conn, self.listing))
+        assert DAL.recommend_indexes(conn, self.listing) == []
+
+    def test_missing_sort_index_recommended(self, without_created_at_index):
+        """Test that a scan plus temporary sort suggests an index on the sort columns"""
+        conn = DAL.get_db_connection()
+        assert 'USE TEMP B-TREE FOR ORDER BY' in DAL.explain(conn, self.listing)
+        assert DAL.recommend_indexes(conn, self.listing) == [
+            'CREATE INDEX idx_projects_created_at_id ON projects (created_at, id)'
+        ]
+
+    def test_filter_columns_first(self, test_db):
+        """Test that filtered columns lead the suggested index, ahead of sort columns"""
+        conn = DAL.get_db_connection()
+        sql = 'SELECT * FROM projects WHERE title = ? ORDER BY created_at'
+        assert DAL.recommend_indexes(conn, sql) == [
+            'CREATE INDEX idx_projects_title_created_at ON projects (title, created_at)'
+        ]
+
+    def test_primary_key_lookup_needs_nothing(self, test_db):
+        """Test that indexed lookups get no suggestion"""
+        conn = DAL.get_db_connection()
+        assert DAL.recommend_indexes(conn, 'SELECT * FROM projects WHERE id = ?') == []
+
+    def test_unpreparable_statement(self, test_db):
+        """Test that a statement that cannot be prepared has an empty plan"""
+        assert DAL.explain(DAL.get_db_connection(), 'SELECT * FROM no_such_table') == []
+
+
+class TestCommandLine:
+    """Test class for the DAL.py command line"""
+
+    def test_report_ranks_by_total_time(self, tmp_path):
+        """Test that the report groups by statement and puts the costliest first"""
+        path = tmp_path / 'slow.log'
+        entries = [('SELECT 1', 150), ('SELECT 2', 400), ('SELECT 1', 300)]
+        path.write_text(''.join(json.dumps({'sql': sql, 'ms': ms, 'plan': []}) + '\n' for sql, ms in entries))
+        report = DAL.slow_query_report(str(path))
+        assert [(s['sql'], s['count'], s['total_ms'], s['max_ms']) for s in report] == [
+            ('SELECT 1', 2, 450, 300), ('SELECT 2', 1, 400, 400),
+        ]
+        assert len(DAL.slow_query_report(str(path), top=1)) == 1
+
+    def test_slow_queries_command(self, without_created_at_index, slow_log, capsys):
+        """Test that the command lists logged statements with a suggested index"""
+        DAL.get_all_projects()
+        assert DAL.main(['--db', DAL.DB_NAME, 'slow-queries', '--log', slow_log.path]) == 0
+        output = capsys.readouterr().out
+        assert 'SELECT * FROM projects ORDER BY created_at DESC, id DESC' in output
+        assert 'Suggested: CREATE INDEX idx_projects_created_at_id ON projects (created_at, id);' in output
+
+    def test_slow_queries_without_log(self, test_db, tmp_path, capsys):
+        """Test that a missing log is reported rather than raised"""
+        DAL.main(['--db', DAL.DB_NAME, 'slow-queries', '--log', str(tmp_path / 'missing.log')])
+        assert 'No slow queries logged yet' in capsys.readouterr().out
+
+    def test_slow_queries_without_configured_log(self, test_db, monkeypatch, capsys):
+        """Test that the report explains how to turn the log on when none is configured"""
+        monkeypatch.setattr(DAL, 'SLOW_QUERY_LOG', '')
+        assert DAL.main(['--db', DAL.DB_NAME, 'slow-queries']) == 0
+        assert 'set DB_SLOW_QUERY_LOG' in capsys.readouterr().out
+
+    def test_explain_command(self, without_created_at_index, capsys):
+        """Test that explain prints the plan and any suggestion"""
+        DAL.main(['--db', DAL.DB_NAME, 'explain', 'SELECT * FROM projects ORDER BY created_at'])
+        output = capsys.readouterr().out
+        assert 'SCAN projects' in output
+        assert 'Suggested: CREATE INDEX idx_projects_created_at ON projects (created_at);' in output